@@ -0,0 +1,259 @@
+"""
+Moteur vectorisé pour les matchs StrategyAgent vs StrategyAgent.
+
+Au lieu de faire avancer un `Game` round par round, on joue des milliers de
+parties en même temps : les coups sont des matrices int8 (parties × rounds),
+0 pour coopérer et 1 pour trahir, et les gains sont lus dans une matrice 2x2
+construite à partir de `PAYOFFS`. Les enregistrements produits sont identiques
+à ceux de `Game.history`, colonnes d'identité (match_id, sim_id, repetition)
+comprises.
+
+Les stratégies viennent du registre de `strategies` (tables mémoire n), si
+bien qu'un tournoi round-robin de centaines de stratégies tient en un lot.
+"""
+import uuid
+
+import numpy as np
+import pandas as pd
+from typing import List, Tuple, Dict, Any, Optional, Sequence
+
+from game_engine import (
+    PAYOFFS, MOVE_CODES, StrategyAgent, RoundRecorder, build_rounds_frame, game_metadata,
+    make_match_id, write_parquet_atomic,
+)
+from strategies import compile_tables
+
+# PAYOFF_MATRIX[coup1, coup2] -> (score1, score2)
+PAYOFF_MATRIX = np.zeros((2, 2, 2), dtype=np.int8)
+for (_m1, _m2), (_s1, _s2) in PAYOFFS.items():
+    PAYOFF_MATRIX[MOVE_CODES[_m1], MOVE_CODES[_m2]] = (_s1, _s2)
+
+# Kernel Numba optionnel pour la boucle parties × rounds
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _play_kernel(tables, initial, memory, idx1, idx2, uniforms, moves1, moves2):
+    """
+    Boucle de référence sur les parties et les rounds, compilée par Numba si
+    disponible. `uniforms[t, k, g]` est le tirage du joueur k dans la partie g.
+    """
+    n, rounds = moves1.shape
+    mask = (1 << memory) - 1
+    for g in range(n):
+        bits1 = 0
+        bits2 = 0
+        for t in range(rounds):
+            if t == 0:
+                p1 = initial[idx1[g]]
+                p2 = initial[idx2[g]]
+            else:
+                p1 = tables[idx1[g], (bits1 << memory) | bits2]
+                p2 = tables[idx2[g], (bits2 << memory) | bits1]
+            m1 = 1 if uniforms[t, 0, g] >= p1 else 0
+            m2 = 1 if uniforms[t, 1, g] >= p2 else 0
+            moves1[g, t] = m1
+            moves2[g, t] = m2
+            bits1 = ((bits1 << 1) | m1) & mask
+            bits2 = ((bits2 << 1) | m2) & mask
+
+
+_play_kernel_jit = njit(cache=True)(_play_kernel) if njit is not None else None
+
+
+class BatchResult:
+    """
+    Résultats d'un lot de parties, stockés en matrices (parties × rounds).
+
+    Chaque partie a la même identité qu'un `Game` : `sim_ids` et
+    `repetitions` (une valeur par partie, None et 0 par défaut) et un
+    match_id dérivé des noms et du sim_id, tiré au hasard sans sim_id.
+    """
+
+    def __init__(self, agents1: List[StrategyAgent], agents2: List[StrategyAgent],
+                 moves1: np.ndarray, moves2: np.ndarray,
+                 sim_ids: Optional[Sequence[Optional[int]]] = None,
+                 repetitions: Optional[Sequence[int]] = None):
+        self.agents1 = agents1
+        self.agents2 = agents2
+        n = len(agents1)
+        self.sim_ids = list(sim_ids) if sim_ids is not None else [None] * n
+        self.repetitions = list(repetitions) if repetitions is not None else [0] * n
+        self.match_ids = [
+            make_match_id(a.name, b.name, sim_id if sim_id is not None else uuid.uuid4().hex)
+            for a, b, sim_id in zip(agents1, agents2, self.sim_ids)
+        ]
+        self.moves1 = moves1
+        self.moves2 = moves2
+        payoffs = PAYOFF_MATRIX[moves1, moves2]
+        self.scores1 = payoffs[..., 0]
+        self.scores2 = payoffs[..., 1]
+        self.total_scores1 = np.cumsum(self.scores1, axis=1, dtype=np.int32)
+        self.total_scores2 = np.cumsum(self.scores2, axis=1, dtype=np.int32)
+
+    @property
+    def num_games(self) -> int:
+        return self.moves1.shape[0]
+
+    @property
+    def rounds(self) -> int:
+        return self.moves1.shape[1]
+
+    def final_scores(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self.rounds == 0:
+            empty = np.zeros(self.num_games, dtype=np.int32)
+            return empty, empty.copy()
+        return self.total_scores1[:, -1], self.total_scores2[:, -1]
+
+    def metadata(self, game_index: int) -> Dict[str, Any]:
+        """Identité et agents d'une partie du lot (comme `Game._metadata`)."""
+        i = game_index
+        return {
+            "match_id": self.match_ids[i],
+            "sim_id": self.sim_ids[i],
+            "repetition": self.repetitions[i],
+            **game_metadata(self.agents1[i], self.agents2[i]),
+        }
+
+    def recorder(self, game_index: int) -> RoundRecorder:
+        """RoundRecorder d'une partie du lot (mêmes colonnes qu'un Game)."""
+        i = game_index
+        return RoundRecorder.from_arrays(
+            self.metadata(i),
+            self.moves1[i], self.moves2[i], self.scores1[i], self.scores2[i],
+            self.total_scores1[i], self.total_scores2[i],
+        )
+
+    def history(self, game_index: int) -> List[Dict[str, Any]]:
+        """Historique d'une partie, au même format que `Game.history`."""
+        return self.recorder(game_index).records()
+
+    def to_frame(self, game_indices: Optional[Sequence[int]] = None,
+                 include_game_index: bool = True) -> pd.DataFrame:
+        """Table des rounds (colonnes de `Game.save_results`) pour les parties demandées."""
+        if game_indices is None:
+            game_indices = range(self.num_games)
+        idx = np.asarray(list(game_indices), dtype=np.int64)
+        rounds = self.rounds
+
+        metadata = [self.metadata(i) for i in idx]
+        df = build_rounds_frame(metadata, rounds, {
+            "round": np.tile(np.arange(1, rounds + 1, dtype=np.int64), len(idx)),
+            "agent1_move": self.moves1[idx].ravel(),
+            "agent1_score": self.scores1[idx].ravel(),
+            "agent1_total_score": self.total_scores1[idx].ravel(),
+            "agent2_move": self.moves2[idx].ravel(),
+            "agent2_score": self.scores2[idx].ravel(),
+            "agent2_total_score": self.total_scores2[idx].ravel(),
+        })
+        if include_game_index:
+            df.insert(0, "game_index", np.repeat(idx, rounds))
+        return df
+
+    def save_game(self, game_index: int, filename: str, verbose: bool = False) -> pd.DataFrame:
+        """Équivalent de `Game.save_results` pour une partie du lot."""
+        df = self.recorder(game_index).to_frame()
+        write_parquet_atomic(df, filename)
+        if verbose:
+            print(f"Results saved to {filename} ({len(df)} rows)")
+        return df
+
+
+def run_strategy_batch(pairs: Sequence[Tuple[StrategyAgent, StrategyAgent]], rounds: int,
+                       seed: Optional[int] = None, use_numba: Optional[bool] = None,
+                       sim_ids: Optional[Sequence[Optional[int]]] = None,
+                       repetitions: Optional[Sequence[int]] = None) -> BatchResult:
+    """
+    Joue toutes les parties `pairs` en parallèle pendant `rounds` rounds.
+
+    Les stratégies sont évaluées par lecture de leurs tables compilées
+    (`strategies.compile_tables`) : la boucle Python ne porte que sur les
+    rounds, jamais sur les parties ni sur les stratégies. Avec
+    `use_numba=True` (défaut : si Numba est installé), toute la boucle est
+    exécutée par un kernel JIT ; les tirages sont alors préalloués
+    (rounds × 2 × parties) mais les résultats sont identiques à seed égale.
+    `sim_ids` et `repetitions` (une valeur par paire) sont l'identité des
+    parties écrite avec leurs rounds, comme pour `Game`.
+    """
+    agents1 = [a for a, _ in pairs]
+    agents2 = [b for _, b in pairs]
+    n = len(pairs)
+    rng = np.random.default_rng(seed)
+
+    names = sorted({a.strategy for a in agents1} | {b.strategy for b in agents2})
+    tables, initial, memory = compile_tables(names)
+    index = {name: i for i, name in enumerate(names)}
+    idx1 = np.array([index[a.strategy] for a in agents1], dtype=np.int64)
+    idx2 = np.array([index[b.strategy] for b in agents2], dtype=np.int64)
+
+    moves1 = np.empty((n, rounds), dtype=np.int8)
+    moves2 = np.empty((n, rounds), dtype=np.int8)
+
+    if use_numba is None:
+        use_numba = _play_kernel_jit is not None
+    if use_numba:
+        if _play_kernel_jit is None:
+            raise ImportError("numba is required for use_numba=True")
+        _play_kernel_jit(tables, initial, memory, idx1, idx2, rng.random((rounds, 2, n)), moves1, moves2)
+        return BatchResult(agents1, agents2, moves1, moves2, sim_ids, repetitions)
+
+    # Registres à décalage des n derniers coups de chaque joueur
+    mask = (1 << memory) - 1
+    bits1 = np.zeros(n, dtype=np.int64)
+    bits2 = np.zeros(n, dtype=np.int64)
+    for t in range(rounds):
+        if t == 0:
+            p1, p2 = initial[idx1], initial[idx2]
+        else:
+            p1 = tables[idx1, (bits1 << memory) | bits2]
+            p2 = tables[idx2, (bits2 << memory) | bits1]
+        u = rng.random((2, n))
+        m1 = (u[0] >= p1).astype(np.int8)
+        m2 = (u[1] >= p2).astype(np.int8)
+        moves1[:, t] = m1
+        moves2[:, t] = m2
+        bits1 = ((bits1 << 1) | m1) & mask
+        bits2 = ((bits2 << 1) | m2) & mask
+
+    return BatchResult(agents1, agents2, moves1, moves2, sim_ids, repetitions)
+
+
+def round_robin(strategy_names: Sequence[str], rounds: int = 200, repetitions: int = 1,
+                seed: Optional[int] = None, use_numba: Optional[bool] = None) -> pd.DataFrame:
+    """
+    Tournoi à la Axelrod : chaque paire de stratégies (y compris contre
+    elle-même) joue `repetitions` parties, toutes simulées en un seul lot.
+
+    Renvoie une ligne par partie : stratégies, répétition et scores finaux.
+    """
+    matchups = [
+        (s1, s2, rep)
+        for i, s1 in enumerate(strategy_names)
+        for s2 in strategy_names[i:]
+        for rep in range(repetitions)
+    ]
+    pairs = [(StrategyAgent(f"Strat_{s1}", s1), StrategyAgent(f"Strat_{s2}", s2)) for s1, s2, _ in matchups]
+    batch = run_strategy_batch(pairs, rounds, seed=seed, use_numba=use_numba,
+                               repetitions=[m[2] for m in matchups])
+    final1, final2 = batch.final_scores()
+    return pd.DataFrame({
+        "strategy1": [m[0] for m in matchups],
+        "strategy2": [m[1] for m in matchups],
+        "repetition": [m[2] for m in matchups],
+        "score1": final1.astype(np.int64),
+        "score2": final2.astype(np.int64),
+    })
+
+
+def tournament_ranking(results: pd.DataFrame) -> pd.DataFrame:
+    """Score moyen par partie de chaque stratégie, du meilleur au moins bon."""
+    both = pd.concat([
+        results[["strategy1", "score1"]].set_axis(["strategy", "score"], axis=1),
+        # Une partie contre soi-même ne compte qu'une fois
+        results.loc[results["strategy1"] != results["strategy2"], ["strategy2", "score2"]]
+        .set_axis(["strategy", "score"], axis=1),
+    ])
+    ranking = both.groupby("strategy")["score"].agg(mean_score="mean", games="count")
+    return ranking.sort_values("mean_score", ascending=False).reset_index()
@@ -0,0 +1,323 @@
+"""
+Schéma compact et versionné des résultats de simulation.
+
+Le format « large » de `Game.save_results` répète sur chaque round le nom,
+le type, le contexte et la température des deux agents, et stocke les coups
+en chaînes 'C' / 'D'. Le format compact sépare :
+
+- `matches` : une ligne par partie (match_id, sim_id, répétition, seed,
+  configuration des deux agents, nombre de rounds, scores finaux) ;
+- `rounds` : match_id (encodé en dictionnaire), round et, en int8, les
+  coups (0 = C, 1 = D) et les gains de chaque round.
+
+Les deux tables sont des répertoires de fichiers parquet (zstd) sous
+`<résultats>/compact/matches` et `<résultats>/compact/rounds` ; la version
+du schéma est inscrite dans les métadonnées de chaque fichier.
+`load_results` relit indifféremment les deux formats et renvoie la table
+large habituelle, précédée des colonnes d'identité (match_id, sim_id,
+repetition). Pour les fichiers larges écrits avant ces colonnes, elles sont
+reprises du nom de fichier `vs_<match_id>_<sim_id>.parquet` quand c'est
+possible, sinon laissées nulles.
+
+Versions : v1 sans colonne `repetition` (lue comme 0), v2 actuelle.
+
+Conversion d'un répertoire existant :
+
+    python compact_schema.py results --output results/compact --delete-source
+"""
+import argparse
+import glob
+import os
+import re
+from typing import List, Optional, Tuple
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from game_engine import MOVE_CODES, ROUND_COLUMNS, MATCH_IDENTITY_COLUMNS, make_match_id
+
+SCHEMA_VERSION = 2
+SCHEMA_VERSION_KEY = b"ipd_schema_version"
+COMPACT_DIRNAME = "compact"
+COMPRESSION = "zstd"
+
+_VERSION_METADATA = {SCHEMA_VERSION_KEY: str(SCHEMA_VERSION).encode()}
+
+MATCHES_SCHEMA = pa.schema([
+    ("match_id", pa.string()),
+    ("sim_id", pa.int64()),
+    ("repetition", pa.int32()),
+    ("seed", pa.int64()),
+    ("agent1_name", pa.string()),
+    ("agent1_type", pa.string()),
+    ("agent1_context_mentioned", pa.bool_()),
+    ("agent1_temperature", pa.float64()),
+    ("agent2_name", pa.string()),
+    ("agent2_type", pa.string()),
+    ("agent2_context_mentioned", pa.bool_()),
+    ("agent2_temperature", pa.float64()),
+    ("rounds", pa.int32()),
+    ("agent1_total_score", pa.int32()),
+    ("agent2_total_score", pa.int32()),
+], metadata=_VERSION_METADATA)
+
+ROUNDS_SCHEMA = pa.schema([
+    ("match_id", pa.dictionary(pa.int32(), pa.string())),
+    ("round", pa.int32()),
+    ("agent1_move", pa.int8()),
+    ("agent2_move", pa.int8()),
+    ("agent1_score", pa.int8()),
+    ("agent2_score", pa.int8()),
+], metadata=_VERSION_METADATA)
+
+_AGENT_COLUMNS = [
+    "agent1_name", "agent1_type", "agent1_context_mentioned", "agent1_temperature",
+    "agent2_name", "agent2_type", "agent2_context_mentioned", "agent2_temperature",
+]
+
+_SIM_ID_PATTERN = re.compile(r"_(\d+)\.parquet$")
+
+
+def split_wide(df: pd.DataFrame, sim_id: Optional[int] = None, seed: Optional[int] = None,
+               source: str = "") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Découpe une table large (une ou plusieurs parties, chacune recommençant
+    au round 1) en tables `matches` et `rounds`.
+
+    L'identité des parties est lue dans les colonnes match_id / sim_id /
+    repetition si elles existent. Sinon `sim_id` s'applique à toutes les
+    parties de la table et, à défaut, l'identifiant est dérivé de `source`
+    et du rang de la partie dans la table.
+    """
+    game = (df["round"].to_numpy() == 1).cumsum() - 1
+    starts = np.flatnonzero(df["round"].to_numpy() == 1)
+    ends = np.append(starts[1:], len(df)) - 1
+
+    first = df.iloc[starts]
+    last = df.iloc[ends]
+    if "match_id" in df.columns and first["match_id"].notna().all():
+        match_ids = first["match_id"].tolist()
+        sim_ids = first["sim_id"].tolist()
+        repetitions = first["repetition"].fillna(0).tolist()
+    else:
+        match_ids = [
+            make_match_id(a1, a2, sim_id if sim_id is not None else f"{source}#{k}")
+            for k, (a1, a2) in enumerate(zip(first["agent1_name"], first["agent2_name"]))
+        ]
+        sim_ids = [sim_id] * len(starts)
+        repetitions = [0] * len(starts)
+    matches = pd.DataFrame({
+        "match_id": match_ids,
+        "sim_id": pd.array(sim_ids, dtype="Int64"),
+        "repetition": np.asarray(repetitions, dtype=np.int32),
+        "seed": pd.array([seed] * len(starts), dtype="Int64"),
+        **{col: first[col].to_numpy() for col in _AGENT_COLUMNS},
+        "rounds": (ends - starts + 1).astype(np.int32),
+        "agent1_total_score": last["agent1_total_score"].to_numpy().astype(np.int32),
+        "agent2_total_score": last["agent2_total_score"].to_numpy().astype(np.int32),
+    })
+    rounds = pd.DataFrame({
+        "match_id": np.asarray(match_ids, dtype=object)[game],
+        "round": df["round"].to_numpy().astype(np.int32),
+        "agent1_move": df["agent1_move"].map(MOVE_CODES).to_numpy().astype(np.int8),
+        "agent2_move": df["agent2_move"].map(MOVE_CODES).to_numpy().astype(np.int8),
+        "agent1_score": df["agent1_score"].to_numpy().astype(np.int8),
+        "agent2_score": df["agent2_score"].to_numpy().astype(np.int8),
+    })
+    return matches, rounds
+
+
+def _write_table(df: pd.DataFrame, schema: pa.Schema, path: str):
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression=COMPRESSION, use_dictionary=True,
+                   row_group_size=max(table.num_rows, 1))
+    os.replace(tmp_path, path)
+
+
+def write_compact(matches: pd.DataFrame, rounds: pd.DataFrame, directory: str, part_name: str) -> str:
+    """
+    Écrit une partie des tables compactes (`<directory>/{matches,rounds}/<part_name>.parquet`).
+
+    Les rounds sont publiés avant les parties : une lecture concurrente
+    (jointure interne) ne voit jamais une partie sans ses rounds.
+    Renvoie le chemin du fichier `rounds`.
+    """
+    rounds_path = os.path.join(directory, "rounds", f"{part_name}.parquet")
+    _write_table(rounds, ROUNDS_SCHEMA, rounds_path)
+    _write_table(matches, MATCHES_SCHEMA, os.path.join(directory, "matches", f"{part_name}.parquet"))
+    return rounds_path
+
+
+def schema_version(path: str) -> int:
+    metadata = pq.read_schema(path).metadata or {}
+    return int(metadata.get(SCHEMA_VERSION_KEY, b"0"))
+
+
+def _check_version(directory: str):
+    for path in glob.glob(os.path.join(directory, "*", "*.parquet"))[:1]:
+        version = schema_version(path)
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"{path} uses compact schema v{version}, this loader supports up to v{SCHEMA_VERSION}")
+
+
+_WIDE_FROM_COMPACT = """
+SELECT
+    m.match_id, m.sim_id::BIGINT AS sim_id, {repetition}::BIGINT AS repetition,
+    r.round::BIGINT AS round,
+    m.agent1_name, m.agent1_type, m.agent1_context_mentioned, m.agent1_temperature,
+    CASE r.agent1_move WHEN 0 THEN 'C' ELSE 'D' END AS agent1_move,
+    r.agent1_score::BIGINT AS agent1_score,
+    SUM(r.agent1_score) OVER (PARTITION BY r.match_id ORDER BY r.round)::BIGINT AS agent1_total_score,
+    m.agent2_name, m.agent2_type, m.agent2_context_mentioned, m.agent2_temperature,
+    CASE r.agent2_move WHEN 0 THEN 'C' ELSE 'D' END AS agent2_move,
+    r.agent2_score::BIGINT AS agent2_score,
+    SUM(r.agent2_score) OVER (PARTITION BY r.match_id ORDER BY r.round)::BIGINT AS agent2_total_score{source}
+FROM read_parquet({rounds}, filename = true) r
+JOIN read_parquet({matches}, union_by_name = true) m ON CAST(r.match_id AS VARCHAR) = m.match_id
+"""
+
+# Fichiers larges sans colonnes d'identité : reprises du nom vs_<match_id>_<sim_id>.parquet
+_LEGACY_IDENTITY = {
+    "match_id": "NULLIF(regexp_extract(filename, 'vs_([0-9a-f]{8})_[0-9]+\\.parquet$', 1), '')",
+    "sim_id": "TRY_CAST(NULLIF(regexp_extract(filename, 'vs_[0-9a-f]{8}_([0-9]+)\\.parquet$', 1), '') AS BIGINT)",
+    "repetition": "0",
+}
+_IDENTITY_TYPES = {"match_id": "VARCHAR", "sim_id": "BIGINT", "repetition": "BIGINT"}
+
+
+def _sql_paths(paths: List[str]) -> str:
+    """Liste de chemins en littéral SQL pour read_parquet."""
+    return "[" + ", ".join("'" + path.replace("'", "''") + "'" for path in paths) + "]"
+
+
+def _wide_query(paths: str, con: duckdb.DuckDBPyConnection, with_source: bool = False) -> str:
+    source = f"read_parquet({paths}, union_by_name = true, filename = true)"
+    columns = set(con.execute(f"DESCRIBE SELECT * FROM {source}").fetchdf()["column_name"])
+    identity = []
+    for col in MATCH_IDENTITY_COLUMNS:
+        expr = f"COALESCE({col}, {_LEGACY_IDENTITY[col]})" if col in columns else _LEGACY_IDENTITY[col]
+        identity.append(f"{expr}::{_IDENTITY_TYPES[col]} AS {col}")
+    source_column = ["filename AS source_file"] if with_source else []
+    return f"SELECT {', '.join(identity + ROUND_COLUMNS + source_column)} FROM {source}"
+
+
+def source_files(results_dir: str = "results") -> List[str]:
+    """
+    Fichiers lus par `load_results` : parquets larges et parties `rounds`
+    compactes. Une partie dont le fichier `matches` n'est pas encore publié
+    (écriture en cours par un sweep) est ignorée jusqu'au run suivant.
+    """
+    compact_dir = os.path.join(results_dir, COMPACT_DIRNAME)
+    rounds_files = [path for path in sorted(glob.glob(os.path.join(compact_dir, "rounds", "*.parquet")))
+                    if os.path.exists(os.path.join(compact_dir, "matches", os.path.basename(path)))]
+    return sorted(glob.glob(os.path.join(results_dir, "*.parquet"))) + rounds_files
+
+
+def results_query(results_dir: str = "results", con: Optional[duckdb.DuckDBPyConnection] = None,
+                  files: Optional[List[str]] = None, with_source: bool = False) -> str:
+    """
+    Requête SQL (non triée) de la table large de tous les rounds de
+    `results_dir` : fichiers au format large (`*.parquet`) et tables
+    compactes (`compact/`).
+
+    `files` restreint la lecture à un sous-ensemble de `source_files()`
+    (une partie `rounds` compacte est lue avec sa partie `matches`) ;
+    `with_source` ajoute la colonne `source_file` (fichier d'origine).
+    """
+    con = con if con is not None else duckdb.connect()
+    compact_dir = os.path.join(results_dir, COMPACT_DIRNAME)
+    rounds_dir = os.path.normpath(os.path.join(compact_dir, "rounds"))
+    if files is None:
+        files = source_files(results_dir)
+    is_rounds = [os.path.normpath(os.path.dirname(path)) == rounds_dir for path in files]
+    rounds_files = [path for path, compact in zip(files, is_rounds) if compact]
+    wide_files = [path for path, compact in zip(files, is_rounds) if not compact]
+    sources = []
+    if wide_files:
+        sources.append(_wide_query(_sql_paths(wide_files), con, with_source))
+    if rounds_files:
+        _check_version(compact_dir)
+        matches = _sql_paths([os.path.join(compact_dir, "matches", os.path.basename(path)) for path in rounds_files])
+        columns = set(con.execute(
+            f"DESCRIBE SELECT * FROM read_parquet({matches}, union_by_name = true)").fetchdf()["column_name"])
+        sources.append(_WIDE_FROM_COMPACT.format(
+            rounds=_sql_paths(rounds_files),
+            matches=matches,
+            # Schéma v1 : pas de colonne repetition
+            repetition="COALESCE(m.repetition, 0)" if "repetition" in columns else "0",
+            source=",\n    r.filename AS source_file" if with_source else "",
+        ))
+    if not sources:
+        raise FileNotFoundError(f"No results found in {results_dir}")
+    return "\nUNION ALL\n".join(sources)
+
+
+def load_results(results_dir: str = "results", con: Optional[duckdb.DuckDBPyConnection] = None,
+                 files: Optional[List[str]] = None, with_source: bool = False) -> pd.DataFrame:
+    """
+    Table large de tous les rounds de `results_dir` (voir `results_query`),
+    triée par agent1_name, agent2_name, sim_id, match_id, round.
+    """
+    con = con if con is not None else duckdb.connect()
+    query = results_query(results_dir, con, files, with_source)
+    return con.execute(query + "\nORDER BY agent1_name, agent2_name, sim_id, match_id, round").fetchdf()
+
+
+def convert_directory(source_dir: str, output_dir: str, delete_source: bool = False,
+                      batch_files: int = 500) -> Tuple[int, int]:
+    """
+    Convertit les parquets larges de `source_dir` en tables compactes.
+
+    Les fichiers sont regroupés par `batch_files` dans chaque fichier de
+    sortie. Renvoie (parties, rounds) convertis.
+    """
+    files = sorted(glob.glob(os.path.join(source_dir, "*.parquet")))
+    total_matches = total_rounds = 0
+    for start in range(0, len(files), batch_files):
+        batch = files[start:start + batch_files]
+        matches_parts: List[pd.DataFrame] = []
+        rounds_parts: List[pd.DataFrame] = []
+        for path in batch:
+            df = pd.read_parquet(path)
+            if df.empty:
+                continue
+            found = _SIM_ID_PATTERN.search(os.path.basename(path))
+            sim_id = int(found.group(1)) if found and os.path.basename(path).startswith("vs_") else None
+            matches, rounds = split_wide(df, sim_id=sim_id, source=os.path.basename(path))
+            matches_parts.append(matches)
+            rounds_parts.append(rounds)
+        if not matches_parts:
+            continue
+        matches = pd.concat(matches_parts, ignore_index=True)
+        rounds = pd.concat(rounds_parts, ignore_index=True)
+        write_compact(matches, rounds, output_dir, f"converted-{start // batch_files:05d}")
+        total_matches += len(matches)
+        total_rounds += len(rounds)
+        if delete_source:
+            for path in batch:
+                os.remove(path)
+    return total_matches, total_rounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Conversion des résultats au format compact")
+    parser.add_argument("source_dir", nargs="?", default="results")
+    parser.add_argument("--output", default=None,
+                        help="Répertoire des tables compactes (défaut : <source_dir>/compact)")
+    parser.add_argument("--delete-source", action="store_true",
+                        help="Supprimer les parquets larges une fois convertis")
+    args = parser.parse_args(argv)
+    output_dir = args.output or os.path.join(args.source_dir, COMPACT_DIRNAME)
+    if not args.delete_source and os.path.abspath(os.path.dirname(output_dir)) == os.path.abspath(args.source_dir):
+        print("⚠️  Sans --delete-source, load_results lira les données en double (format large et compact)")
+    matches, rounds = convert_directory(args.source_dir, output_dir, args.delete_source)
+    print(f"✓ {matches:,} parties / {rounds:,} rounds convertis dans {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,673 @@
+"""
+Pipeline d'enrichissement des résultats (version module de `transform.ipynb`).
+
+Chaque section du notebook est une étape qui ajoute des colonnes à la table
+des rounds, sans rappel Python par ligne ni par partie :
+
+- les classifications qui ne dépendent que de l'agent (rôle attendu,
+  famille) ou d'un couple de catégories (score de conformité) sont
+  calculées une fois par valeur distincte puis projetées via les codes de
+  `pd.factorize` ;
+- les seuils (tranche de température, motif de comportement, issue du
+  match) passent par `np.select` ;
+- les indicateurs dépendant des rounds précédents utilisent des `shift` et
+  des sommes cumulées groupés par match_id.
+
+La sortie est identique, octet pour octet, à celle du notebook :
+
+    python enrich.py --results results --output enriched_data/enriched_games_full.parquet
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from compact_schema import load_results, source_files
+from enrich_state import ENRICH_STATE_FILENAME, EnrichState, file_signature
+from match_features import RETALIATION_MEMORY
+
+EXPECTED_ROUNDS = 200
+DEFAULT_OUTPUT = os.path.join("enriched_data", "enriched_games_full.parquet")
+DEFAULT_OUTPUT_DIR = "enriched_data"
+
+# Mode incrémental : une partition parquet par run sous <sortie>/enriched_games
+PARTITIONS_DIRNAME = "enriched_games"
+
+# À incrémenter quand les règles d'enrichissement changent (recalcul complet)
+ENRICH_VERSION = 1
+
+# Mode parallèle : partitions de matchs par worker (équilibrage de charge)
+SHARDS_PER_WORKER = 4
+
+
+IDENTITY_KEYS = [
+    "agent1_name", "agent2_name",
+    "agent1_context_mentioned", "agent2_context_mentioned",
+    "agent1_temperature", "agent2_temperature",
+]
+
+FINAL_COLUMNS = [
+    "match_id", "sim_id", "repetition", "round_id",
+    "agent1_family", "agent2_family",
+    "agent1_role_expected", "agent2_role_expected",
+    "agent1_context_used_flag", "agent2_context_used_flag",
+    "agent1_temperature_bucket", "agent2_temperature_bucket",
+    "agent1_is_cooperation", "agent1_is_defection",
+    "agent2_is_cooperation", "agent2_is_defection",
+    "agent1_retaliation_flag", "agent1_retaliation_flag_memories", "agent1_forgiveness_flag",
+    "agent2_retaliation_flag", "agent2_retaliation_flag_memories", "agent2_forgiveness_flag",
+    "agent1_behavior_pattern", "agent2_behavior_pattern",
+    "agent1_match_score", "agent2_match_score",
+    "agent1_match_cooperation_rate", "agent2_match_cooperation_rate",
+    "agent1_conformity_score", "agent2_conformity_score",
+    "match_outcome",
+]
+
+# Motif de comportement observé -> rôle attendu -> score de conformité
+CONFORMITY_MAP: Dict[str, Dict[str, float]] = {
+    # Coded strategies
+    "tit_for_tat": {
+        "tit_for_tat": 1.0,
+        "tit_for_tat_prompted": 0.9,
+        "conditional_cooperator": 0.8,
+        "balanced": 0.6,
+    },
+    "cooperative": {
+        "cooperative": 1.0,
+        "cooperative_prompted": 0.9,
+        "faithful_cooperator": 0.95,
+        "conditional_cooperator": 0.7,
+    },
+    "defecting": {
+        "defecting": 1.0,
+        "defecting_prompted": 0.9,
+        "systematic_defector": 0.95,
+    },
+    "random": {
+        "random": 1.0,
+        "random_prompted": 0.9,
+        "chaotic": 0.85,
+    },
+    "grim_trigger": {
+        "grim_trigger": 1.0,
+        "grudge_prompted": 0.85,
+        "tit_for_tat_like": 0.7,
+    },
+    # Observed behavior patterns to role matching
+    "faithful_cooperator": {
+        "cooperative": 1.0,
+        "cooperative_prompted": 0.95,
+        "tit_for_tat": 0.6,
+        "conditional_cooperator": 0.7,
+    },
+    "systematic_defector": {
+        "defecting": 1.0,
+        "defecting_prompted": 0.95,
+        "random": 0.5,
+    },
+    "tit_for_tat_like": {
+        "tit_for_tat": 1.0,
+        "tit_for_tat_prompted": 0.95,
+        "grim_trigger": 0.8,
+        "conditional_cooperator": 0.7,
+    },
+    "conditional_cooperator": {
+        "tit_for_tat": 0.8,
+        "tit_for_tat_prompted": 0.8,
+        "cooperative": 0.7,
+        "cooperative_prompted": 0.7,
+        "self_interested_prompted": 0.6,
+    },
+    "chaotic": {
+        "random": 1.0,
+        "random_prompted": 0.95,
+        "unknown_llm": 0.6,
+        "self_interested_prompted": 0.5,
+    },
+    "balanced": {
+        "tit_for_tat": 0.8,
+        "tit_for_tat_prompted": 0.8,
+        "conditional_cooperator": 0.7,
+        "self_interested_prompted": 0.6,
+        "unknown_llm": 0.5,
+    },
+}
+DEFAULT_CONFORMITY = 0.2
+
+
+# --- Règles par valeur (appelées une fois par valeur distincte) ---
+
+def classify_expected_role(agent_name: str, agent_type: str) -> str:
+    """
+    Rôle attendu d'après le nom et le type de l'agent.
+
+    Strategy agents: Strat_* (coded strategies)
+    LLM agents: O_<model>_<strategy>_<context>_<temperature>
+    """
+    name_lower = agent_name.lower()
+
+    if agent_type == "Strategy":
+        if "tit_for_tat" in name_lower:
+            return "tit_for_tat"
+        elif "always_defect" in name_lower:
+            return "defecting"
+        elif "always_cooperate" in name_lower:
+            return "cooperative"
+        elif "grim_trigger" in name_lower:
+            return "grim_trigger"
+        elif "random" in name_lower:
+            return "random"
+        else:
+            return "unknown_coded"
+    else:
+        # Strategies: tit_, coop_, defa_, rand_, grud_, self_
+        if "tit_" in name_lower:
+            return "tit_for_tat_prompted"
+        elif "coop_" in name_lower:
+            return "cooperative_prompted"
+        elif "defa_" in name_lower:
+            return "defecting_prompted"
+        elif "rand_" in name_lower:
+            return "random_prompted"
+        elif "grud_" in name_lower:
+            return "grudge_prompted"
+        elif "self_" in name_lower:
+            return "self_interested_prompted"
+        else:
+            return "unknown_llm"
+
+
+def extract_agent_family(agent_name: str, agent_type: str) -> str:
+    """Famille du modèle : 'coded', 'qwen', 'gemma' ou 'unknown_llm'."""
+    if agent_type == "Strategy":
+        return "coded"
+    name_lower = agent_name.lower()
+    if "qwen" in name_lower:
+        return "qwen"
+    elif "gemma" in name_lower:
+        return "gemma"
+    else:
+        return "unknown_llm"
+
+
+def compute_conformity_score(observed_pattern: str, expected_role: str) -> float:
+    """Conformité entre motif observé et rôle attendu : 1.0 (parfaite) à 0.2 (aucune)."""
+    return CONFORMITY_MAP.get(observed_pattern, {}).get(expected_role, DEFAULT_CONFORMITY)
+
+
+def _map_pairs(a: pd.Series, b: pd.Series, func: Callable) -> np.ndarray:
+    """`func(a, b)` évaluée une fois par couple distinct puis projetée sur toutes les lignes."""
+    codes_a, uniques_a = pd.factorize(a, use_na_sentinel=False)
+    codes_b, uniques_b = pd.factorize(b, use_na_sentinel=False)
+    # Un code par couple, par hachage (pas de tri des lignes)
+    width = max(len(uniques_b), 1)
+    pair_codes, pairs = pd.factorize(codes_a.astype(np.int64) * width + codes_b)
+    values = np.array([func(uniques_a[pair // width], uniques_b[pair % width]) for pair in pairs], dtype=object)
+    return values[pair_codes]
+
+
+# --- Étapes (sections du notebook) ---
+
+def load_raw(results_dir: str = "results", con: Optional[duckdb.DuckDBPyConnection] = None) -> pd.DataFrame:
+    """Section 1 : table large de tous les rounds."""
+    return load_results(results_dir, con)
+
+
+def legacy_match_ids(keys: pd.DataFrame) -> List[str]:
+    """Identifiant de chaque configuration d'agents (IDENTITY_KEYS) écrite sans match_id."""
+    return [hashlib.md5(str(key).encode()).hexdigest()[:8]
+            for key in keys[IDENTITY_KEYS].itertuples(index=False, name=None)]
+
+
+def assign_match_ids(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Section 2 : match_id écrit avec les résultats ; les lignes qui n'en ont
+    pas reçoivent un identifiant par configuration d'agents (un hash par
+    groupe). Ajoute round_id.
+    """
+    missing_id = df_raw["match_id"].isna()
+    if missing_id.any():
+        legacy = df_raw.loc[missing_id, IDENTITY_KEYS]
+        groups = legacy.drop_duplicates().copy()
+        groups["legacy_match_id"] = legacy_match_ids(groups)
+        df_raw.loc[missing_id, "match_id"] = legacy.merge(groups, on=IDENTITY_KEYS, how="left")["legacy_match_id"].to_numpy()
+    df_raw["round_id"] = df_raw.groupby("match_id").cumcount() + 1
+    return df_raw
+
+
+def keep_complete_matches(df_raw: pd.DataFrame, rounds: int = EXPECTED_ROUNDS) -> pd.DataFrame:
+    """Section 2 : ne garde que les matchs d'exactement `rounds` rounds."""
+    match_round_counts = df_raw.groupby("match_id")["round_id"].max()
+    valid_matches = match_round_counts[match_round_counts == rounds]
+    return df_raw[df_raw["match_id"].isin(valid_matches.index)].copy()
+
+
+def add_roles(df: pd.DataFrame) -> pd.DataFrame:
+    """Section 3 : rôle attendu de chaque agent."""
+    for agent in ("agent1", "agent2"):
+        df[f"{agent}_role_expected"] = _map_pairs(df[f"{agent}_name"], df[f"{agent}_type"], classify_expected_role)
+    return df
+
+
+def add_move_flags(df: pd.DataFrame) -> pd.DataFrame:
+    """Section 4 : indicateurs 0/1 de coopération et de défection."""
+    for agent in ("agent1", "agent2"):
+        df[f"{agent}_is_cooperation"] = (df[f"{agent}_move"] == "C").astype(int)
+        df[f"{agent}_is_defection"] = (df[f"{agent}_move"] == "D").astype(int)
+    return df
+
+
+def add_retaliation_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Section 5 : représailles / pardon après une défection adverse au round
+    précédent, et représailles après au moins une défection adverse dans
+    les RETALIATION_MEMORY rounds précédents.
+    """
+    by_match = df["match_id"]
+    for agent, opponent in (("agent1", "agent2"), ("agent2", "agent1")):
+        defects = (df[f"{agent}_move"] == "D").to_numpy()
+        cooperates = (df[f"{agent}_move"] == "C").to_numpy()
+        opponent_defects = (df[f"{opponent}_move"] == "D").astype(np.int64)
+
+        prev_opponent_defected = (opponent_defects.groupby(by_match).shift(1) == 1).to_numpy()
+        df[f"{agent}_retaliation_flag"] = (prev_opponent_defected & defects).astype(int)
+        df[f"{agent}_forgiveness_flag"] = (prev_opponent_defected & cooperates).astype(int)
+
+        # Défections adverses sur les rounds [t - N, t - 1] = différence de deux
+        # sommes cumulées décalées
+        cumulative = opponent_defects.groupby(by_match).cumsum()
+        grouped = cumulative.groupby(by_match)
+        in_window = grouped.shift(1).fillna(0) - grouped.shift(RETALIATION_MEMORY + 1).fillna(0)
+        df[f"{agent}_retaliation_flag_memories"] = ((in_window > 0).to_numpy() & defects).astype(int)
+    return df
+
+
+def behavior_patterns(coop_rate: np.ndarray, retaliation_rate: np.ndarray,
+                      forgiveness_rate: np.ndarray, decision_std: np.ndarray) -> np.ndarray:
+    """
+    Motif de comportement d'après les taux (en %) et l'écart-type des décisions.
+
+    - faithful_cooperator: High cooperation, low retaliation, high forgiveness
+    - systematic_defector: Low cooperation, high retaliation
+    - tit_for_tat_like: Medium cooperation, high retaliation, high forgiveness
+    - conditional_cooperator: Medium-high cooperation, reactive
+    - chaotic: High variance, unpredictable
+    """
+    conditions = [
+        coop_rate > 75,
+        coop_rate < 30,
+        (coop_rate > 60) & (retaliation_rate > 40) & (forgiveness_rate > 30),
+        (coop_rate > 50) & (decision_std > 0.3),
+        decision_std > 0.4,
+    ]
+    choices = ["faithful_cooperator", "systematic_defector", "tit_for_tat_like",
+               "conditional_cooperator", "chaotic"]
+    return np.select(conditions, choices, default="balanced").astype(object)
+
+
+def add_behavior_patterns(df: pd.DataFrame) -> pd.DataFrame:
+    """Section 6 : motif de comportement de chaque agent sur son match."""
+    grouped = df.groupby("match_id")
+    for agent in ("agent1", "agent2"):
+        stats = grouped.agg(
+            coop=(f"{agent}_is_cooperation", "mean"),
+            retaliation=(f"{agent}_retaliation_flag", "mean"),
+            forgiveness=(f"{agent}_forgiveness_flag", "mean"),
+            std=(f"{agent}_is_cooperation", "std"),
+        )
+        patterns = pd.Series(
+            behavior_patterns(
+                stats["coop"].to_numpy() * 100,
+                stats["retaliation"].to_numpy() * 100,
+                stats["forgiveness"].to_numpy() * 100,
+                stats["std"].to_numpy(),
+            ),
+            index=stats.index,
+        )
+        df[f"{agent}_behavior_pattern"] = df["match_id"].map(patterns).to_numpy()
+    return df.reset_index(drop=True)
+
+
+def match_outcomes(df: pd.DataFrame) -> pd.DataFrame:
+    """Section 7 : une ligne par match (scores, taux de coopération en %, issue)."""
+    outcomes = df.groupby("match_id").agg(
+        agent1_match_score=("agent1_score", "sum"),
+        agent2_match_score=("agent2_score", "sum"),
+        agent1_match_cooperation_rate=("agent1_is_cooperation", "mean"),
+        agent2_match_cooperation_rate=("agent2_is_cooperation", "mean"),
+    ).reset_index()
+    score1 = outcomes["agent1_match_score"].to_numpy()
+    score2 = outcomes["agent2_match_score"].to_numpy()
+    outcomes["match_outcome"] = np.select(
+        [score1 > score2, score2 > score1], ["agent1_win", "agent2_win"], default="draw"
+    ).astype(object)
+    outcomes["agent1_match_cooperation_rate"] = outcomes["agent1_match_cooperation_rate"] * 100
+    outcomes["agent2_match_cooperation_rate"] = outcomes["agent2_match_cooperation_rate"] * 100
+    return outcomes
+
+
+def add_match_outcomes(df: pd.DataFrame, outcomes: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    if outcomes is None:
+        outcomes = match_outcomes(df)
+    return df.merge(outcomes, on="match_id", how="left")
+
+
+def temperature_buckets(agent_type: pd.Series, temperature: pd.Series) -> np.ndarray:
+    """'coded' pour les stratégies, sinon low (<= 0.7), medium (<= 1.0), high ou unknown."""
+    temperature = temperature.to_numpy(dtype=np.float64, na_value=np.nan)
+    conditions = [
+        (agent_type == "Strategy").to_numpy(),
+        np.isnan(temperature),
+        temperature <= 0.7,
+        temperature <= 1.0,
+    ]
+    return np.select(conditions, ["coded", "unknown", "low", "medium"], default="high").astype(object)
+
+
+def add_context_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Section 8 : contexte, tranche de température et famille de modèle."""
+    for agent in ("agent1", "agent2"):
+        df[f"{agent}_context_used_flag"] = df[f"{agent}_context_mentioned"].astype(int)
+    for agent in ("agent1", "agent2"):
+        df[f"{agent}_temperature_bucket"] = temperature_buckets(df[f"{agent}_type"], df[f"{agent}_temperature"])
+    for agent in ("agent1", "agent2"):
+        df[f"{agent}_family"] = _map_pairs(df[f"{agent}_name"], df[f"{agent}_type"], extract_agent_family)
+    return df
+
+
+def add_conformity_scores(df: pd.DataFrame) -> pd.DataFrame:
+    """Section 9 : conformité du motif observé au rôle attendu."""
+    for agent in ("agent1", "agent2"):
+        df[f"{agent}_conformity_score"] = _map_pairs(
+            df[f"{agent}_behavior_pattern"], df[f"{agent}_role_expected"], compute_conformity_score
+        ).astype(np.float64)
+    return df
+
+
+def enrich(df_raw: pd.DataFrame, rounds: int = EXPECTED_ROUNDS) -> pd.DataFrame:
+    """Sections 2 à 9 : table des rounds enrichie (toutes colonnes)."""
+    df = keep_complete_matches(assign_match_ids(df_raw), rounds)
+    df = add_roles(df)
+    df = add_move_flags(df)
+    df = add_retaliation_metrics(df)
+    df = add_behavior_patterns(df)
+    df = add_match_outcomes(df)
+    df = add_context_features(df)
+    df = add_conformity_scores(df)
+    return df
+
+
+def final_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Section 10 : colonnes exportées."""
+    return df[FINAL_COLUMNS].copy()
+
+
+def export(df_final: pd.DataFrame, output_file: str = DEFAULT_OUTPUT):
+    os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else ".", exist_ok=True)
+    df_final.to_parquet(output_file, index=False)
+
+
+def run(results_dir: str = "results", output_file: str = DEFAULT_OUTPUT,
+        rounds: int = EXPECTED_ROUNDS) -> pd.DataFrame:
+    df_final = final_frame(enrich(load_raw(results_dir), rounds))
+    export(df_final, output_file)
+    return df_final
+
+
+def shard_matches(match_ids: pd.Series, shards: int) -> np.ndarray:
+    """
+    Partition de chaque ligne : des plages contiguës de matchs, dans l'ordre
+    de première apparition, si bien que la concaténation des partitions
+    suit l'ordre des lignes.
+    """
+    codes, uniques = pd.factorize(match_ids)
+    return codes * shards // max(len(uniques), 1)
+
+
+def _read_ipc(path: str) -> pa.Table:
+    # Fichier IPC projeté en mémoire : les colonnes pointent dans le fichier (pas de copie)
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _write_ipc(table: pa.Table, path: str):
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _enrich_shard(job: Tuple[str, str, int]) -> Optional[str]:
+    """Worker : enrichit une partition (fichier IPC) et écrit le résultat à côté."""
+    shard_path, output_path, rounds = job
+    df = enrich(_read_ipc(shard_path).to_pandas(), rounds)
+    if df.empty:
+        return None
+    table = pa.Table.from_pandas(final_frame(df), preserve_index=False)
+    _write_ipc(table.append_column("_position", pa.array(df["_position"].to_numpy())), output_path)
+    return output_path
+
+
+def enrich_parallel(df_raw: pd.DataFrame, output_file: str = DEFAULT_OUTPUT, rounds: int = EXPECTED_ROUNDS,
+                    workers: Optional[int] = None, tmp_dir: Optional[str] = None) -> int:
+    """
+    Sections 2 à 10 réparties sur `workers` processus, écrites dans
+    `output_file` ; renvoie le nombre de lignes.
+
+    Les matchs sont découpés en partitions (toutes les étapes sont internes
+    à un match), échangées avec les workers en fichiers Arrow IPC projetés
+    en mémoire, puis concaténées dans l'ordre des lignes de `df_raw`. Le
+    fichier est identique à celui de `run`.
+    """
+    workers = workers or os.cpu_count() or 1
+    df_raw = assign_match_ids(df_raw)
+    df_raw["_position"] = np.arange(len(df_raw))
+    shards = shard_matches(df_raw["match_id"], workers * SHARDS_PER_WORKER)
+
+    with tempfile.TemporaryDirectory(prefix="enrich-", dir=tmp_dir) as work_dir:
+        jobs = []
+        for shard in np.unique(shards):
+            shard_path = os.path.join(work_dir, f"shard-{shard:05d}.arrow")
+            _write_ipc(pa.Table.from_pandas(df_raw[shards == shard], preserve_index=False), shard_path)
+            jobs.append((shard_path, os.path.join(work_dir, f"enriched-{shard:05d}.arrow"), rounds))
+        del df_raw
+
+        with multiprocessing.Pool(max(1, min(workers, len(jobs)))) as pool:
+            outputs = [path for path in pool.map(_enrich_shard, jobs) if path]
+        if outputs:
+            table = pa.concat_tables([_read_ipc(path) for path in outputs])
+            positions = table.column("_position").to_numpy()
+            table = table.drop_columns(["_position"])
+            # Des matchs hérités (sans match_id écrit) peuvent s'entrelacer
+            if len(positions) > 1 and not (np.diff(positions) > 0).all():
+                table = table.take(pa.array(np.argsort(positions, kind="stable")))
+        else:
+            table = pa.Table.from_pandas(pd.DataFrame(columns=FINAL_COLUMNS), preserve_index=False)
+        os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else ".", exist_ok=True)
+        pq.write_table(table, output_file)
+        return table.num_rows
+
+
+def run_parallel(results_dir: str = "results", output_file: str = DEFAULT_OUTPUT,
+                 rounds: int = EXPECTED_ROUNDS, workers: Optional[int] = None) -> int:
+    return enrich_parallel(load_raw(results_dir), output_file, rounds, workers)
+
+
+def _write_partition(df: pd.DataFrame, path: str):
+    # Nom temporaire caché : ignoré par les lectures du répertoire
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def run_incremental(results_dir: str = "results", output_dir: str = DEFAULT_OUTPUT_DIR,
+                    rounds: int = EXPECTED_ROUNDS) -> Dict[str, int]:
+    """
+    Enrichit seulement les matchs des fichiers sources nouveaux ou modifiés
+    depuis le dernier run, et les ajoute en une nouvelle partition sous
+    `<output_dir>/enriched_games`.
+
+    Un match déjà enrichi qui reçoit de nouvelles lignes (ou perd un
+    fichier source) est recalculé à partir de tous ses fichiers sources et
+    retiré de son ancienne partition : toutes les étapes étant par match,
+    les autres matchs ne sont pas relus.
+    """
+    partitions_dir = os.path.join(output_dir, PARTITIONS_DIRNAME)
+    os.makedirs(partitions_dir, exist_ok=True)
+    state = EnrichState(os.path.join(output_dir, ENRICH_STATE_FILENAME))
+    stats = {"files": 0, "matches": 0, "recomputed": 0, "rows": 0}
+    try:
+        config = {"rounds": str(rounds), "version": str(ENRICH_VERSION)}
+        if state.config() != config:
+            state.reset(config)
+
+        # Partitions écrites par un run interrompu avant la mise à jour de l'état
+        referenced = state.partitions()
+        for name in os.listdir(partitions_dir):
+            if name not in referenced:
+                os.remove(os.path.join(partitions_dir, name))
+
+        current = {path: file_signature(path) for path in source_files(results_dir)}
+        known = state.files()
+        changed = sorted(path for path, signature in current.items() if known.get(path) != signature)
+        removed = [path for path in known if path not in current]
+        if not changed and not removed:
+            return stats
+
+        # Matchs touchés : ceux des fichiers modifiés / disparus, et ceux des
+        # nouveaux fichiers déjà enrichis
+        stale = state.matches_from([path for path in changed if path in known] + removed)
+        df_raw = pd.DataFrame(columns=["match_id", "source_file"])
+        if changed:
+            df_raw = assign_match_ids(load_results(results_dir, files=changed, with_source=True))
+        new_ids = set(df_raw["match_id"])
+        affected = stale | state.known_matches(new_ids)
+        targets = new_ids | stale
+
+        # Un match recalculé est relu en entier, depuis tous ses fichiers
+        extra = (state.sources_of(affected) & set(current)) - set(changed)
+        if extra:
+            files = sorted(set(changed) | extra)
+            df_raw = assign_match_ids(load_results(results_dir, files=files, with_source=True))
+            df_raw = df_raw[df_raw["match_id"].isin(targets)]
+        sources = list(df_raw[["match_id", "source_file"]].drop_duplicates().itertuples(index=False, name=None))
+        match_rows = df_raw.groupby("match_id").size()
+
+        partition = None
+        df_final = final_frame(enrich(df_raw.drop(columns="source_file"), rounds)) if len(df_raw) else None
+        if df_final is not None and len(df_final):
+            partition = f"part-{state.next_partition():05d}.parquet"
+            _write_partition(df_final, os.path.join(partitions_dir, partition))
+        complete = set(df_final["match_id"]) if df_final is not None else set()
+
+        for name in state.partitions_of(affected):
+            path = os.path.join(partitions_dir, name)
+            previous = pd.read_parquet(path)
+            kept = previous[~previous["match_id"].isin(affected)]
+            if kept.empty:
+                os.remove(path)
+            elif len(kept) < len(previous):
+                _write_partition(kept, path)
+
+        state.update(
+            files={path: current[path] for path in changed},
+            removed_files=removed,
+            dropped_matches=targets,
+            matches=[(match_id, partition if match_id in complete else None, int(rows))
+                     for match_id, rows in match_rows.items()],
+            sources=sources,
+        )
+        stats.update(files=len(changed) + len(removed), matches=len(complete),
+                     recomputed=len(affected), rows=0 if df_final is None else len(df_final))
+        return stats
+    finally:
+        state.close()
+
+
+def enriched_source(output_dir: str = DEFAULT_OUTPUT_DIR) -> str:
+    """Partitions du mode incrémental si elles existent, sinon le fichier complet."""
+    partitions_dir = os.path.join(output_dir, PARTITIONS_DIRNAME)
+    if os.path.isdir(partitions_dir) and any(name.endswith(".parquet") for name in os.listdir(partitions_dir)):
+        return partitions_dir
+    return os.path.join(output_dir, os.path.basename(DEFAULT_OUTPUT))
+
+
+def _report_aggregates(output_dir: str, source: str):
+    """
+    Agrégats du rapport Streamlit (report_data.py), recalculés si la table
+    enrichie a changé, puis cache des pages (report_cache.py) prérempli.
+    """
+    import report_cache
+    import report_data
+
+    if not os.path.exists(source):
+        return
+    start = time.perf_counter()
+    if report_data.ensure_aggregates(output_dir, source):
+        print(f"✓ report aggregates -> {report_data.aggregates_dir(output_dir)} ({time.perf_counter() - start:.1f}s)")
+    computed = report_cache.warm(output_dir)
+    if computed:
+        print(f"✓ report cache warmed: {computed} page queries -> {report_cache.DEFAULT_REPORT_CACHE_PATH}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Enrichissement des résultats de simulation")
+    parser.add_argument("--results", default="results", help="Répertoire des résultats bruts")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Fichier parquet enrichi")
+    parser.add_argument("--rounds", type=int, default=EXPECTED_ROUNDS,
+                        help="Nombre de rounds d'un match complet")
+    parser.add_argument("--incremental", action="store_true",
+                        help="N'enrichir que les fichiers nouveaux ou modifiés (partitions sous "
+                             "<output-dir>/enriched_games)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR,
+                        help="Répertoire de l'état et des partitions du mode --incremental")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processus d'enrichissement (moteur pandas) ; 0 = tous les cœurs")
+    parser.add_argument("--engine", choices=["pandas", "duckdb"], default="pandas",
+                        help="duckdb : requête SQL hors mémoire écrite par COPY TO (enrich_sql.py)")
+    parser.add_argument("--memory-limit", default=None,
+                        help="Limite mémoire de DuckDB, ex. 4GB (--engine duckdb)")
+    parser.add_argument("--threads", type=int, default=None, help="Threads DuckDB (--engine duckdb)")
+    parser.add_argument("--temp-directory", default=None,
+                        help="Répertoire de débordement sur disque de DuckDB (--engine duckdb)")
+    args = parser.parse_args(argv)
+    if args.incremental and args.engine == "duckdb":
+        parser.error("--incremental n'enrichit que les nouveaux matchs avec le moteur pandas")
+
+    start = time.perf_counter()
+    if args.incremental:
+        stats = run_incremental(args.results, args.output_dir, args.rounds)
+        print(f"✓ {stats['files']:,} source files changed: {stats['rows']:,} rows / {stats['matches']:,} matches "
+              f"enriched ({stats['recomputed']:,} recomputed) -> {os.path.join(args.output_dir, PARTITIONS_DIRNAME)} "
+              f"({time.perf_counter() - start:.1f}s)")
+        _report_aggregates(args.output_dir, enriched_source(args.output_dir))
+        return
+    if args.engine == "duckdb":
+        import enrich_sql
+
+        rows = enrich_sql.run(args.results, args.output, args.rounds,
+                              memory_limit=args.memory_limit or enrich_sql.DEFAULT_MEMORY_LIMIT,
+                              threads=args.threads, temp_directory=args.temp_directory)
+        print(f"✓ {rows:,} rows -> {args.output} ({time.perf_counter() - start:.1f}s)")
+        _report_aggregates(os.path.dirname(args.output) or ".", args.output)
+        return
+    if args.workers != 1:
+        rows = run_parallel(args.results, args.output, args.rounds, args.workers or None)
+        print(f"✓ {rows:,} rows -> {args.output} ({time.perf_counter() - start:.1f}s)")
+        _report_aggregates(os.path.dirname(args.output) or ".", args.output)
+        return
+    df_final = run(args.results, args.output, args.rounds)
+    print(f"✓ {len(df_final):,} rows / {df_final['match_id'].nunique():,} matches -> {args.output} "
+          f"({time.perf_counter() - start:.1f}s)")
+    _report_aggregates(os.path.dirname(args.output) or ".", args.output)
+
+
+if __name__ == "__main__":
+    main()
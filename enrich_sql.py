@@ -0,0 +1,221 @@
+"""
+Enrichissement hors mémoire avec DuckDB.
+
+Même sortie que `enrich.run` (mêmes colonnes, types, valeurs et ordre des
+lignes), mais les étapes sont une seule requête SQL exécutée par DuckDB et
+écrite directement en parquet par `COPY ... TO` : les données ne passent
+jamais par pandas, et DuckDB déborde sur disque (`temp_directory`) au-delà
+de `memory_limit`.
+
+- représailles / pardon : `LAG` du coup adverse sur la fenêtre du match ;
+- représailles "mémoire" : `MAX` des défections adverses sur les 5 rounds
+  précédents (`ROWS BETWEEN 5 PRECEDING AND 1 PRECEDING`) ;
+- motifs de comportement, scores et issue : agrégats sur tout le match
+  (`OVER (PARTITION BY match_id)`), équivalents à un `GROUP BY match_id`
+  mais sans rejoindre la table des matchs sur celle des rounds, jointure
+  qui ne tenait pas dans une petite `memory_limit`.
+
+Les règles qui ne dépendent que d'un agent (rôle attendu, famille) et la
+table de conformité restent définies dans `enrich` ; elles sont évaluées
+sur les agents distincts et jointes comme petites tables.
+
+    python enrich.py --engine duckdb --memory-limit 4GB --threads 4
+"""
+import os
+from typing import List, Optional
+
+import duckdb
+import pandas as pd
+import pyarrow.parquet as pq
+
+from compact_schema import results_query
+from enrich import (
+    CONFORMITY_MAP, DEFAULT_CONFORMITY, DEFAULT_OUTPUT, EXPECTED_ROUNDS, FINAL_COLUMNS, IDENTITY_KEYS,
+    RETALIATION_MEMORY, classify_expected_role, extract_agent_family, legacy_match_ids,
+)
+
+DEFAULT_MEMORY_LIMIT = "4GB"
+
+
+def connect(memory_limit: Optional[str] = DEFAULT_MEMORY_LIMIT, threads: Optional[int] = None,
+            temp_directory: Optional[str] = None) -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect()
+    if memory_limit:
+        con.execute(f"SET memory_limit = '{memory_limit}'")
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    if temp_directory:
+        con.execute(f"SET temp_directory = '{temp_directory}'")
+    # L'ordre de sortie est fixé par l'ORDER BY final : inutile de le conserver
+    # dans les étapes intermédiaires
+    con.execute("SET preserve_insertion_order = false")
+    con.execute("SET enable_progress_bar = false")
+    return con
+
+
+def _legacy_key(prefix: str = "") -> str:
+    """Clé texte d'une configuration d'agents, pour joindre les identifiants hérités."""
+    return "concat_ws('|', " + ", ".join(f"COALESCE({prefix}{col}::VARCHAR, 'NULL')" for col in IDENTITY_KEYS) + ")"
+
+
+def _register_lookups(con: duckdb.DuckDBPyConnection) -> bool:
+    """
+    Tables auxiliaires : classes des agents distincts, table de conformité
+    et identifiants des lignes sans match_id. Renvoie True s'il y en a.
+    """
+    agents = con.execute(
+        "SELECT DISTINCT agent1_name AS name, agent1_type AS type FROM raw"
+        " UNION SELECT DISTINCT agent2_name, agent2_type FROM raw"
+    ).fetchdf()
+    agents["role_expected"] = [classify_expected_role(n, t) for n, t in zip(agents["name"], agents["type"])]
+    agents["family"] = [extract_agent_family(n, t) for n, t in zip(agents["name"], agents["type"])]
+    con.register("agent_classes", agents)
+
+    conformity = pd.DataFrame(
+        [(pattern, role, score) for pattern, roles in CONFORMITY_MAP.items() for role, score in roles.items()],
+        columns=["pattern", "role", "score"],
+    )
+    con.register("conformity", conformity)
+
+    legacy = con.execute(
+        f"SELECT DISTINCT {', '.join(IDENTITY_KEYS)}, {_legacy_key()} AS legacy_key FROM raw WHERE match_id IS NULL"
+    ).fetchdf()
+    legacy["legacy_match_id"] = legacy_match_ids(legacy) if len(legacy) else []
+    con.register("legacy_ids", legacy[["legacy_key", "legacy_match_id"]])
+    return len(legacy) > 0
+
+
+def _agent_columns(agent: str) -> str:
+    return f"""
+        ({agent}_move = 'C')::BIGINT AS {agent}_is_cooperation,
+        ({agent}_move = 'D')::BIGINT AS {agent}_is_defection,
+        (CASE WHEN {agent}_prev_opponent_move = 'D' AND {agent}_move = 'D' THEN 1 ELSE 0 END)::BIGINT
+            AS {agent}_retaliation_flag,
+        (CASE WHEN {agent}_recent_opponent_defection = 1 AND {agent}_move = 'D' THEN 1 ELSE 0 END)::BIGINT
+            AS {agent}_retaliation_flag_memories,
+        (CASE WHEN {agent}_prev_opponent_move = 'D' AND {agent}_move = 'C' THEN 1 ELSE 0 END)::BIGINT
+            AS {agent}_forgiveness_flag,
+        {agent}_context_mentioned::BIGINT AS {agent}_context_used_flag,
+        CASE
+            WHEN {agent}_type = 'Strategy' THEN 'coded'
+            WHEN {agent}_temperature IS NULL OR isnan({agent}_temperature) THEN 'unknown'
+            WHEN {agent}_temperature <= 0.7 THEN 'low'
+            WHEN {agent}_temperature <= 1.0 THEN 'medium'
+            ELSE 'high'
+        END AS {agent}_temperature_bucket"""
+
+
+def _pattern_case(agent: str) -> str:
+    # Mêmes seuils que enrich.behavior_patterns
+    coop, ret, forg, std = (f"{agent}_coop_rate", f"{agent}_retaliation_rate",
+                            f"{agent}_forgiveness_rate", f"{agent}_decision_std")
+    return f"""CASE
+            WHEN {coop} > 75 THEN 'faithful_cooperator'
+            WHEN {coop} < 30 THEN 'systematic_defector'
+            WHEN {coop} > 60 AND {ret} > 40 AND {forg} > 30 THEN 'tit_for_tat_like'
+            WHEN {coop} > 50 AND {std} > 0.3 THEN 'conditional_cooperator'
+            WHEN {std} > 0.4 THEN 'chaotic'
+            ELSE 'balanced'
+        END AS {agent}_behavior_pattern"""
+
+
+def _match_stats(agent: str) -> str:
+    # Agrégats du match entier (fenêtre `match`) répétés sur chaque round :
+    # pas de jointure de la table des matchs sur celle des rounds
+    return f"""
+        (SUM({agent}_score) OVER match)::BIGINT AS {agent}_match_score,
+        AVG({agent}_is_cooperation) OVER match * 100 AS {agent}_coop_rate,
+        AVG({agent}_retaliation_flag) OVER match * 100 AS {agent}_retaliation_rate,
+        AVG({agent}_forgiveness_flag) OVER match * 100 AS {agent}_forgiveness_rate,
+        STDDEV_SAMP({agent}_is_cooperation) OVER match AS {agent}_decision_std"""
+
+
+def _final_columns() -> str:
+    columns = []
+    for col in FINAL_COLUMNS:
+        if col.endswith("_conformity_score"):
+            alias = "c1" if col.startswith("agent1") else "c2"
+            columns.append(f"COALESCE({alias}.score, {DEFAULT_CONFORMITY})::DOUBLE AS {col}")
+        else:
+            columns.append(f"e.{col}")
+    return ",\n    ".join(columns)
+
+
+def enrichment_query(rounds: int = EXPECTED_ROUNDS, legacy: bool = False) -> str:
+    """Requête des sections 2 à 10 sur la vue `raw` (voir `_register_lookups`)."""
+    if legacy:
+        identified = f"""
+    SELECT r.* EXCLUDE (match_id), COALESCE(r.match_id, l.legacy_match_id) AS match_id
+    FROM raw r LEFT JOIN legacy_ids l ON r.match_id IS NULL AND l.legacy_key = {_legacy_key("r.")}"""
+    else:
+        identified = "SELECT * FROM raw"
+    # Une seule fenêtre (un seul tri) pour la numérotation et l'historique
+    match_window = "PARTITION BY match_id ORDER BY sim_id, round"
+    return f"""
+WITH identified AS ({identified}
+),
+history AS (
+    SELECT *,
+        ROW_NUMBER() OVER ({match_window}) AS round_id,
+        COUNT(*) OVER (PARTITION BY match_id) AS match_rows,
+        LAG(agent2_move) OVER ({match_window}) AS agent1_prev_opponent_move,
+        LAG(agent1_move) OVER ({match_window}) AS agent2_prev_opponent_move,
+        MAX((agent2_move = 'D')::INTEGER) OVER (
+            {match_window} ROWS BETWEEN {RETALIATION_MEMORY} PRECEDING AND 1 PRECEDING
+        ) AS agent1_recent_opponent_defection,
+        MAX((agent1_move = 'D')::INTEGER) OVER (
+            {match_window} ROWS BETWEEN {RETALIATION_MEMORY} PRECEDING AND 1 PRECEDING
+        ) AS agent2_recent_opponent_defection
+    FROM identified
+),
+flagged AS (
+    SELECT *,{_agent_columns("agent1")},{_agent_columns("agent2")}
+    FROM history
+    WHERE match_rows = {int(rounds)}
+),
+match_stats AS (
+    SELECT *,{_match_stats("agent1")},{_match_stats("agent2")}
+    FROM flagged
+    WINDOW match AS (PARTITION BY match_id ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+),
+enriched AS (
+    SELECT s.*,
+        s.agent1_coop_rate AS agent1_match_cooperation_rate,
+        s.agent2_coop_rate AS agent2_match_cooperation_rate,
+        {_pattern_case("agent1")},
+        {_pattern_case("agent2")},
+        CASE
+            WHEN agent1_match_score > agent2_match_score THEN 'agent1_win'
+            WHEN agent2_match_score > agent1_match_score THEN 'agent2_win'
+            ELSE 'draw'
+        END AS match_outcome,
+        a1.family AS agent1_family, a2.family AS agent2_family,
+        a1.role_expected AS agent1_role_expected, a2.role_expected AS agent2_role_expected
+    FROM match_stats s
+    JOIN agent_classes a1 ON a1.name = s.agent1_name AND a1.type = s.agent1_type
+    JOIN agent_classes a2 ON a2.name = s.agent2_name AND a2.type = s.agent2_type
+)
+SELECT {_final_columns()}
+FROM enriched e
+LEFT JOIN conformity c1 ON c1.pattern = e.agent1_behavior_pattern AND c1.role = e.agent1_role_expected
+LEFT JOIN conformity c2 ON c2.pattern = e.agent2_behavior_pattern AND c2.role = e.agent2_role_expected
+ORDER BY e.agent1_name, e.agent2_name, e.sim_id, e.match_id, e.round_id
+"""
+
+
+def run(results_dir: str = "results", output_file: str = DEFAULT_OUTPUT, rounds: int = EXPECTED_ROUNDS,
+        memory_limit: Optional[str] = DEFAULT_MEMORY_LIMIT, threads: Optional[int] = None,
+        temp_directory: Optional[str] = None, files: Optional[List[str]] = None) -> int:
+    """Enrichit `results_dir` dans `output_file` ; renvoie le nombre de lignes écrites."""
+    con = connect(memory_limit, threads, temp_directory)
+    try:
+        con.execute(f"CREATE TEMP VIEW raw AS {results_query(results_dir, con, files)}")
+        legacy = _register_lookups(con)
+        os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else ".", exist_ok=True)
+        tmp_path = f"{output_file}.tmp"
+        escaped = tmp_path.replace("'", "''")
+        con.execute(f"COPY ({enrichment_query(rounds, legacy)}) TO '{escaped}' (FORMAT PARQUET)")
+        os.replace(tmp_path, output_file)
+    finally:
+        con.close()
+    return pq.ParquetFile(output_file).metadata.num_rows
@@ -0,0 +1,115 @@
+"""
+État de l'enrichissement incrémental.
+
+Une base SQLite (par défaut `enriched_data/enrich_state.sqlite`) garde :
+
+- les fichiers sources déjà enrichis, avec leur taille et leur mtime : un
+  fichier nouveau ou modifié est à traiter, un fichier disparu retire ses
+  matchs ;
+- pour chaque match_id, ses fichiers sources, son nombre de lignes et la
+  partition enrichie qui le contient (NULL si le match est incomplet et
+  donc filtré) ;
+- la configuration de l'enrichissement (rounds attendus, version) : si
+  elle change, tout est recalculé.
+
+La base n'est mise à jour qu'après l'écriture des partitions, en une
+transaction : une partition absente de l'état vient d'un run interrompu.
+"""
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+ENRICH_STATE_FILENAME = "enrich_state.sqlite"
+
+# (taille, mtime en ns)
+FileSignature = Tuple[int, int]
+
+
+def file_signature(path: str) -> FileSignature:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class EnrichState:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER);"
+            "CREATE TABLE IF NOT EXISTS matches (match_id TEXT PRIMARY KEY, partition TEXT, rows INTEGER);"
+            "CREATE TABLE IF NOT EXISTS match_sources (match_id TEXT, path TEXT, PRIMARY KEY (match_id, path));"
+            "CREATE INDEX IF NOT EXISTS match_sources_path ON match_sources (path);"
+        )
+
+    def config(self) -> Dict[str, str]:
+        return dict(self._conn.execute("SELECT key, value FROM meta"))
+
+    def reset(self, config: Dict[str, str]):
+        """Oublie tout ce qui a été enrichi et enregistre la nouvelle configuration."""
+        self._conn.execute("BEGIN")
+        for table in ("meta", "files", "matches", "match_sources"):
+            self._conn.execute(f"DELETE FROM {table}")
+        self._conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", config.items())
+        self._conn.execute("COMMIT")
+
+    def files(self) -> Dict[str, FileSignature]:
+        return {row[0]: (row[1], row[2]) for row in self._conn.execute("SELECT path, size, mtime_ns FROM files")}
+
+    def partitions(self) -> Set[str]:
+        return {row[0] for row in self._conn.execute(
+            "SELECT DISTINCT partition FROM matches WHERE partition IS NOT NULL")}
+
+    def next_partition(self) -> int:
+        numbers = [int(name.split("-")[1].split(".")[0]) for name in self.partitions()]
+        return max(numbers, default=-1) + 1
+
+    def _select(self, query: str, values: Iterable[str]) -> Set:
+        # Table temporaire plutôt qu'un IN (...) limité en nombre de paramètres
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup (value TEXT PRIMARY KEY)")
+        self._conn.execute("DELETE FROM lookup")
+        self._conn.executemany("INSERT OR IGNORE INTO lookup VALUES (?)", ((v,) for v in values))
+        return {row[0] for row in self._conn.execute(query)}
+
+    def known_matches(self, match_ids: Iterable[str]) -> Set[str]:
+        return self._select("SELECT match_id FROM matches JOIN lookup ON match_id = value", match_ids)
+
+    def matches_from(self, paths: Iterable[str]) -> Set[str]:
+        return self._select("SELECT DISTINCT match_id FROM match_sources JOIN lookup ON path = value", paths)
+
+    def sources_of(self, match_ids: Iterable[str]) -> Set[str]:
+        return self._select("SELECT DISTINCT path FROM match_sources JOIN lookup ON match_id = value", match_ids)
+
+    def partitions_of(self, match_ids: Iterable[str]) -> Set[str]:
+        return self._select(
+            "SELECT DISTINCT partition FROM matches JOIN lookup ON match_id = value"
+            " WHERE partition IS NOT NULL", match_ids)
+
+    def update(self, files: Dict[str, FileSignature], removed_files: Iterable[str],
+               dropped_matches: Iterable[str], matches: List[Tuple[str, Optional[str], int]],
+               sources: List[Tuple[str, str]]):
+        """
+        Enregistre un run : fichiers traités / disparus, matchs recalculés
+        (`dropped_matches` sont effacés avant d'insérer `matches`
+        (match_id, partition, lignes) et `sources` (match_id, chemin)).
+        """
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            for match_id in dropped_matches:
+                conn.execute("DELETE FROM matches WHERE match_id = ?", (match_id,))
+                conn.execute("DELETE FROM match_sources WHERE match_id = ?", (match_id,))
+            conn.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in removed_files))
+            conn.executemany("INSERT OR REPLACE INTO files (path, size, mtime_ns) VALUES (?, ?, ?)",
+                             ((path, size, mtime) for path, (size, mtime) in files.items()))
+            conn.executemany("INSERT OR REPLACE INTO matches (match_id, partition, rows) VALUES (?, ?, ?)", matches)
+            conn.executemany("INSERT OR IGNORE INTO match_sources (match_id, path) VALUES (?, ?)", sources)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,294 @@
+"""
+Export statique du rapport Streamlit.
+
+Calcule une seule fois les figures, tableaux et textes de chaque page
+(`report_figures`, sur les agrégats de `report_data` et via le cache du
+rapport) et écrit un répertoire HTML autonome : une page HTML par section
+du rapport, les figures embarquées en JSON Plotly, et `plotly.min.js` à
+côté (aucun accès réseau). Le répertoire se sert tel quel par n'importe
+quel serveur de fichiers statiques, ou s'archive avec le sweep.
+
+    python export_report.py                                 # -> report_html/<version des données>/
+    python export_report.py enriched_data --output reports/sweep_12
+"""
+import argparse
+import html
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import duckdb
+import pandas as pd
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+import report_data
+import report_figures as rf
+from enrich import DEFAULT_OUTPUT_DIR
+from report_cache import DEFAULT_REPORT_CACHE_PATH, ReportCache
+
+DEFAULT_EXPORT_DIR = "report_html"
+PLOTLY_JS_FILENAME = "plotly.min.js"
+MANIFEST_FILENAME = "manifest.json"
+CURRENT_PAGE_CLASS = " class='current'"
+
+# Mise en page des blocs (les onglets et colonnes de Streamlit deviennent des sections et des lignes)
+PAGE_STYLE = """
+<style>
+    body { font-family: "Source Sans Pro", sans-serif; margin: 0; color: #31333F; }
+    nav { position: fixed; top: 0; bottom: 0; left: 0; width: 16em; padding: 1.5em 1em; background: #F0F2F6; }
+    nav a { display: block; padding: 0.4em 0.5em; color: #31333F; text-decoration: none; border-radius: 0.3em; }
+    nav a.current { background: #DDE4EE; font-weight: 600; }
+    main { margin-left: 18em; padding: 1.5em 3em; max-width: 80em; }
+    .row { display: flex; gap: 1em; }
+    .row > div { flex: 1; min-width: 0; }
+    table.dataframe { border-collapse: collapse; margin: 1em 0; }
+    table.dataframe th, table.dataframe td { padding: 0.3em 0.8em; border-bottom: 1px solid #E6E9EF; text-align: right; }
+    table.dataframe th { color: #6B7B8F; }
+</style>
+"""
+
+
+class PageBuilder:
+    """Blocs HTML d'une page ; chaque figure reçoit un identifiant unique."""
+
+    def __init__(self):
+        self.blocks: List[str] = []
+        self._figures = 0
+
+    def add(self, block: str):
+        self.blocks.append(block)
+
+    def subsection(self, title: str):
+        self.add(f"<p class='subsection'>{title}</p>")
+
+    def figure_html(self, fig) -> str:
+        self._figures += 1
+        return pio.to_html(fig, full_html=False, include_plotlyjs=False, div_id=f"figure-{self._figures}",
+                           config={"responsive": True})
+
+    def figure(self, fig):
+        self.add(self.figure_html(fig))
+
+    def table(self, df: pd.DataFrame):
+        self.add(df.to_html(index=False, border=0, classes="dataframe", float_format=lambda x: f"{x:.2f}"))
+
+    def insight(self, text: str):
+        self.add(rf.insight_box(markdown_bold(text)))
+
+    def row(self, blocks: List[str]):
+        self.add("<div class='row'>" + "".join(f"<div>{block}</div>" for block in blocks) + "</div>")
+
+    def figure_row(self, figures: list):
+        self.row([self.figure_html(fig) for fig in figures])
+
+
+def markdown_bold(text: str) -> str:
+    """`**x**` (gras Markdown, rendu par Streamlit) en <strong>."""
+    parts = text.split("**")
+    return "".join(f"<strong>{part}</strong>" if i % 2 else part for i, part in enumerate(parts))
+
+
+# ============================================================================
+# PAGES (même ordre et mêmes blocs que streamlit_report.py)
+# ============================================================================
+
+def global_view(page: PageBuilder, query: Callable):
+    page.row(rf.kpi_cards(query))
+    page.subsection("Distribution des rounds par famille d'agent")
+    family_df = rf.family_rounds(query)
+    page.figure(rf.family_rounds_figure(family_df))
+    page.insight(rf.family_rounds_insight(family_df))
+    page.subsection("Classement global — qui gagne vraiment?")
+    leaderboard_df = rf.leaderboard(query)
+    page.figure(rf.leaderboard_figure(leaderboard_df))
+    page.insight(rf.leaderboard_insight(leaderboard_df))
+
+
+def cooperation(page: PageBuilder, query: Callable):
+    page.subsection("Taux de coopération par type d'agent")
+    coop_type_df = rf.cooperation_by_family(query)
+    page.figure(rf.cooperation_by_family_figure(coop_type_df))
+    page.table(coop_type_df)
+    page.insight(rf.cooperation_by_family_insight(coop_type_df))
+
+    page.subsection("Impact de la température (IA uniquement)")
+    temp_df = rf.ia_temperature(query)
+    if len(temp_df) > 0:
+        page.figure(rf.temperature_cooperation_figure(temp_df))
+        page.table(temp_df[["temperature", "conformity", "coop_rate", "count"]])
+
+    page.subsection("Impact du contexte (prompting)")
+    context_df = rf.ia_context(query)
+    page.figure(rf.context_figure(context_df, "coop_rate", "Taux coopération (%)"))
+    page.table(context_df[["context", "coop_rate", "count"]])
+    context_insight = rf.context_insight(context_df)
+    if context_insight is not None:
+        page.insight(context_insight)
+
+    page.subsection("Taux de coopération détaillé par agent")
+    page.figure(rf.agent_cooperation_figure(query))
+
+
+def performance(page: PageBuilder, query: Callable):
+    page.subsection("Score moyen par type d'agent")
+    score_type_df = rf.family_scores(query)
+    page.figure(rf.family_scores_figure(score_type_df))
+    page.table(score_type_df)
+    page.subsection("Score vs Taux de Coopération")
+    page.figure(rf.score_vs_cooperation_figure(query))
+    page.insight(rf.SCORE_PATTERN_INSIGHT)
+    page.subsection("Variabilité des scores par type")
+    page.figure(rf.score_box_figure(query))
+
+
+def ia_factors(page: PageBuilder, query: Callable):
+    temp_conf_df = rf.ia_temperature(query)
+    left = "<p class='subsection'>Température & Conformité</p>"
+    if len(temp_conf_df) > 0:
+        left += page.figure_html(rf.temperature_conformity_figure(temp_conf_df))
+    right = "<p class='subsection'>Modèle IA Comparaison</p>" + page.figure_html(
+        rf.model_comparison_figure(rf.model_comparison(query)))
+    page.row([left, right])
+
+    page.subsection("Impact du Contexte sur Scores & Comportements")
+    context_scores_df = rf.ia_context(query)
+    page.figure_row([
+        rf.context_figure(context_scores_df, "score", "Score", "Score Moyen"),
+        rf.context_figure(context_scores_df, "coop_rate", "Coopération (%)", "Taux Coopération"),
+    ])
+
+
+def dynamics(page: PageBuilder, query: Callable):
+    page.subsection("Évolution du taux de coopération par round")
+    coop_evolution = query(report_data.cooperation_curve)
+    page.figure(rf.cooperation_curve_figure(coop_evolution))
+    page.insight(rf.cooperation_curve_insight(coop_evolution))
+    page.subsection("Évolution par phases")
+    time_windows_df = rf.phases(query)
+    page.figure_row([rf.phase_cooperation_figure(time_windows_df), rf.phase_score_figure(time_windows_df)])
+
+
+def theory(page: PageBuilder, query: Callable):
+    page.subsection("Matrice des états (C/C, C/D, D/C, D/D)")
+    outcome_counts = query(report_data.outcome_counts)
+    page.figure(rf.outcome_figure(outcome_counts))
+    page.row(rf.outcome_cards(outcome_counts))
+    page.insight(rf.equilibrium_insight(outcome_counts))
+    page.subsection("Corrélation Coopération vs Performance")
+    agent_perf_df, corr = rf.cooperation_performance(query)
+    page.figure(rf.cooperation_performance_figure(agent_perf_df))
+    page.insight(rf.correlation_insight(corr))
+
+
+def synthesis(page: PageBuilder, query: Callable):
+    page.subsection("Tableau Comparatif")
+    page.table(rf.synthesis_table(query))
+    page.subsection("Dimensions Clés")
+    page.row([rf.list_card(title, items) for title, items in rf.PROFILE_CARDS])
+    page.add("<h3 style='color: #5A7B9E; margin-top: 1.5em;'>🔍 Insights Finaux</h3>")
+    for idx, (title, desc) in enumerate(rf.FINAL_INSIGHTS, 1):
+        page.insight(f"<strong>{idx}. {title}</strong><br>{desc}")
+    page.add("<h3 style='color: #5A7B9E; margin-top: 2em;'>💡 Conclusion Clé</h3>")
+    page.add(rf.CONCLUSION_HTML)
+    page.add("<h3 style='color: #5A7B9E; margin-top: 2em;'>🎯 Recommandations Pratiques</h3>")
+    page.row([rf.list_card(title, items) for title, items in rf.RECOMMENDATIONS])
+
+
+PAGE_BUILDERS = [global_view, cooperation, performance, ia_factors, dynamics, theory, synthesis]
+
+
+def page_filename(index: int) -> str:
+    return "index.html" if index == 0 else f"page-{index + 1}.html"
+
+
+def render_page(index: int, blocks: List[str], overview: Dict[str, int], version: str, generated: str) -> str:
+    label, title, intro = rf.PAGES[index]
+    nav = "\n".join(
+        f"<a href='{page_filename(i)}'{CURRENT_PAGE_CLASS if i == index else ''}>{html.escape(page_label)}</a>"
+        for i, (page_label, _, _) in enumerate(rf.PAGES)
+    )
+    intro_html = "<p>" + "<br>".join(html.escape(line.strip()) for line in intro.strip().splitlines()) + "</p>"
+    body = "\n".join(blocks)
+    return f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(label)} — Dilemme du Prisonnier</title>
+<script src="{PLOTLY_JS_FILENAME}"></script>
+{rf.STYLE}
+{PAGE_STYLE}
+</head>
+<body>
+<nav>
+<h3>📊 Navigation</h3>
+{nav}
+<h3>📈 Statistiques Clés</h3>
+<p>Matchs : {overview['matches']:,}<br>Agents : {overview['agents']}<br>
+Rounds : {overview['rounds']:,}<br>Max Rounds/Match : {overview['max_round']}</p>
+</nav>
+<main>
+<h1 class='main-header'>🎮 Dilemme du Prisonnier : IA vs Stratégies Codées</h1>
+<h2 class='section-header'>{title}</h2>
+{intro_html}
+{body}
+<hr>
+{rf.footer(overview)}
+<p style="text-align: center; color: #A0B0C0; font-size: 0.75em;">Données {version} • exporté le {generated}</p>
+</main>
+</body>
+</html>
+"""
+
+
+def export_report(output_dir: str = DEFAULT_OUTPUT_DIR, export_dir: Optional[str] = None,
+                  cache_path: str = DEFAULT_REPORT_CACHE_PATH,
+                  con: Optional[duckdb.DuckDBPyConnection] = None) -> str:
+    """
+    Écrit le rapport statique des agrégats de `output_dir` dans `export_dir`
+    (défaut : `report_html/<version des données>`) et renvoie ce répertoire.
+    """
+    con = report_data.connect(output_dir, con)
+    version = report_data.dataset_version(output_dir)
+    export_dir = export_dir or os.path.join(DEFAULT_EXPORT_DIR, version)
+    cache = ReportCache(cache_path)
+    try:
+        cache.use_version(version)
+
+        def query(func, *args):
+            return cache.query(func, con, *args)
+
+        overview = query(report_data.overview)
+        generated = time.strftime("%Y-%m-%d %H:%M")
+        os.makedirs(export_dir, exist_ok=True)
+        for index, build in enumerate(PAGE_BUILDERS):
+            page = PageBuilder()
+            build(page, query)
+            with open(os.path.join(export_dir, page_filename(index)), "w", encoding="utf-8") as f:
+                f.write(render_page(index, page.blocks, overview, version, generated))
+    finally:
+        cache.close()
+
+    with open(os.path.join(export_dir, PLOTLY_JS_FILENAME), "w", encoding="utf-8") as f:
+        f.write(get_plotlyjs())
+    with open(os.path.join(export_dir, MANIFEST_FILENAME), "w") as f:
+        json.dump({"dataset_version": version, "generated": generated, "overview": overview,
+                   "pages": [page_filename(i) for i in range(len(PAGE_BUILDERS))]}, f, indent=2, default=int)
+    return export_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export statique (HTML) du rapport")
+    parser.add_argument("output_dir", nargs="?", default=DEFAULT_OUTPUT_DIR,
+                        help="Répertoire des données enrichies et de leurs agrégats")
+    parser.add_argument("--output", default=None,
+                        help=f"Répertoire du rapport exporté (défaut : {DEFAULT_EXPORT_DIR}/<version des données>)")
+    parser.add_argument("--cache", default=DEFAULT_REPORT_CACHE_PATH, help="Cache des calculs du rapport")
+    args = parser.parse_args(argv)
+    export_dir = export_report(args.output_dir, args.output, args.cache)
+    print(f"✓ {len(PAGE_BUILDERS)} pages -> {export_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
-import random
+import asyncio
+import hashlib
+import uuid
+import numpy as np
 import pandas as pd
 import json
 import os
+import time
 import ollama
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Tuple, Dict, Any, Optional, Iterable, Sequence, Union
+from strategies import COOPERATE_CODE, DEFECT_CODE, make_strategy
+from match_features import FeatureAccumulator, default_features
+from instrumentation import RoundMetrics, call_record
+
+if TYPE_CHECKING:
+    from response_cache import ResponseCache
 
 # Constants
 COOPERATE = "C"
@@ -17,19 +28,266 @@ PAYOFFS = {
     (DEFECT, DEFECT): (1, 1),
 }
 
+# Codage compact des coups (0 = coopération, 1 = défection)
+MOVE_CODES = {COOPERATE: COOPERATE_CODE, DEFECT: DEFECT_CODE}
+MOVE_CHARS = np.array([COOPERATE, DEFECT])
+_CODE_TO_MOVE = (COOPERATE, DEFECT)
+
+# Colonnes constantes sur une partie (un seul enregistrement de métadonnées)
+GAME_METADATA_COLUMNS = [
+    "agent1_name", "agent1_type", "agent1_context_mentioned", "agent1_temperature",
+    "agent2_name", "agent2_type", "agent2_context_mentioned", "agent2_temperature",
+]
+
+# Identité d'une partie, écrite en tête de Game.save_results
+MATCH_IDENTITY_COLUMNS = ["match_id", "sim_id", "repetition"]
+
+# Ordre des colonnes de Game.history / save_results
+ROUND_COLUMNS = [
+    "round",
+    "agent1_name", "agent1_type", "agent1_context_mentioned", "agent1_temperature",
+    "agent1_move", "agent1_score", "agent1_total_score",
+    "agent2_name", "agent2_type", "agent2_context_mentioned", "agent2_temperature",
+    "agent2_move", "agent2_score", "agent2_total_score",
+]
+
+
+def build_rounds_frame(metadata: List[Dict[str, Any]], rounds_per_game: int,
+                       per_round: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    Construit la table des rounds à partir de colonnes.
+
+    `metadata` contient un enregistrement par partie (GAME_METADATA_COLUMNS),
+    répété sur ses `rounds_per_game` rounds ; `per_round` contient les
+    colonnes variables déjà à plat (round, coups en codes, scores, totaux).
+    Les colonnes MATCH_IDENTITY_COLUMNS sont ajoutées en tête si les
+    métadonnées les contiennent.
+    """
+    data = {}
+    identity = [col for col in MATCH_IDENTITY_COLUMNS if metadata and col in metadata[0]]
+    for col in identity + ROUND_COLUMNS:
+        if col in per_round:
+            values = per_round[col]
+            if col.endswith("_move"):
+                values = MOVE_CHARS[values]
+            elif values.dtype != np.int64:
+                values = values.astype(np.int64)
+            data[col] = values
+        else:
+            data[col] = np.repeat(np.array([m[col] for m in metadata], dtype=object), rounds_per_game)
+    # infer_objects : même typage que pd.DataFrame(liste de dicts)
+    return pd.DataFrame(data).infer_objects()
+
+
+def write_parquet_atomic(df: pd.DataFrame, filename: str):
+    """
+    Écrit `df` dans un fichier temporaire puis le renomme : un run interrompu
+    ne laisse jamais de parquet partiel sous le nom final.
+    """
+    # S'assurer que le répertoire existe
+    os.makedirs(os.path.dirname(filename) if os.path.dirname(filename) else ".", exist_ok=True)
+    tmp_filename = f"{filename}.tmp"
+    df.to_parquet(tmp_filename, index=False)
+    os.replace(tmp_filename, filename)
+
+def make_match_id(agent1_name: str, agent2_name: str, sim_id) -> str:
+    """Identifiant d'une partie (c'est aussi le hash des noms de fichiers `vs_<hash>_<sim_id>`)."""
+    return hashlib.md5(f"{agent1_name}_{agent2_name}_{sim_id}".encode()).hexdigest()[:8]
+
+def game_metadata(agent1: "Agent", agent2: "Agent") -> Dict[str, Any]:
+    return {
+        "agent1_name": agent1.name,
+        "agent1_type": agent1.agent_type,
+        "agent1_context_mentioned": agent1.context_mentioned,
+        "agent1_temperature": agent1.temperature,
+        "agent2_name": agent2.name,
+        "agent2_type": agent2.agent_type,
+        "agent2_context_mentioned": agent2.context_mentioned,
+        "agent2_temperature": agent2.temperature,
+    }
+
+
+class RoundRecorder:
+    """
+    Stockage en colonnes des rounds d'une partie.
+
+    Les valeurs variables (coups, scores, totaux) sont rangées dans des
+    tableaux typés préalloués ; les constantes de la partie (noms, types,
+    température, contexte) ne sont gardées qu'une fois dans `metadata`.
+    """
+
+    def __init__(self, metadata: Optional[Dict[str, Any]] = None, capacity: int = 0):
+        self.metadata = metadata or {}
+        self._size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.moves1 = np.zeros(capacity, dtype=np.int8)
+        self.moves2 = np.zeros(capacity, dtype=np.int8)
+        self.scores1 = np.zeros(capacity, dtype=np.int8)
+        self.scores2 = np.zeros(capacity, dtype=np.int8)
+        self.totals1 = np.zeros(capacity, dtype=np.int32)
+        self.totals2 = np.zeros(capacity, dtype=np.int32)
+
+    @classmethod
+    def from_arrays(cls, metadata: Dict[str, Any], moves1: np.ndarray, moves2: np.ndarray,
+                    scores1: np.ndarray, scores2: np.ndarray,
+                    totals1: np.ndarray, totals2: np.ndarray) -> "RoundRecorder":
+        """Recorder rempli à partir de colonnes déjà calculées (ex. batch_engine)."""
+        recorder = cls(metadata)
+        recorder.moves1 = np.asarray(moves1, dtype=np.int8)
+        recorder.moves2 = np.asarray(moves2, dtype=np.int8)
+        recorder.scores1 = np.asarray(scores1, dtype=np.int8)
+        recorder.scores2 = np.asarray(scores2, dtype=np.int8)
+        recorder.totals1 = np.asarray(totals1, dtype=np.int32)
+        recorder.totals2 = np.asarray(totals2, dtype=np.int32)
+        recorder._size = len(recorder.moves1)
+        return recorder
+
+    def reserve(self, capacity: int):
+        """Agrandit les tableaux pour contenir au moins `capacity` rounds."""
+        if capacity <= len(self.moves1):
+            return
+        size = self._size
+        old = (self.moves1, self.moves2, self.scores1, self.scores2, self.totals1, self.totals2)
+        self._allocate(capacity)
+        for new, prev in zip((self.moves1, self.moves2, self.scores1, self.scores2, self.totals1, self.totals2), old):
+            new[:size] = prev[:size]
+
+    def append(self, move1: str, move2: str, score1: int, score2: int, total1: int, total2: int):
+        i = self._size
+        if i == len(self.moves1):
+            self.reserve(max(16, 2 * i))
+        self.moves1[i] = MOVE_CODES[move1]
+        self.moves2[i] = MOVE_CODES[move2]
+        self.scores1[i] = score1
+        self.scores2[i] = score2
+        self.totals1[i] = total1
+        self.totals2[i] = total2
+        self._size = i + 1
+
+    def clear(self):
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def to_frame(self) -> pd.DataFrame:
+        n = self._size
+        return build_rounds_frame([self.metadata], n, {
+            "round": np.arange(1, n + 1, dtype=np.int64),
+            "agent1_move": self.moves1[:n],
+            "agent1_score": self.scores1[:n],
+            "agent1_total_score": self.totals1[:n],
+            "agent2_move": self.moves2[:n],
+            "agent2_score": self.scores2[:n],
+            "agent2_total_score": self.totals2[:n],
+        })
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Rounds sous forme de liste de dicts (ancien format de Game.history)."""
+        n = self._size
+        m = self.metadata
+        moves1 = MOVE_CHARS[self.moves1[:n]].tolist()
+        moves2 = MOVE_CHARS[self.moves2[:n]].tolist()
+        scores1, scores2 = self.scores1[:n].tolist(), self.scores2[:n].tolist()
+        totals1, totals2 = self.totals1[:n].tolist(), self.totals2[:n].tolist()
+        return [
+            {
+                "round": t + 1,
+                "agent1_name": m["agent1_name"],
+                "agent1_type": m["agent1_type"],
+                "agent1_context_mentioned": m["agent1_context_mentioned"],
+                "agent1_temperature": m["agent1_temperature"],
+                "agent1_move": moves1[t],
+                "agent1_score": scores1[t],
+                "agent1_total_score": totals1[t],
+                "agent2_name": m["agent2_name"],
+                "agent2_type": m["agent2_type"],
+                "agent2_context_mentioned": m["agent2_context_mentioned"],
+                "agent2_temperature": m["agent2_temperature"],
+                "agent2_move": moves2[t],
+                "agent2_score": scores2[t],
+                "agent2_total_score": totals2[t],
+            }
+            for t in range(n)
+        ]
+
+class MoveHistory:
+    """
+    Historique compact des coups d'un agent : un octet (0/1) par coup.
+
+    Se comporte comme l'ancienne liste de 'C'/'D' pour la lecture
+    (len, index, slices, `in`, itération).
+    """
+
+    __slots__ = ("_codes",)
+
+    def __init__(self, moves: Iterable[str] = ()):
+        self._codes = bytearray(MOVE_CODES[m] for m in moves)
+
+    def append(self, move: str):
+        self._codes.append(MOVE_CODES[move])
+
+    def code_at(self, index: int) -> int:
+        return self._codes[index]
+
+    def tail(self, k: int) -> List[str]:
+        """Les k derniers coups (fenêtre de contexte des agents LLM)."""
+        return [_CODE_TO_MOVE[c] for c in self._codes[-k:]] if k > 0 else []
+
+    def as_array(self) -> np.ndarray:
+        """Vue int8 (sans copie) des coups codés."""
+        return np.frombuffer(self._codes, dtype=np.int8)
+
+    def count(self, move: str) -> int:
+        return self._codes.count(MOVE_CODES[move])
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [_CODE_TO_MOVE[c] for c in self._codes[index]]
+        return _CODE_TO_MOVE[self._codes[index]]
+
+    def __iter__(self):
+        return (_CODE_TO_MOVE[c] for c in self._codes)
+
+    def __contains__(self, move) -> bool:
+        return move in MOVE_CODES and MOVE_CODES[move] in self._codes
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, MoveHistory):
+            return self._codes == other._codes
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"MoveHistory({''.join(self)!r})"
+
+
 class Agent(ABC):
     def __init__(self, name: str):
         self.name = name
-        self.history: List[str] = []
+        self.history = MoveHistory()
         self.score = 0
         self.agent_type = "Base"
         self.context_mentioned = False
         self.temperature = None  # Par défaut None pour les agents sans température
+        # True si make_move attend surtout des I/O (appel réseau) : Game peut
+        # alors demander les deux coups d'un round en même temps
+        self.io_bound = False
+        # Mesure du dernier coup (instrumentation.call_record), None si l'agent n'appelle rien
+        self.last_call: Optional[Dict[str, Any]] = None
 
     @abstractmethod
     def make_move(self, opponent_history: List[str]) -> str:
         pass
 
+    async def make_move_async(self, opponent_history: List[str]) -> Optional[str]:
+        # Par défaut un coup ne fait pas d'I/O : version async = version synchrone
+        return self.make_move(opponent_history)
+
     def update_history(self, move: str):
         self.history.append(move)
 
@@ -37,33 +295,34 @@ class Agent(ABC):
         self.score += points
 
     def reset(self):
-        self.history = []
+        self.history = MoveHistory()
         self.score = 0
+        self.last_call = None
 
 class StrategyAgent(Agent):
     def __init__(self, name: str, strategy: str):
         super().__init__(name)
         self.strategy = strategy
         self.agent_type = "Strategy"
+        self.state = make_strategy(strategy)
+        self._observed = 0  # rounds déjà intégrés dans self.state
 
     def make_move(self, opponent_history: List[str]) -> str:
-        if self.strategy == "random":
-            return random.choice([COOPERATE, DEFECT])
-        elif self.strategy == "always_cooperate":
-            return COOPERATE
-        elif self.strategy == "always_defect":
-            return DEFECT
-        elif self.strategy == "tit_for_tat":
-            if not opponent_history:
-                return COOPERATE
-            return opponent_history[-1]
-        elif self.strategy == "grim_trigger":
-            if DEFECT in opponent_history:
-                return DEFECT
-            return COOPERATE
-        else:
-            # Default to random if strategy unknown
-            return random.choice([COOPERATE, DEFECT])
+        # Intègre uniquement les rounds pas encore vus (un seul par round en pratique)
+        n = len(opponent_history)
+        if n < self._observed:
+            self.state.reset()
+            self._observed = 0
+        while self._observed < n:
+            i = self._observed
+            self.state.observe(MOVE_CODES[self.history[i]], MOVE_CODES[opponent_history[i]])
+            self._observed += 1
+        return _CODE_TO_MOVE[self.state.next_move()]
+
+    def reset(self):
+        super().reset()
+        self.state.reset()
+        self._observed = 0
 
 # Behavioral Profiles
 PROFILES = {
@@ -83,17 +342,32 @@ class OllamaAgent(Agent):
         profile: str = "default",
         include_context: bool = True,
         temperature: float = 0.7,
+        seed: Optional[int] = None,
+        cache: Optional["ResponseCache"] = None,
+        canonical_prompt: bool = False,
+        keep_alive: Optional[str] = None,
     ):
         super().__init__(name)
         self.model = model
         self.profile = profile
         self.include_context = include_context
         self.agent_type = "Ollama"
+        self.io_bound = True
         self.context_mentioned = include_context
         self.system_prompt = PROFILES.get(profile.lower(), PROFILES["default"])
         self.temperature = temperature
+        self.seed = seed
+        # Cache de réponses : utilisé seulement si la réponse est reproductible
+        self.cache = cache
+        # Numéros de round relatifs ("Round -1") : prompts identiques d'un
+        # moment à l'autre de la partie, donc davantage de hits dans le cache
+        self.canonical_prompt = canonical_prompt
+        # Durée de maintien du modèle en mémoire côté serveur (ex. "30m")
+        self.keep_alive = keep_alive
+        # (longueur du prompt, secondes) de chaque appel réellement envoyé au serveur
+        self.call_timings: List[Tuple[int, float]] = []
 
-    def make_move(self, opponent_history: List[str]) -> Optional[str]:
+    def build_prompt(self, opponent_history: List[str]) -> str:
         # Construct the prompt
         context_intro = "You are playing the Iterated Prisoner's Dilemma." if self.include_context else "You are playing a game with two options."
         
@@ -114,49 +388,211 @@ class OllamaAgent(Agent):
         
         # Add recent history context
         recent_history_len = 5
-        my_recent = self.history[-recent_history_len:] if self.history else []
+        my_recent = self.history.tail(recent_history_len)
         opp_recent = opponent_history[-recent_history_len:] if opponent_history else []
         
         for i in range(len(my_recent)):
-            prompt += f"Round {len(self.history) - len(my_recent) + i + 1}: You played {my_recent[i]}, Opponent played {opp_recent[i]}\n"
+            if self.canonical_prompt:
+                round_label = f"-{len(my_recent) - i}"
+            else:
+                round_label = f"{len(self.history) - len(my_recent) + i + 1}"
+            prompt += f"Round {round_label}: You played {my_recent[i]}, Opponent played {opp_recent[i]}\n"
             
         prompt += "\nBased on this, what is your next move? Respond with ONLY the single character 'C' or 'D'."
+        return prompt
 
-        try:
-            response = ollama.generate(
-                model=self.model,
-                prompt=prompt,
-                system=self.system_prompt,
-                options={"temperature": self.temperature},
-            )
-            move = response["response"].strip().upper()
+    def generate_kwargs(self, prompt: str) -> Dict[str, Any]:
+        """Arguments de `ollama.generate` pour ce prompt."""
+        options = {"temperature": self.temperature}
+        if self.seed is not None:
+            options["seed"] = self.seed
+        kwargs = {
+            "model": self.model,
+            "prompt": prompt,
+            "system": self.system_prompt,
+            "options": options,
+        }
+        if self.keep_alive is not None:
+            kwargs["keep_alive"] = self.keep_alive
+        return kwargs
+
+    def cache_key(self, prompt: str) -> Optional[str]:
+        """Clé de cache du prompt, ou None si la réponse n'est pas reproductible."""
+        if self.cache is None or (self.temperature != 0 and self.seed is None):
+            return None
+        return self.cache.make_key(self.model, self.system_prompt, prompt, self.temperature, self.seed)
 
-            # Basic validation
-            if "C" in move and "D" not in move:
-                return COOPERATE
-            if "D" in move and "C" not in move:
-                return DEFECT
-            if move == "C" or move == "D":
-                return move
+    @staticmethod
+    def parse_response(text: str) -> Optional[str]:
+        move = text.strip().upper()
+
+        # Basic validation
+        if "C" in move and "D" not in move:
+            return COOPERATE
+        if "D" in move and "C" not in move:
+            return DEFECT
+        if move == "C" or move == "D":
+            return move
 
-            # Aucune interprétation fiable, on renvoie None pour signaler l'échec
+        # Aucune interprétation fiable, on renvoie None pour signaler l'échec
+        return None
+
+    def _record_move(self, text: str, start: float, response: Optional[Dict[str, Any]] = None,
+                     cache_hit: bool = False) -> Optional[str]:
+        """Coup lu dans la réponse `text` ; sa mesure (instrumentation) va dans `last_call`."""
+        move = self.parse_response(text)
+        self.last_call = call_record(time.perf_counter() - start, response, cache_hit=cache_hit,
+                                     parse_failure=move is None)
+        return move
+
+    def make_move(self, opponent_history: List[str]) -> Optional[str]:
+        start = time.perf_counter()
+        prompt = self.build_prompt(opponent_history)
+        key = self.cache_key(prompt)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._record_move(cached, start, cache_hit=True)
+        try:
+            call_start = time.perf_counter()
+            response = ollama.generate(**self.generate_kwargs(prompt))
+            self.call_timings.append((len(prompt), time.perf_counter() - call_start))
+            if key is not None:
+                self.cache.put(key, response["response"])
+            return self._record_move(response["response"], start, response)
+
+        except Exception as e:
+            # Ne pas print pour éviter le spam dans les versions parallèles :
+            # l'exception est comptée par l'instrumentation (last_call["error"])
+            self.last_call = call_record(time.perf_counter() - start, error=e)
             return None
 
+class AsyncOllamaAgent(OllamaAgent):
+    """
+    OllamaAgent non bloquant : `make_move_async` passe par `ollama.AsyncClient`.
+
+    Un même client et un même sémaphore peuvent être partagés par des
+    centaines d'agents pour plafonner le nombre de requêtes simultanées
+    envoyées au serveur Ollama.
+    """
+
+    def __init__(
+        self,
+        *args,
+        client: Optional["ollama.AsyncClient"] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.client = client
+        self.semaphore = semaphore
+
+    async def _timed_generate(self, prompt: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        response = await self.client.generate(**self.generate_kwargs(prompt))
+        self.call_timings.append((len(prompt), time.perf_counter() - start))
+        return response
+
+    async def _generate(self, prompt: str) -> Dict[str, Any]:
+        if self.client is None:
+            self.client = ollama.AsyncClient()
+        if self.semaphore is None:
+            return await self._timed_generate(prompt)
+        # Le temps d'attente du sémaphore n'est pas compté dans la latence
+        async with self.semaphore:
+            return await self._timed_generate(prompt)
+
+    async def make_move_async(self, opponent_history: List[str]) -> Optional[str]:
+        start = time.perf_counter()
+        prompt = self.build_prompt(opponent_history)
+        key = self.cache_key(prompt)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._record_move(cached, start, cache_hit=True)
+        try:
+            response = await self._generate(prompt)
+            if key is not None:
+                self.cache.put(key, response["response"])
+            return self._record_move(response["response"], start, response)
         except Exception as e:
-            # Ne pas print pour éviter le spam dans les versions parallèles
-            # print(f"Error calling Ollama for agent {self.name}: {e}")
+            # Même politique que make_move : l'échec est signalé par None
+            self.last_call = call_record(time.perf_counter() - start, error=e)
             return None
 
 class Game:
-    def __init__(self, agent1: Agent, agent2: Agent):
+    def __init__(self, agent1: Agent, agent2: Agent, concurrent_moves: bool = True,
+                 sim_id: Optional[int] = None, repetition: int = 0, match_id: Optional[str] = None,
+                 features: Optional[Sequence[FeatureAccumulator]] = None, instrument: bool = False):
         self.agent1 = agent1
         self.agent2 = agent2
-        self.history = []
+        # Identité écrite avec les résultats : sans sim_id (partie hors sweep),
+        # le match_id est tiré au hasard pour rester unique
+        self.sim_id = sim_id
+        self.repetition = repetition
+        if match_id is None:
+            match_id = make_match_id(agent1.name, agent2.name, sim_id if sim_id is not None else uuid.uuid4().hex)
+        self.match_id = match_id
+        self.recorder = RoundRecorder(self._metadata())
+        # Caractéristiques du match mises à jour à chaque round (match_features)
+        self.features = list(features) if features is not None else default_features()
+        # Les deux coups d'un round ne dépendent que de l'historique des rounds
+        # précédents : si les deux agents sont I/O-bound on les demande en parallèle
+        self.concurrent_moves = concurrent_moves
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Mesures par round des appels des agents (instrumentation), si demandées
+        self.metrics: Optional[RoundMetrics] = RoundMetrics() if instrument else None
+
+    def _metadata(self) -> Dict[str, Any]:
+        return {
+            "match_id": self.match_id,
+            "sim_id": self.sim_id,
+            "repetition": self.repetition,
+            **game_metadata(self.agent1, self.agent2),
+        }
+
+    def _moves_in_parallel(self) -> bool:
+        return self.concurrent_moves and self.agent1.io_bound and self.agent2.io_bound
+
+    def close(self):
+        """Libère le thread utilisé pour les coups concurrents."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    @property
+    def history(self) -> List[Dict[str, Any]]:
+        # Vue liste de dicts, matérialisée à la demande (préférer to_frame())
+        return self.recorder.records()
 
     def play_round(self):
-        move1 = self.agent1.make_move(self.agent2.history)
-        move2 = self.agent2.make_move(self.agent1.history)
+        if self._moves_in_parallel():
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            # Le coup de l'agent 2 part dans un thread pendant que l'agent 1 joue
+            future2 = self._executor.submit(self.agent2.make_move, self.agent1.history)
+            move1 = self.agent1.make_move(self.agent2.history)
+            move2 = future2.result()
+        else:
+            move1 = self.agent1.make_move(self.agent2.history)
+            move2 = self.agent2.make_move(self.agent1.history)
+        self._record_round(move1, move2)
+
+    async def play_round_async(self):
+        if self._moves_in_parallel():
+            move1, move2 = await asyncio.gather(
+                self.agent1.make_move_async(self.agent2.history),
+                self.agent2.make_move_async(self.agent1.history),
+            )
+        else:
+            move1 = await self.agent1.make_move_async(self.agent2.history)
+            move2 = await self.agent2.make_move_async(self.agent1.history)
+        self._record_round(move1, move2)
 
+    def _record_round(self, move1: Optional[str], move2: Optional[str]):
+        if self.metrics is not None:
+            self.metrics.append(self.agent1.last_call, self.agent2.last_call,
+                                move1 not in (COOPERATE, DEFECT), move2 not in (COOPERATE, DEFECT))
         # Garantit une action valide même si l'agent a renvoyé None ou autre chose
         if move1 not in (COOPERATE, DEFECT):
             # Ne pas print pour éviter le spam dans les versions parallèles
@@ -173,47 +609,77 @@ class Game:
         self.agent1.update_score(score1)
         self.agent2.update_score(score2)
 
-        round_data = {
-            "round": len(self.history) + 1,
-            "agent1_name": self.agent1.name,
-            "agent1_type": self.agent1.agent_type,
-            "agent1_context_mentioned": self.agent1.context_mentioned,
-            "agent1_temperature": self.agent1.temperature,
-            "agent1_move": move1,
-            "agent1_score": score1,
-            "agent1_total_score": self.agent1.score,
-            "agent2_name": self.agent2.name,
-            "agent2_type": self.agent2.agent_type,
-            "agent2_context_mentioned": self.agent2.context_mentioned,
-            "agent2_temperature": self.agent2.temperature,
-            "agent2_move": move2,
-            "agent2_score": score2,
-            "agent2_total_score": self.agent2.score,
-        }
-        self.history.append(round_data)
+        self.recorder.append(move1, move2, score1, score2, self.agent1.score, self.agent2.score)
+        for feature in self.features:
+            feature.update(move1, move2, score1, score2)
 
-    def run_game(self, rounds: int, verbose: bool = False):
+    def _start_game(self, rounds: int, verbose: bool):
         self.agent1.reset()
         self.agent2.reset()
-        self.history = []
+        self.recorder = RoundRecorder(self._metadata(), capacity=rounds)
+        for feature in self.features:
+            feature.reset()
+        if self.metrics is not None:
+            self.metrics.clear()
         
         if verbose:
             print(f"Starting game: {self.agent1.name} vs {self.agent2.name} for {rounds} rounds.")
+
+    def run_game(self, rounds: int, verbose: bool = False):
+        self._start_game(rounds, verbose)
+        try:
+            for _ in range(rounds):
+                self.play_round()
+        finally:
+            self.close()
+        if verbose:
+            print("Game over.")
+
+    async def run_game_async(self, rounds: int, verbose: bool = False):
+        """Comme run_game, mais les coups des agents I/O sont attendus sans bloquer la boucle."""
+        self._start_game(rounds, verbose)
         for _ in range(rounds):
-            self.play_round()
+            await self.play_round_async()
         if verbose:
             print("Game over.")
 
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Table des rounds construite directement depuis les colonnes du
+        recorder, suivie des mesures par round si la partie est instrumentée.
+        """
+        df = self.recorder.to_frame()
+        if self.metrics is not None:
+            df = pd.concat([df, pd.DataFrame(self.metrics.to_columns())], axis=1)
+        return df
+
+    def summary(self) -> Dict[str, Any]:
+        """Une ligne par partie : identité, agents, nombre de rounds et résumés des accumulateurs."""
+        summary = {**self._metadata(), "rounds": len(self.recorder)}
+        for feature in self.features:
+            summary.update(feature.summary())
+        return summary
+
+    def save_summary(self, filename: str):
+        write_parquet_atomic(pd.DataFrame([self.summary()]), filename)
+
+    def model_metrics(self) -> List[Dict[str, Any]]:
+        """Mesures de la partie résumées par modèle Ollama (vide si la partie n'est pas instrumentée)."""
+        if self.metrics is None:
+            return []
+        identity = {"match_id": self.match_id, "sim_id": self.sim_id, "repetition": self.repetition}
+        models = (getattr(self.agent1, "model", None), getattr(self.agent2, "model", None))
+        return [{**identity, **summary} for summary in self.metrics.model_metrics(models)]
+
+    def save_metrics(self, filename: str):
+        write_parquet_atomic(pd.DataFrame(self.model_metrics()), filename)
+
     def save_results(self, filename: str, verbose: bool = False):
-        if not self.history:
+        if len(self.recorder) == 0:
             raise ValueError(f"Cannot save empty history for game {self.agent1.name} vs {self.agent2.name}")
         
-        df = pd.DataFrame(self.history)
-        
-        # S'assurer que le répertoire existe
-        os.makedirs(os.path.dirname(filename) if os.path.dirname(filename) else ".", exist_ok=True)
-        
-        df.to_parquet(filename, index=False)
+        df = self.to_frame()
+        write_parquet_atomic(df, filename)
         if verbose:
             print(f"Results saved to {filename} ({len(df)} rows)")
         return df
@@ -0,0 +1,190 @@
+"""
+Instrumentation des appels Ollama et des parties.
+
+Chaque coup d'un `OllamaAgent` laisse sa mesure dans `agent.last_call`
+(`call_record`) : durée de `make_move` (horloge murale, attente du
+sémaphore comprise en mode asyncio), compteurs et durées renvoyés par
+Ollama (`eval_count`, `prompt_eval_count`, `eval_duration`,
+`prompt_eval_duration`, `load_duration`, convertis en secondes), réponse
+servie par le cache, réponse illisible (`parse_failure`) ou exception
+(`error`, avalée par `make_move` qui renvoie None).
+
+`Game(instrument=True)` range ces mesures par round (`RoundMetrics`) avec
+les coups remplacés par COOPERATE (`fallback`) : colonnes optionnelles
+`agent1_wall_time`, ..., `agent2_fallback` de la table des rounds, et
+résumé de la partie par modèle (`Game.model_metrics`, écrit sous
+`results/metrics/`). `model_metrics` agrège ces résumés par modèle :
+temps de chargement, d'évaluation du prompt et de génération se lisent
+séparément.
+
+    python instrumentation.py results --output results/model_metrics.json
+"""
+import argparse
+import glob
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+# Sous-répertoire des résumés par modèle, à côté des rounds
+METRICS_DIRNAME = "metrics"
+MODEL_METRICS_FILENAME = "model_metrics.json"
+
+# Compteurs et durées (nanosecondes) renvoyés par Ollama avec chaque génération
+OLLAMA_COUNTS = ["eval_count", "prompt_eval_count"]
+OLLAMA_DURATIONS = ["eval_duration", "prompt_eval_duration", "load_duration"]
+
+CALL_MEASURES = ["wall_time"] + OLLAMA_COUNTS + OLLAMA_DURATIONS
+CALL_FLAGS = ["cache_hit", "parse_failure", "error"]
+
+# Colonnes optionnelles de la table des rounds, pour chaque agent (préfixe agent1_ / agent2_)
+ROUND_METRICS = CALL_MEASURES + CALL_FLAGS + ["fallback"]
+
+# Résumé d'une partie pour un modèle (sommes : les résumés s'additionnent entre parties)
+SUMMARY_COUNTS = ["calls", "requests", "cache_hits", "parse_failures", "errors", "fallbacks"]
+SUMMARY_SUMS = CALL_MEASURES
+
+_NO_CALL = {**{name: math.nan for name in CALL_MEASURES}, **{name: False for name in CALL_FLAGS}}
+
+
+def _response_field(response: Any, name: str) -> float:
+    value = response.get(name) if response is not None else None
+    return float(value) if value is not None else math.nan
+
+
+def call_record(wall_time: float, response: Any = None, cache_hit: bool = False,
+                parse_failure: bool = False, error: Optional[BaseException] = None) -> Dict[str, Any]:
+    """Mesure d'un `make_move` ; `response` est la réponse d'`ollama.generate` (None si cache ou erreur)."""
+    record = {"wall_time": wall_time, "cache_hit": cache_hit, "parse_failure": parse_failure,
+              "error": error is not None}
+    for name in OLLAMA_COUNTS:
+        record[name] = _response_field(response, name)
+    for name in OLLAMA_DURATIONS:
+        record[name] = _response_field(response, name) / 1e9
+    return record
+
+
+class RoundMetrics:
+    """Mesures des deux agents à chaque round, en colonnes."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.columns: Dict[str, List[Any]] = {
+            f"agent{i}_{name}": [] for i in (1, 2) for name in ROUND_METRICS
+        }
+
+    def append(self, call1: Optional[Dict[str, Any]], call2: Optional[Dict[str, Any]],
+               fallback1: bool, fallback2: bool):
+        for i, call, fallback in ((1, call1, fallback1), (2, call2, fallback2)):
+            call = call or _NO_CALL
+            for name in CALL_MEASURES + CALL_FLAGS:
+                self.columns[f"agent{i}_{name}"].append(call[name])
+            self.columns[f"agent{i}_fallback"].append(fallback)
+
+    def __len__(self) -> int:
+        return len(self.columns["agent1_fallback"])
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        return {
+            col: np.asarray(values, dtype=np.float64 if col.split("_", 1)[1] in CALL_MEASURES else np.bool_)
+            for col, values in self.columns.items()
+        }
+
+    def model_metrics(self, models: Sequence[Optional[str]]) -> List[Dict[str, Any]]:
+        """
+        Résumé par modèle (`models` : modèle de chaque agent, None pour un
+        agent codé) : nombre de coups, d'appels servis par Ollama, de
+        réponses en cache, illisibles, d'exceptions et de coups remplacés,
+        sommes des durées et compteurs, plus longue durée d'un coup.
+        """
+        columns = self.to_columns()
+        summaries: Dict[str, Dict[str, Any]] = {}
+        for i, model in enumerate(models, start=1):
+            if model is None:
+                continue
+            side = {name: columns[f"agent{i}_{name}"] for name in ROUND_METRICS}
+            requests = ~side["cache_hit"] & ~side["error"]
+            summary = summaries.setdefault(model, {"model": model, **{name: 0 for name in SUMMARY_COUNTS},
+                                                   **{f"{name}_sum": 0.0 for name in SUMMARY_SUMS},
+                                                   "wall_time_max": 0.0})
+            summary["calls"] += len(side["wall_time"])
+            summary["requests"] += int(requests.sum())
+            summary["cache_hits"] += int(side["cache_hit"].sum())
+            summary["parse_failures"] += int(side["parse_failure"].sum())
+            summary["errors"] += int(side["error"].sum())
+            summary["fallbacks"] += int(side["fallback"].sum())
+            for name in SUMMARY_SUMS:
+                summary[f"{name}_sum"] += float(np.nansum(side[name]))
+            if len(side["wall_time"]):
+                summary["wall_time_max"] = max(summary["wall_time_max"], float(np.nanmax(side["wall_time"])))
+        return list(summaries.values())
+
+
+def model_metrics(results_dir: str = "results", con: Optional[duckdb.DuckDBPyConnection] = None) -> pd.DataFrame:
+    """
+    Métriques par modèle de toutes les parties instrumentées de
+    `results_dir` : totaux, durée moyenne d'un coup, temps moyens de
+    chargement et d'évaluation du prompt par appel servi, débit de
+    génération (tokens/s) et taux d'échecs (%).
+    """
+    pattern = os.path.join(results_dir, METRICS_DIRNAME, "*.parquet")
+    if not glob.glob(pattern):
+        raise FileNotFoundError(f"No instrumentation metrics found in {os.path.dirname(pattern)}")
+    con = con if con is not None else duckdb.connect()
+    sums = ", ".join([f"SUM({name})::BIGINT AS {name}" for name in SUMMARY_COUNTS]
+                     + [f"SUM({name}_sum) AS {name}_sum" for name in SUMMARY_SUMS])
+    return con.execute(f"""
+        SELECT *,
+            wall_time_sum / NULLIF(calls, 0) AS wall_time_mean,
+            load_duration_sum / NULLIF(requests, 0) AS load_duration_mean,
+            prompt_eval_duration_sum / NULLIF(requests, 0) AS prompt_eval_duration_mean,
+            eval_duration_sum / NULLIF(requests, 0) AS eval_duration_mean,
+            eval_count_sum / NULLIF(eval_duration_sum, 0) AS tokens_per_second,
+            100.0 * parse_failures / NULLIF(calls, 0) AS parse_failure_rate,
+            100.0 * errors / NULLIF(calls, 0) AS error_rate,
+            100.0 * fallbacks / NULLIF(calls, 0) AS fallback_rate
+        FROM (
+            SELECT model, {sums}, MAX(wall_time_max) AS wall_time_max
+            FROM read_parquet('{pattern}', union_by_name = true)
+            GROUP BY model
+        )
+        ORDER BY model
+    """).fetchdf()
+
+
+def write_model_metrics(results_dir: str = "results", path: Optional[str] = None) -> str:
+    """Écrit `model_metrics(results_dir)` en JSON (une entrée par modèle) et renvoie le chemin."""
+    path = path or os.path.join(results_dir, MODEL_METRICS_FILENAME)
+    metrics = model_metrics(results_dir)
+    records = json.loads(metrics.to_json(orient="records"))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({record.pop("model"): record for record in records}, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Métriques d'instrumentation par modèle")
+    parser.add_argument("results_dir", nargs="?", default="results")
+    parser.add_argument("--output", default=None,
+                        help=f"Fichier JSON des métriques (défaut : <results_dir>/{MODEL_METRICS_FILENAME})")
+    args = parser.parse_args(argv)
+    path = write_model_metrics(args.results_dir, args.output)
+    for row in model_metrics(args.results_dir).itertuples(index=False):
+        print(f"{row.model}: {row.calls:,} coups, {row.wall_time_mean:.2f} s/coup "
+              f"(chargement {row.load_duration_mean:.2f} s, prompt {row.prompt_eval_duration_mean:.2f} s, "
+              f"génération {row.eval_duration_mean:.2f} s), {row.errors:,} erreurs, "
+              f"{row.parse_failures:,} réponses illisibles, {row.fallbacks:,} coups remplacés")
+    print(f"✓ Métriques par modèle -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Manifeste des simulations d'un sweep.
+
+Une base SQLite (par défaut `results/manifest.sqlite`) garde une ligne par
+`sim_id` : configuration des deux agents, seed, nombre de rounds, statut
+(`done` / `failed`), nombre de lignes écrites, chemin du parquet, erreur
+et horodatage. Elle est mise à jour au fil de l'eau par le processus
+principal, si bien qu'un run interrompu peut être repris (`--resume`) en
+ne relançant que les tâches absentes, échouées ou dont le fichier ne
+correspond plus au manifeste.
+"""
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+MANIFEST_FILENAME = "manifest.sqlite"
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def config_signature(config1: Dict[str, Any], config2: Dict[str, Any], rounds: int,
+                     seed: Optional[int]) -> str:
+    """Sérialisation stable de tout ce qui détermine le contenu d'une simulation."""
+    return json.dumps({"agent1": config1, "agent2": config2, "rounds": rounds, "seed": seed},
+                      sort_keys=True)
+
+
+def parquet_rows(path: str) -> Optional[int]:
+    """Nombre de lignes d'après le footer du parquet, ou None si illisible."""
+    try:
+        return pq.ParquetFile(path).metadata.num_rows
+    except Exception:
+        return None
+
+
+def stored_agent(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Colonnes d'agent (`game_metadata`) qu'une partie jouée avec `config` écrit dans son parquet."""
+    if config["type"] == "strategy":
+        return {"name": config["name"], "type": "Strategy", "context_mentioned": False, "temperature": None}
+    return {"name": config["name"], "type": "Ollama", "context_mentioned": bool(config["context"]),
+            "temperature": config["temperature"]}
+
+
+def file_matches_config(path: str, config1: Dict[str, Any], config2: Dict[str, Any], rounds: int,
+                        seed: Optional[int]) -> bool:
+    """
+    Vrai si le parquet d'une partie (format large, écrit sans manifeste)
+    contient exactement les rounds 1..`rounds` joués par ces deux agents.
+    Ces fichiers ne gardent pas la seed : avec une seed demandée, le
+    fichier n'est retenu que s'il porte une colonne `seed` identique.
+    """
+    try:
+        table = pq.read_table(path)
+    except Exception:
+        return False
+    if table.num_rows != rounds or "round" not in table.column_names:
+        return False
+    round_range = pc.min_max(table["round"]).as_py()
+    if round_range != {"min": 1, "max": rounds}:
+        return False
+    expected = {f"agent{i}_{name}": value
+                for i, config in ((1, config1), (2, config2))
+                for name, value in stored_agent(config).items()}
+    if seed is not None:
+        expected["seed"] = seed
+    for column, value in expected.items():
+        if column not in table.column_names:
+            return False
+        values = table[column].unique().to_pylist()
+        if values != [value]:
+            return False
+    return True
+
+
+class Manifest:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS simulations ("
+            " sim_id INTEGER PRIMARY KEY,"
+            " agent1 TEXT, agent2 TEXT, config TEXT NOT NULL, seed INTEGER, rounds INTEGER,"
+            " status TEXT NOT NULL, rows INTEGER, path TEXT, error TEXT, finished_at REAL)"
+        )
+
+    def record(self, sim_id: int, config1: Dict[str, Any], config2: Dict[str, Any], rounds: int,
+               seed: Optional[int], status: str, rows: Optional[int] = None,
+               path: Optional[str] = None, error: Optional[str] = None):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO simulations"
+            " (sim_id, agent1, agent2, config, seed, rounds, status, rows, path, error, finished_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (sim_id, config1.get("name"), config2.get("name"),
+             config_signature(config1, config2, rounds, seed), seed, rounds,
+             status, rows, path, error, time.time()),
+        )
+
+    def entries(self) -> Dict[int, Dict[str, Any]]:
+        cursor = self._conn.execute(
+            "SELECT sim_id, config, status, rows, path, error FROM simulations")
+        return {
+            row[0]: {"config": row[1], "status": row[2], "rows": row[3], "path": row[4], "error": row[5]}
+            for row in cursor
+        }
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._conn.execute("SELECT status, COUNT(*) FROM simulations GROUP BY status"))
+
+    def pending_tasks(self, tasks: Iterable[Tuple], rounds: int, seed: Optional[int],
+                      path_for=None) -> Tuple[List[Tuple], int]:
+        """
+        Tâches à (re)lancer pour une reprise, et nombre de tâches déjà faites.
+
+        Une tâche est considérée comme faite si le manifeste la marque `done`
+        avec la même configuration et que son parquet est lisible et contient
+        au moins ses lignes (un fichier du mode --sink regroupe plusieurs
+        parties). `path_for(task)` donne le chemin attendu d'une tâche absente
+        du manifeste : un fichier produit avant l'introduction du manifeste
+        est alors adopté s'il correspond à la configuration
+        (`file_matches_config`), sinon la tâche est relancée.
+        """
+        entries = self.entries()
+        pending = []
+        done = 0
+        # Les fichiers du mode --sink contiennent plusieurs parties : un seul
+        # footer lu par fichier
+        file_rows: Dict[str, Optional[int]] = {}
+        for task in tasks:
+            config1, config2, sim_id = task[:3]
+            signature = config_signature(config1, config2, rounds, seed)
+            entry = entries.get(sim_id)
+            if entry is not None:
+                path = entry["path"]
+                if entry["status"] == STATUS_DONE and entry["config"] == signature and path:
+                    if path not in file_rows:
+                        file_rows[path] = parquet_rows(path)
+                    valid = file_rows[path] is not None and file_rows[path] >= entry["rows"]
+                else:
+                    valid = False
+                if valid:
+                    done += 1
+                    continue
+            elif path_for is not None:
+                path = path_for(task)
+                if os.path.exists(path) and file_matches_config(path, config1, config2, rounds, seed):
+                    self.record(sim_id, config1, config2, rounds, seed, STATUS_DONE, rounds, path)
+                    done += 1
+                    continue
+            pending.append(task)
+        return pending, done
+
+    def close(self):
+        self._conn.close()
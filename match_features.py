@@ -0,0 +1,163 @@
+"""
+Caractéristiques de match calculées pendant la partie.
+
+`Game` met à jour ses accumulateurs une fois par round et les résume en fin
+de partie (`Game.summary`). Les définitions sont celles de `enrich` :
+représailles / pardon après une défection adverse au round précédent,
+représailles "mémoire" après au moins une défection adverse dans les
+`RETALIATION_MEMORY` rounds précédents, taux en %, écart-type des
+coopérations avec ddof=1. L'analyse peut donc lire la table des résumés
+(une ligne par partie, sous `results/summaries/`) au lieu des rounds ;
+`enrich.behavior_patterns` s'applique directement à ses colonnes.
+
+Un accumulateur supplémentaire se branche en passant `features=` à `Game`.
+"""
+import glob
+import math
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import duckdb
+import pandas as pd
+
+# Mêmes codes que game_engine (pas d'import : game_engine importe ce module)
+COOPERATE = "C"
+DEFECT = "D"
+
+# Fenêtre de la "mémoire" de représailles (rounds précédents)
+RETALIATION_MEMORY = 5
+
+# Sous-répertoire des résumés, à côté des rounds
+SUMMARIES_DIRNAME = "summaries"
+
+
+class FeatureAccumulator(ABC):
+    """Caractéristique mise à jour à chaque round et résumée en fin de partie."""
+
+    @abstractmethod
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def update(self, move1: str, move2: str, score1: int, score2: int):
+        pass
+
+    @abstractmethod
+    def summary(self) -> Dict[str, Any]:
+        pass
+
+
+class CooperationFeatures(FeatureAccumulator):
+    """Coopérations, taux de coopération (%) et écart-type des décisions de chaque agent."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.rounds = 0
+        self.cooperations = [0, 0]
+
+    def update(self, move1: str, move2: str, score1: int, score2: int):
+        self.rounds += 1
+        self.cooperations[0] += move1 == COOPERATE
+        self.cooperations[1] += move2 == COOPERATE
+
+    def summary(self) -> Dict[str, Any]:
+        n = self.rounds
+        summary: Dict[str, Any] = {}
+        for i, k in enumerate(self.cooperations, start=1):
+            mean = k / n if n else math.nan
+            # Variance d'une suite de 0/1 : k écarts (1 - m)², n - k écarts m²
+            std = math.sqrt((k * (1 - mean) ** 2 + (n - k) * mean ** 2) / (n - 1)) if n > 1 else math.nan
+            summary[f"agent{i}_cooperations"] = k
+            summary[f"agent{i}_cooperation_rate"] = mean * 100
+            summary[f"agent{i}_decision_std"] = std
+        return summary
+
+
+class RetaliationFeatures(FeatureAccumulator):
+    """Représailles (immédiates et sur la mémoire) et pardons de chaque agent."""
+
+    def __init__(self, memory: int = RETALIATION_MEMORY):
+        self.memory = memory
+        self.reset()
+
+    def reset(self):
+        self.rounds = 0
+        self.previous: Optional[tuple] = None
+        # Défections adverses des derniers rounds, vues par chaque agent
+        self.recent = (deque(maxlen=self.memory), deque(maxlen=self.memory))
+        self.retaliations = [0, 0]
+        self.retaliations_memories = [0, 0]
+        self.forgivenesses = [0, 0]
+
+    def update(self, move1: str, move2: str, score1: int, score2: int):
+        moves = (move1, move2)
+        for i in (0, 1):
+            move = moves[i]
+            if self.previous is not None and self.previous[1 - i] == DEFECT:
+                if move == DEFECT:
+                    self.retaliations[i] += 1
+                else:
+                    self.forgivenesses[i] += 1
+            if move == DEFECT and any(self.recent[i]):
+                self.retaliations_memories[i] += 1
+        for i in (0, 1):
+            self.recent[i].append(moves[1 - i] == DEFECT)
+        self.previous = moves
+        self.rounds += 1
+
+    def summary(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {}
+        for i in (0, 1):
+            agent = f"agent{i + 1}"
+            summary[f"{agent}_retaliations"] = self.retaliations[i]
+            summary[f"{agent}_retaliations_memories"] = self.retaliations_memories[i]
+            summary[f"{agent}_forgivenesses"] = self.forgivenesses[i]
+            summary[f"{agent}_retaliation_rate"] = self.retaliations[i] / self.rounds * 100 if self.rounds else math.nan
+            summary[f"{agent}_forgiveness_rate"] = self.forgivenesses[i] / self.rounds * 100 if self.rounds else math.nan
+        return summary
+
+
+class ScoreFeatures(FeatureAccumulator):
+    """Scores totaux et issue du match."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.totals = [0, 0]
+
+    def update(self, move1: str, move2: str, score1: int, score2: int):
+        self.totals[0] += score1
+        self.totals[1] += score2
+
+    def summary(self) -> Dict[str, Any]:
+        score1, score2 = self.totals
+        if score1 > score2:
+            outcome = "agent1_win"
+        elif score2 > score1:
+            outcome = "agent2_win"
+        else:
+            outcome = "draw"
+        return {"agent1_match_score": score1, "agent2_match_score": score2, "match_outcome": outcome}
+
+
+DEFAULT_FEATURES = (CooperationFeatures, RetaliationFeatures, ScoreFeatures)
+
+
+def default_features() -> List[FeatureAccumulator]:
+    return [feature() for feature in DEFAULT_FEATURES]
+
+
+def load_summaries(results_dir: str = "results", con: Optional[duckdb.DuckDBPyConnection] = None) -> pd.DataFrame:
+    """Résumés de toutes les parties de `results_dir` (une ligne par partie)."""
+    pattern = os.path.join(results_dir, SUMMARIES_DIRNAME, "*.parquet")
+    if not glob.glob(pattern):
+        raise FileNotFoundError(f"No match summaries found in {os.path.dirname(pattern)}")
+    con = con if con is not None else duckdb.connect()
+    return con.execute(
+        f"SELECT * FROM read_parquet('{pattern}', union_by_name = true) ORDER BY agent1_name, agent2_name, sim_id"
+    ).fetchdf()
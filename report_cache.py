@@ -0,0 +1,154 @@
+"""
+Cache disque des calculs du rapport Streamlit.
+
+Chaque requête de page (`report_data.agent_stats`, `cooperation_curve`,
+...) est mise en cache sous la clé (version du jeu de données, fonction,
+arguments). La version est l'empreinte des fichiers enrichis agrégés
+(`report_data.dataset_version`), préfixée par l'empreinte du code des
+requêtes (`CODE_VERSION`) : quand les données ou `report_data.py` changent,
+les entrées des autres versions sont supprimées. Le stockage est une base SQLite
+locale, partagée entre sessions et conservée entre deux démarrages du
+serveur ; `enrich.py` la préremplit (`warm`) après avoir recalculé les
+agrégats, pour qu'un nouveau déploiement démarre à chaud.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import duckdb
+
+import report_data
+
+DEFAULT_REPORT_CACHE_PATH = os.path.join("cache", "report_cache.sqlite")
+
+# À incrémenter quand la forme des valeurs en cache change hors de report_data.py
+REPORT_CACHE_VERSION = 1
+
+
+def code_version() -> str:
+    """Empreinte du format du cache et du source de `report_data` (requêtes des pages)."""
+    with open(report_data.__file__, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    return f"v{REPORT_CACHE_VERSION}-{digest}"
+
+
+CODE_VERSION = code_version()
+
+# Phases de la page "Dynamique Temporelle" : (premier round, dernier round, libellé)
+PHASES = [
+    (1, 20, "Amorce (1-20)"),
+    (21, 50, "Exploration (21-50)"),
+    (51, 100, "Stabilisation (51-100)"),
+    (101, 200, "Équilibre (101-200)"),
+]
+
+# Requêtes des pages, avec les arguments utilisés par streamlit_report.py
+PAGE_QUERIES = [
+    (report_data.overview,),
+    (report_data.agent_stats,),
+    (report_data.family_scores,),
+    (report_data.segment_stats, ["family"]),
+    (report_data.segment_stats, ["context_used_flag"], "is_ia = 1"),
+    (report_data.segment_totals, "is_ia = 1"),
+    (report_data.segment_totals, "family = 'coded'"),
+    (report_data.segment_totals, "family = 'qwen'"),
+    (report_data.segment_totals, "family = 'gemma'"),
+    (report_data.ia_temperature_buckets,),
+    (report_data.box_stats,),
+    (report_data.box_outliers,),
+    (report_data.cooperation_curve,),
+    (report_data.phase_stats, PHASES),
+    (report_data.outcome_counts,),
+]
+
+
+class ReportCache:
+    def __init__(self, path: str = DEFAULT_REPORT_CACHE_PATH):
+        self.path = path
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " version TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, PRIMARY KEY (version, key))"
+        )
+
+    def use_version(self, version: Optional[str]):
+        """
+        Passe à la version `version` des données (pour le code courant,
+        `CODE_VERSION`) et supprime les entrées des autres versions.
+        """
+        version = f"{CODE_VERSION}:{version or ''}"
+        with self._lock:
+            if version == self.version:
+                return
+            self._conn.execute("DELETE FROM entries WHERE version != ?", (version,))
+            self.version = version
+
+    @staticmethod
+    def make_key(func: Callable, args: tuple, kwargs: Dict[str, Any]) -> str:
+        return json.dumps([func.__name__, list(args), kwargs], ensure_ascii=False, sort_keys=True)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        version = self.version or ""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE version = ? AND key = ?", (version, key)).fetchone()
+        if row is not None:
+            self.hits += 1
+            return pickle.loads(row[0])
+        self.misses += 1
+        value = compute()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO entries (version, key, value) VALUES (?, ?, ?)",
+                               (version, key, pickle.dumps(value)))
+        return value
+
+    def query(self, func: Callable, con: duckdb.DuckDBPyConnection, *args, **kwargs) -> Any:
+        """`func(con, *args, **kwargs)`, mis en cache pour la version courante."""
+        return self.get_or_compute(self.make_key(func, args, kwargs), lambda: func(con, *args, **kwargs))
+
+    def warm(self, con: duckdb.DuckDBPyConnection) -> int:
+        """Calcule les requêtes des pages absentes du cache ; renvoie leur nombre."""
+        misses = self.misses
+        for func, *args in PAGE_QUERIES:
+            self.query(func, con, *args)
+        return self.misses - misses
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def warm(output_dir: str = report_data.DEFAULT_OUTPUT_DIR, path: str = DEFAULT_REPORT_CACHE_PATH) -> int:
+    """Préremplit le cache du rapport pour la version courante des agrégats de `output_dir`."""
+    cache = ReportCache(path)
+    con = report_data.connect(output_dir)
+    try:
+        cache.use_version(report_data.dataset_version(output_dir))
+        return cache.warm(con)
+    finally:
+        con.close()
+        cache.close()
@@ -0,0 +1,438 @@
+"""
+Agrégats précalculés pour `streamlit_report.py`.
+
+Le rapport ne lit plus la table enrichie (une ligne par round) mais de
+petites tables d'agrégats additifs (comptes, sommes, min / max), calculées
+par DuckDB à la fin de l'enrichissement et écrites sous
+`enriched_data/aggregates/` :
+
+- `agents` : par côté (1 / 2), famille et agent ;
+- `segments` : par côté, famille, tranche de température et contexte ;
+- `rounds` : par round_id ;
+- `outcomes` : par couple de coups (CC, CD, DC, DD) ;
+- `matches` : une ligne par match (scores, familles, agents).
+
+Un agent est désigné comme dans le rapport : `<famille>_<rôle attendu>`.
+Les moyennes, taux et écarts-types des pages se déduisent de ces sommes,
+quel que soit le nombre de rounds.
+
+Chaque table a une partie par fichier enrichi (`<table>/<fichier>.parquet`,
+fusionnées par les vues de `connect`) et `sources.json` garde la
+signature (taille, mtime) des fichiers agrégés : `ensure_aggregates` ne
+relit que les fichiers nouveaux ou modifiés. Pendant un sweep, `refresh`
+enrichit les nouveaux résultats et met à jour les agrégats (mode live).
+
+Le rapport ouvre les agrégats avec `connect` (une vue DuckDB par table,
+rien n'est chargé à l'ouverture) et chaque page n'exécute que ses
+requêtes (`agent_stats`, `segment_stats`, ...) : DuckDB ne lit du parquet
+que les colonnes et les lignes demandées, et les colonnes dérivées
+(agent, coup, issue, IA ou codé) sont calculées en SQL.
+"""
+import glob
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import duckdb
+import pandas as pd
+
+from enrich import DEFAULT_OUTPUT_DIR, enriched_source, run_incremental
+from enrich_state import file_signature
+
+AGGREGATES_DIRNAME = "aggregates"
+SOURCES_FILENAME = "sources.json"
+
+# Familles des agents IA (le reste est codé)
+IA_FAMILIES_PATTERN = "qwen|gemma"
+
+# Points au plus d'une courbe envoyée au navigateur
+MAX_CURVE_POINTS = 500
+
+
+def _agent_label(side: int) -> str:
+    return f"agent{side}_family || '_' || agent{side}_role_expected"
+
+
+def _by_side(select: str, group: str) -> str:
+    """Même agrégat pour agent1 et agent2, `{a}` désignant le préfixe de l'agent."""
+    return " UNION ALL ".join(
+        f"SELECT {side} AS side, {select.format(a=f'agent{side}', label=_agent_label(side))}"
+        f" FROM enriched GROUP BY {group}"
+        for side in (1, 2)
+    )
+
+
+AGGREGATE_QUERIES: Dict[str, str] = {
+    "agents": _by_side(
+        "{a}_family AS family, {label} AS agent, COUNT(*) AS rounds,"
+        " SUM({a}_is_cooperation)::BIGINT AS cooperations,"
+        " SUM({a}_match_score)::BIGINT AS score_sum,"
+        " SUM({a}_match_score::DOUBLE * {a}_match_score) AS score_sq_sum,"
+        " MIN({a}_match_score) AS score_min, MAX({a}_match_score) AS score_max,"
+        " SUM({a}_match_cooperation_rate) AS match_cooperation_rate_sum",
+        "ALL",
+    ),
+    "segments": _by_side(
+        "{a}_family AS family, {a}_temperature_bucket AS temperature_bucket,"
+        " {a}_context_used_flag AS context_used_flag, COUNT(*) AS rounds,"
+        " SUM({a}_is_cooperation)::BIGINT AS cooperations,"
+        " SUM({a}_match_score)::BIGINT AS score_sum,"
+        " SUM({a}_conformity_score) AS conformity_sum",
+        "ALL",
+    ),
+    "rounds": """
+        SELECT round_id, COUNT(*) AS rows,
+            SUM(agent1_is_cooperation)::BIGINT AS agent1_cooperations,
+            SUM(agent2_is_cooperation)::BIGINT AS agent2_cooperations,
+            SUM(agent1_match_score)::BIGINT AS agent1_score_sum,
+            SUM(agent2_match_score)::BIGINT AS agent2_score_sum
+        FROM enriched GROUP BY round_id""",
+    "outcomes": """
+        SELECT CASE WHEN agent1_is_cooperation = 1 THEN 'C' ELSE 'D' END
+                || CASE WHEN agent2_is_cooperation = 1 THEN 'C' ELSE 'D' END AS outcome,
+            COUNT(*) AS rows
+        FROM enriched GROUP BY ALL""",
+    "matches": f"""
+        SELECT match_id, agent1_family, agent2_family,
+            {_agent_label(1)} AS agent1, {_agent_label(2)} AS agent2,
+            agent1_match_score, agent2_match_score, match_outcome, COUNT(*) AS rounds
+        FROM enriched GROUP BY ALL""",
+}
+
+
+# Fusion des parties (une par fichier enrichi) dans les vues de `connect`
+AGGREGATE_MERGES: Dict[str, str] = {
+    "agents": """
+        SELECT side, family, agent, SUM(rounds)::BIGINT AS rounds, SUM(cooperations)::BIGINT AS cooperations,
+            SUM(score_sum)::BIGINT AS score_sum, SUM(score_sq_sum) AS score_sq_sum,
+            MIN(score_min) AS score_min, MAX(score_max) AS score_max,
+            SUM(match_cooperation_rate_sum) AS match_cooperation_rate_sum
+        FROM {parts} GROUP BY side, family, agent""",
+    "segments": """
+        SELECT side, family, temperature_bucket, context_used_flag,
+            SUM(rounds)::BIGINT AS rounds, SUM(cooperations)::BIGINT AS cooperations,
+            SUM(score_sum)::BIGINT AS score_sum, SUM(conformity_sum) AS conformity_sum
+        FROM {parts} GROUP BY side, family, temperature_bucket, context_used_flag""",
+    "rounds": """
+        SELECT round_id, SUM(rows)::BIGINT AS rows,
+            SUM(agent1_cooperations)::BIGINT AS agent1_cooperations,
+            SUM(agent2_cooperations)::BIGINT AS agent2_cooperations,
+            SUM(agent1_score_sum)::BIGINT AS agent1_score_sum,
+            SUM(agent2_score_sum)::BIGINT AS agent2_score_sum
+        FROM {parts} GROUP BY round_id""",
+    "outcomes": "SELECT outcome, SUM(rows)::BIGINT AS rows FROM {parts} GROUP BY outcome",
+    # Un match n'est que dans un fichier enrichi
+    "matches": "SELECT * FROM {parts}",
+}
+
+
+def _source_files(source: str) -> List[str]:
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.parquet")))
+    return [source] if os.path.exists(source) else []
+
+
+def _signature(source: str) -> Dict[str, List[int]]:
+    return {path: list(file_signature(path)) for path in _source_files(source)}
+
+
+def _part_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def aggregates_dir(output_dir: str = DEFAULT_OUTPUT_DIR) -> str:
+    return os.path.join(output_dir, AGGREGATES_DIRNAME)
+
+
+def _recorded_signature(output_dir: str) -> Optional[Dict[str, List[int]]]:
+    path = os.path.join(aggregates_dir(output_dir), SOURCES_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_aggregates(output_dir: str = DEFAULT_OUTPUT_DIR, source: Optional[str] = None,
+                     con: Optional[duckdb.DuckDBPyConnection] = None) -> Dict[str, int]:
+    """
+    Met à jour les agrégats de la table enrichie `source` (par défaut
+    `enriched_source(output_dir)`) : seuls les fichiers enrichis nouveaux
+    ou modifiés depuis le dernier calcul sont relus, les parties des
+    fichiers disparus sont supprimées. Renvoie le nombre de fichiers
+    agrégés et retirés.
+    """
+    source = source or enriched_source(output_dir)
+    signature = _signature(source)
+    if not signature:
+        raise FileNotFoundError(f"No enriched data found in {source}")
+    recorded = _recorded_signature(output_dir) or {}
+    changed = [path for path, file_sig in signature.items() if recorded.get(path) != file_sig]
+    current_parts = {_part_name(path) for path in signature}
+    removed = [path for path in recorded if path not in signature]
+
+    target_dir = aggregates_dir(output_dir)
+    con = con if con is not None else duckdb.connect()
+    for path in changed:
+        escaped = path.replace("'", "''")
+        con.execute(f"CREATE OR REPLACE TEMP VIEW enriched AS SELECT * FROM read_parquet('{escaped}')")
+        for name, query in AGGREGATE_QUERIES.items():
+            os.makedirs(os.path.join(target_dir, name), exist_ok=True)
+            part = os.path.join(target_dir, name, f"{_part_name(path)}.parquet")
+            tmp_path = f"{part}.tmp".replace("'", "''")
+            con.execute(f"COPY ({query}) TO '{tmp_path}' (FORMAT PARQUET)")
+            os.replace(f"{part}.tmp", part)
+    for path in removed:
+        if _part_name(path) in current_parts:
+            continue
+        for name in AGGREGATE_QUERIES:
+            part = os.path.join(target_dir, name, f"{_part_name(path)}.parquet")
+            if os.path.exists(part):
+                os.remove(part)
+    # Écrite en dernier : un calcul interrompu laisse ses fichiers marqués comme à refaire
+    with open(os.path.join(target_dir, SOURCES_FILENAME), "w") as f:
+        json.dump(signature, f, indent=2)
+    return {"files": len(changed), "removed": len(removed)}
+
+
+def aggregates_stale(output_dir: str = DEFAULT_OUTPUT_DIR, source: Optional[str] = None) -> bool:
+    return _recorded_signature(output_dir) != _signature(source or enriched_source(output_dir))
+
+
+def dataset_version(output_dir: str = DEFAULT_OUTPUT_DIR) -> Optional[str]:
+    """Empreinte de la table enrichie agrégée (None si pas d'agrégats) : change avec ses fichiers."""
+    path = os.path.join(aggregates_dir(output_dir), SOURCES_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def ensure_aggregates(output_dir: str = DEFAULT_OUTPUT_DIR, source: Optional[str] = None) -> bool:
+    """Met à jour les agrégats s'ils manquent ou si la table enrichie a changé ; True si mis à jour."""
+    if not aggregates_stale(output_dir, source):
+        return False
+    build_aggregates(output_dir, source)
+    return True
+
+
+def connect(output_dir: str = DEFAULT_OUTPUT_DIR,
+            con: Optional[duckdb.DuckDBPyConnection] = None) -> duckdb.DuckDBPyConnection:
+    """
+    Connexion où chaque agrégat est une vue sur ses parties parquet : rien
+    n'est chargé à l'ouverture, chaque requête ne lit que ses colonnes et
+    lignes, et les parties ajoutées ensuite (mode live) sont prises en compte.
+    """
+    ensure_aggregates(output_dir)
+    con = con if con is not None else duckdb.connect()
+    for name, merge in AGGREGATE_MERGES.items():
+        parts = os.path.join(aggregates_dir(output_dir), name, "*.parquet").replace("'", "''")
+        derived = (f", regexp_matches(family, '{IA_FAMILIES_PATTERN}', 'i')::INTEGER AS is_ia"
+                   if name in ("agents", "segments") else "")
+        merged = merge.format(parts=f"read_parquet('{parts}')")
+        con.execute(f"CREATE OR REPLACE VIEW {name} AS SELECT *{derived} FROM ({merged})")
+    return con
+
+
+def refresh(results_dir: str = "results", output_dir: str = DEFAULT_OUTPUT_DIR) -> Dict[str, int]:
+    """
+    Mode live du rapport : enrichit les résultats écrits depuis le dernier
+    appel par un sweep en cours (`enrich.run_incremental`, une partition de
+    plus) puis n'agrège que les partitions nouvelles ou réécrites.
+    """
+    stats = run_incremental(results_dir, output_dir)
+    stats["aggregated"] = 0
+    if _signature(enriched_source(output_dir)) and aggregates_stale(output_dir):
+        stats["aggregated"] = build_aggregates(output_dir)["files"]
+    return stats
+
+
+def load_aggregates(output_dir: str = DEFAULT_OUTPUT_DIR) -> Dict[str, pd.DataFrame]:
+    con = connect(output_dir)
+    try:
+        return {name: con.execute(f"SELECT * FROM {name}").fetchdf() for name in AGGREGATE_MERGES}
+    finally:
+        con.close()
+
+
+# ----------------------------------------------------------------------------
+# Requêtes des pages (quelques dizaines de lignes chacune)
+# ----------------------------------------------------------------------------
+
+def _rate(numerator: str, denominator: str) -> str:
+    return f"{numerator} / NULLIF({denominator}, 0)"
+
+
+def _binary_std(successes: str, count: str) -> str:
+    """Écart-type (ddof=1) d'une suite de 0/1 dont `successes` valent 1."""
+    k, n = f"{successes}::DOUBLE", f"{count}::DOUBLE"
+    return f"CASE WHEN {n} > 1 THEN sqrt(({k} - {k} * {k} / {n}) / ({n} - 1)) END"
+
+
+def _sum_std(total: str, squares: str, count: str) -> str:
+    """Écart-type (ddof=1) à partir de la somme et de la somme des carrés."""
+    s, n = f"{total}::DOUBLE", f"{count}::DOUBLE"
+    return f"CASE WHEN {n} > 1 THEN sqrt(greatest(({squares} - {s} * {s} / {n}) / ({n} - 1), 0)) END"
+
+
+def overview(con: duckdb.DuckDBPyConnection) -> Dict[str, int]:
+    """Matchs, agents, rounds et rounds max par match."""
+    matches, agents = con.execute(
+        "SELECT (SELECT COUNT(DISTINCT match_id) FROM matches), (SELECT COUNT(DISTINCT agent) FROM agents)"
+    ).fetchone()
+    rounds, max_round = con.execute("SELECT SUM(rows)::BIGINT, MAX(round_id) FROM rounds").fetchone()
+    return {"matches": int(matches), "agents": int(agents), "rounds": int(rounds or 0), "max_round": int(max_round or 0)}
+
+
+def agent_stats(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """Agents tous côtés confondus : rounds, coopération (%), scores moyen / min / max."""
+    return con.execute(f"""
+        SELECT agent, SUM(rounds)::BIGINT AS rounds,
+            {_rate("SUM(cooperations)", "SUM(rounds)")} * 100 AS coop_rate,
+            {_rate("SUM(score_sum)", "SUM(rounds)")} AS avg_score,
+            MIN(score_min) AS score_min, MAX(score_max) AS score_max,
+            {_rate("SUM(match_cooperation_rate_sum)", "SUM(rounds)")} AS match_cooperation_rate
+        FROM agents GROUP BY agent ORDER BY agent""").fetchdf()
+
+
+def family_scores(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """Score par famille présente en agent1, scores des deux côtés : moyenne, écart-type, rounds."""
+    return con.execute(f"""
+        SELECT family, {_rate("SUM(score_sum)", "SUM(rounds)")} AS avg_score,
+            {_sum_std("SUM(score_sum)", "SUM(score_sq_sum)", "SUM(rounds)")} AS stddev,
+            SUM(rounds)::BIGINT AS count
+        FROM agents WHERE family IN (SELECT family FROM segments WHERE side = 1)
+        GROUP BY family ORDER BY family""").fetchdf()
+
+
+def segment_stats(con: duckdb.DuckDBPyConnection, by: List[str], where: str = "TRUE",
+                  side: int = 1) -> pd.DataFrame:
+    """
+    Segments de l'agent `side` regroupés selon `by` (une seule ligne si
+    vide) et filtrés par `where` : rounds, coopérations, coopération (%),
+    écart-type des décisions, score et conformité moyens.
+    """
+    columns = ", ".join(by)
+    return con.execute(f"""
+        SELECT {columns + "," if by else ""}
+            COALESCE(SUM(rounds), 0)::BIGINT AS rounds, COALESCE(SUM(cooperations), 0)::BIGINT AS cooperations,
+            {_rate("SUM(cooperations)", "SUM(rounds)")} * 100 AS coop_rate,
+            {_binary_std("SUM(cooperations)", "SUM(rounds)")} AS decision_std,
+            {_rate("SUM(score_sum)", "SUM(rounds)")} AS score,
+            {_rate("SUM(conformity_sum)", "SUM(rounds)")} AS conformity
+        FROM segments WHERE side = {int(side)} AND ({where})
+        {f"GROUP BY {columns} ORDER BY {columns}" if by else ""}""").fetchdf()
+
+
+def segment_totals(con: duckdb.DuckDBPyConnection, where: str = "TRUE", side: int = 1) -> pd.Series:
+    """Totaux des segments de l'agent `side` filtrés par `where` (0 rounds si aucun)."""
+    return segment_stats(con, [], where, side).iloc[0]
+
+
+def ia_temperature_buckets(con: duckdb.DuckDBPyConnection, side: int = 1) -> pd.DataFrame:
+    """Tranches de température des agents IA, moyennes sur tous les agents de la tranche."""
+    return segment_stats(con, ["temperature_bucket"], side=side, where=(
+        f"temperature_bucket IN (SELECT temperature_bucket FROM segments WHERE side = {int(side)} AND is_ia = 1)"))
+
+
+def round_stats(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """Par round_id : taux de coopération de chaque agent (0-1), rounds et sommes."""
+    return con.execute(f"""
+        SELECT round_id, rows, agent1_cooperations, agent2_cooperations, agent1_score_sum,
+            {_rate("agent1_cooperations", "rows")} AS agent1_is_cooperation,
+            {_rate("agent2_cooperations", "rows")} AS agent2_is_cooperation
+        FROM rounds ORDER BY round_id""").fetchdf()
+
+
+def cooperation_curve(con: duckdb.DuckDBPyConnection, window: int = 10,
+                      max_points: int = MAX_CURVE_POINTS) -> pd.DataFrame:
+    """
+    Taux de coopération par round (au plus `max_points` points), leur
+    moyenne et sa moyenne glissante centrée sur `window` points.
+    """
+    rounds = round_stats(con)[["round_id", "rows", "agent1_is_cooperation", "agent2_is_cooperation"]]
+    curve = downsample(rounds, "round_id", "rows", max_points)
+    curve["avg_coop"] = (curve["agent1_is_cooperation"] + curve["agent2_is_cooperation"]) / 2
+    curve["rolling_avg"] = curve["avg_coop"].rolling(window=window, center=True).mean()
+    return curve
+
+
+def phase_stats(con: duckdb.DuckDBPyConnection, phases: List[Tuple[int, int, str]]) -> pd.DataFrame:
+    """Par phase (premier round, dernier round, libellé) : coopération (%) de chaque agent et score moyen de agent1."""
+    rounds = round_stats(con)
+    rows = []
+    for start, end, label in phases:
+        window = rounds[(rounds["round_id"] >= start) & (rounds["round_id"] <= end)]
+        window_rows = window["rows"].sum()
+        if window_rows > 0:
+            rows.append({
+                "phase": label,
+                "coop_rate_1": window["agent1_cooperations"].sum() / window_rows * 100,
+                "coop_rate_2": window["agent2_cooperations"].sum() / window_rows * 100,
+                "avg_score": window["agent1_score_sum"].sum() / window_rows,
+            })
+    return pd.DataFrame(rows)
+
+
+def outcome_counts(con: duckdb.DuckDBPyConnection) -> Dict[str, int]:
+    counts = dict(con.execute("SELECT outcome, SUM(rows)::BIGINT FROM outcomes GROUP BY outcome").fetchall())
+    return {outcome: int(counts.get(outcome, 0)) for outcome in ["CC", "CD", "DC", "DD"]}
+
+
+def _match_scores(side: int) -> str:
+    # Une valeur par match : le score est le même sur tous ses rounds
+    return f"SELECT agent{int(side)}_family AS family, agent{int(side)}_match_score::DOUBLE AS score FROM matches"
+
+
+def box_stats(con: duckdb.DuckDBPyConnection, side: int = 1) -> pd.DataFrame:
+    """
+    Statistiques de box plot du score par famille (une valeur par match),
+    calculées comme Plotly : quartiles par interpolation linéaire,
+    moustaches aux valeurs extrêmes dans 1,5 × IQR, moyenne et écart-type
+    de population.
+    """
+    return con.execute(f"""
+        WITH scores AS ({_match_scores(side)}),
+        quartiles AS (
+            SELECT family, COUNT(*) AS count,
+                quantile_cont(score, 0.25) AS q1, quantile_cont(score, 0.5) AS median,
+                quantile_cont(score, 0.75) AS q3, AVG(score) AS mean, stddev_pop(score) AS sd
+            FROM scores GROUP BY family
+        )
+        SELECT q.family, q.count, q.q1, q.median, q.q3, q.mean, q.sd,
+            MIN(s.score) FILTER (WHERE s.score >= q.q1 - 1.5 * (q.q3 - q.q1)) AS lowerfence,
+            MAX(s.score) FILTER (WHERE s.score <= q.q3 + 1.5 * (q.q3 - q.q1)) AS upperfence
+        FROM quartiles q JOIN scores s USING (family)
+        GROUP BY ALL ORDER BY q.family""").fetchdf()
+
+
+def box_outliers(con: duckdb.DuckDBPyConnection, side: int = 1) -> pd.DataFrame:
+    """Scores hors des moustaches, par famille : une ligne par valeur distincte, avec son nombre de matchs."""
+    return con.execute(f"""
+        WITH scores AS ({_match_scores(side)}),
+        quartiles AS (
+            SELECT family, quantile_cont(score, 0.25) AS q1, quantile_cont(score, 0.75) AS q3
+            FROM scores GROUP BY family
+        )
+        SELECT s.family, s.score, COUNT(*) AS count
+        FROM scores s JOIN quartiles q USING (family)
+        WHERE s.score < q.q1 - 1.5 * (q.q3 - q.q1) OR s.score > q.q3 + 1.5 * (q.q3 - q.q1)
+        GROUP BY ALL ORDER BY s.family, s.score""").fetchdf()
+
+
+def downsample(df: pd.DataFrame, x: str, weight: str, max_points: int = MAX_CURVE_POINTS) -> pd.DataFrame:
+    """
+    Au plus `max_points` points : les lignes consécutives (triées selon
+    `x`) sont regroupées par paquets, `x` prend la première valeur du
+    paquet et les autres colonnes la moyenne pondérée par `weight`.
+    """
+    if len(df) <= max_points:
+        return df.reset_index(drop=True)
+    df = df.sort_values(x).reset_index(drop=True)
+    buckets = df.index.to_numpy() * max_points // len(df)
+    columns = [c for c in df.columns if c not in (x, weight)]
+    weighted = df[columns].mul(df[weight], axis=0)
+    grouped = weighted.groupby(buckets).sum().div(df[weight].groupby(buckets).sum(), axis=0)
+    grouped.insert(0, x, df[x].groupby(buckets).first())
+    grouped[weight] = df[weight].groupby(buckets).sum()
+    return grouped.reset_index(drop=True)
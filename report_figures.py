@@ -0,0 +1,753 @@
+"""
+Figures, tableaux et textes du rapport, partagés par `streamlit_report.py`
+et l'export statique `export_report.py`.
+
+Chaque fonction prend `query(func, *args)`, qui exécute une requête de
+`report_data` (via le cache du rapport côté Streamlit), ou le résultat
+d'une requête, et renvoie une figure Plotly, un DataFrame ou un texte
+HTML. Les textes d'analyse sont déduits des chiffres calculés (familles
+dominantes, taux, écarts) : ils suivent les données d'un sweep à l'autre.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import report_data
+from report_cache import PHASES
+
+Query = Callable[..., object]
+
+# Palette de couleurs douces et harmonieuses
+COLORS = {
+    "ia_primary": "#6B9BD1",      # Bleu doux
+    "coded_primary": "#A8B39F",   # Vert grisé
+    "cooperation": "#8FBC8F",     # Vert pâle
+    "defection": "#CD8162",       # Terracotta doux
+    "mutual_coop": "#A8D5BA",     # Vert menthe
+    "mutual_defect": "#D4A5A5",   # Rose pâle
+    "exploit_1": "#F4D8C8",       # Pêche pâle
+    "exploit_2": "#E8D5C4",       # Beige pâle
+    "neutral": "#B5B3B0",         # Gris neutre
+}
+
+FAMILY_COLORS = {
+    "qwen": COLORS["ia_primary"],
+    "gemma": "#7FA8D4",
+    "coded": COLORS["coded_primary"],
+}
+
+FAMILY_LABELS = {"qwen": "Qwen", "gemma": "Gemma", "coded": "Codé"}
+
+CONTEXT_COLORS = {
+    "Avec contexte": COLORS["cooperation"],
+    "Sans contexte": COLORS["defection"],
+}
+
+DIVERGING_SCALE = [[0, COLORS["defection"]], [0.5, COLORS["neutral"]], [1, COLORS["cooperation"]]]
+SEQUENTIAL_SCALE = [[0, COLORS["defection"]], [1, COLORS["cooperation"]]]
+
+# Écart (points de %) en dessous duquel une différence de coopération est "légère"
+SLIGHT_DIFFERENCE = 5
+
+# Style global des pages (Streamlit et export)
+STYLE = """
+<style>
+    .main-header {
+        font-size: 2.2em;
+        color: #4A5F7F;
+        margin-bottom: 0.5em;
+        font-weight: 600;
+        letter-spacing: 0.5px;
+    }
+    .section-header {
+        font-size: 1.5em;
+        color: #5A7B9E;
+        margin-top: 1.5em;
+        margin-bottom: 0.8em;
+        border-left: 4px solid #6B9BD1;
+        padding-left: 1em;
+        font-weight: 500;
+    }
+    .subsection {
+        font-size: 1.1em;
+        color: #6B7B8F;
+        margin-top: 1em;
+        margin-bottom: 0.5em;
+        font-weight: 500;
+    }
+    .insight-box {
+        background-color: #F5F7FA;
+        padding: 1.2em;
+        border-radius: 0.5em;
+        border-left: 4px solid #6B9BD1;
+        margin: 1em 0;
+        line-height: 1.6;
+    }
+    .metric-card {
+        background-color: #F8F9FB;
+        padding: 1.5em;
+        border-radius: 0.5em;
+        border-top: 3px solid #6B9BD1;
+        text-align: center;
+    }
+    .comparison-table {
+        background-color: #F5F7FA;
+        border-radius: 0.5em;
+        padding: 1em;
+    }
+</style>
+"""
+
+# Pages du rapport : (libellé de navigation, titre, introduction)
+PAGES = [
+    ("🌍 Vue Globale", "1. Vue Globale — Le Terrain de Jeu", """
+    Commençons par comprendre l'architecture générale : combien d'agents, comment sont-ils distribués,
+    et qui gagne vraiment dans ce jeu?
+    """),
+    ("🤝 Coopération & Motifs", "2. Coopération & Motifs Comportementaux", """
+    Plongeons dans les patterns de coopération : qui coopère le plus? Quels sont les comportements
+    dominants? Comment se structurent les interactions?
+    """),
+    ("🏆 Performance & Efficacité", "3. Performance & Efficacité", """
+    Ici, nous questionnons le paradoxe d'Axelrod : la coopération gagne-t-elle vraiment?
+    Ou est-ce plutôt un équilibre complexe entre coopération et réactivité?
+    """),
+    ("🌡️ Facteurs IA", "4. Impact des Facteurs IA", """
+    Les agents IA ne sont pas des monolithes. La température, le contexte et le modèle influent
+    directement sur leur comportement. Explorons ces levers de contrôle.
+    """),
+    ("⚡ Dynamique Temporelle", "5. Dynamique Temporelle — La Coopération Émerge-t-elle?", """
+    Axelrod découvrit que la coopération émerge par répétition. Observons-nous le même phénomène
+    dans notre expérience?
+    """),
+    ("📈 Théorie & Équilibres", "6. Théorie d'Axelrod & Équilibres Observés", """
+    Retournons à la théorie : Axelrod prédisait que Tit-for-Tat gagnerait. Est-ce le cas?
+    Où se situent nos équilibres?
+    """),
+    ("🎯 Synthèse Finale", "7. Synthèse Finale — Monde Codé vs Monde Génératif", """
+    Arrivons à la grande conclusion : quel est l'impact réel de l'IA sur le dilemme du prisonnier?
+    Comment transformer la théorie en action?
+    """),
+]
+
+# Synthèse finale : encadrés (titre, points), insights narratifs, conclusion et recommandations
+PROFILE_CARDS = [
+    ("✓ Stratégies Codées", ["Transparent & Prévisible", "Performance stable", "Optimal dans monde fermé",
+                             "Pas d'adaptation cross-match"]),
+    ("↔ Agents IA", ["Opaque & Adaptable", "Performance variable", "Réactif au contexte", "Apprentissage émergent"]),
+]
+
+FINAL_INSIGHTS = [
+    ("L'IA introduit de la variabilité",
+     "Contrairement aux stratégies codées (déterministes), les agents IA explorent l'espace des actions grâce à la température et au contexte."),
+
+    ("L'IA ne suit pas toujours son rôle",
+     "Température et contexte modifient la prise de décision. Le rôle devient une tendance, pas une règle."),
+
+    ("La coopération est plus fragile mais plus riche",
+     "Émergence plus lente, parfois instable, mais souvent plus réaliste que les stratégies codées."),
+
+    ("Les stratégies codées sont optimales… dans un monde fermé",
+     "Tit-for-Tat gagne toujours, mais manque d'adaptation à des changements d'environnement."),
+]
+
+CONCLUSION_HTML = """
+    <div style="background: linear-gradient(135deg, #F5F7FA 0%, #E8EDF7 100%); padding: 2em; border-radius: 0.5em; border-left: 5px solid #6B9BD1; margin: 1.5em 0;">
+        <h4 style="color: #4A5F7F; margin-top: 0;">L'IA ne remplace pas Axelrod : elle révèle ses limites et les enrichit.</h4>
+        <p style="line-height: 1.8; color: #5A7B8F;">
+            Les <strong>stratégies codées maximisent la performance</strong> dans un environnement stable.
+            <br><br>
+            Les <strong>agents IA transforment le dilemme du prisonnier en système ouvert</strong>, où :
+        </p>
+        <ul style="color: #5A7B8F; line-height: 1.8;">
+            <li>La coopération <strong>n'est plus une règle</strong>, mais une <strong>norme émergente</strong></li>
+            <li>Elle est <strong>sensible au contexte</strong>, au hasard et à l'interprétation</li>
+            <li>Elle <strong>révèle les limites</strong> d'Axelrod et les enrichit de nuances</li>
+        </ul>
+        <p style="color: #6B9BD1; font-style: italic; margin-bottom: 0;">
+            "La coopération n'émerge pas des règles, elle émerge des interactions. Les algorithmes révèlent cela ; les LLM le vivent."
+        </p>
+    </div>
+    """
+
+RECOMMENDATIONS = [
+    ("Pour l'IA", ["Température basse pour contextes critiques", "Contexte riche pour adapter les stratégies",
+                   "Supervision pour éviter dérives"]),
+    ("Pour le Code", ["Garantir réactivité prévisible", "Combiner avec adaptation légère",
+                      "Benchmark continu vs baseline"]),
+    ("Hybride Optimal", ["Fusion IA adaptabilité + Code fiabilité", "Gouvernance multi-agents",
+                         "Norme sociale émerge de coordination"]),
+]
+
+
+def family_label(family: str) -> str:
+    return FAMILY_LABELS.get(family, family.capitalize())
+
+
+# ============================================================================
+# BLOCS HTML
+# ============================================================================
+
+def metric_card(value: str, label: str, color: str, note: Optional[str] = None,
+                size: str = "2em", label_size: str = "0.9em") -> str:
+    note_html = f"\n    <div style='color: #999; font-size: 0.8em;'>{note}</div>" if note is not None else ""
+    return f"""<div class='metric-card'>
+    <div style='font-size: {size}; color: {color}; font-weight: bold;'>{value}</div>
+    <div style='color: #6B7B8F; font-size: {label_size};'>{label}</div>{note_html}
+    </div>"""
+
+
+def insight_box(html: str) -> str:
+    return f"<p class='insight-box'>{html}</p>"
+
+
+def list_card(title: str, items: List[str]) -> str:
+    lines = "\n".join(f"    <li>{item}</li>" for item in items)
+    return f"""<div class='insight-box'>
+    <strong>{title}</strong>
+    <ul style='margin: 0.5em 0;'>
+{lines}
+    </ul>
+    </div>"""
+
+
+# ============================================================================
+# PAGE 1 : VUE GLOBALE
+# ============================================================================
+
+def kpi_cards(query: Query) -> List[str]:
+    """Mouvements et taux de coopération des agents IA et codés."""
+    ia_totals = query(report_data.segment_totals, "is_ia = 1")
+    coded_totals = query(report_data.segment_totals, "family = 'coded'")
+    return [
+        metric_card(f"{int(ia_totals['rounds']):,}", "Mouvements IA", COLORS["ia_primary"]),
+        metric_card(f"{int(coded_totals['rounds']):,}", "Mouvements Codés", COLORS["coded_primary"]),
+        metric_card(f"{ia_totals['coop_rate']:.1f}%", "Coop IA", COLORS["cooperation"]),
+        metric_card(f"{coded_totals['coop_rate']:.1f}%", "Coop Codé", COLORS["coded_primary"]),
+    ]
+
+
+def family_rounds(query: Query) -> pd.DataFrame:
+    return query(report_data.segment_stats, ["family"])[["family", "rounds"]].sort_values("rounds", ascending=False)
+
+
+def family_rounds_figure(family_df: pd.DataFrame) -> go.Figure:
+    fig = px.bar(
+        family_df,
+        x="family",
+        y="rounds",
+        title="",
+        labels={"family": "Famille d'agent", "rounds": "Nombre de rounds"},
+        color_discrete_sequence=[COLORS["ia_primary"] if "qwen" in f else COLORS["ia_primary"] if "gemma" in f else COLORS["coded_primary"] for f in family_df["family"]]
+    )
+    fig.update_layout(showlegend=False, hovermode="x unified", height=350, margin=dict(l=0, r=0, t=20, b=0))
+    return fig
+
+
+def family_rounds_insight(family_df: pd.DataFrame) -> str:
+    """Familles représentées et part des données de la famille dominante."""
+    families = list(family_df.sort_values("rounds", ascending=False)["family"])
+    shares = family_df.set_index("family")["rounds"] / family_df["rounds"].sum() * 100
+    top = families[0]
+    count = {1: "La famille", 2: "Les deux familles", 3: "Les trois familles"}.get(len(families), f"Les {len(families)} familles")
+    names = ", ".join(family_label(f) for f in families)
+    represented = "est bien représentée" if len(families) == 1 else "sont bien représentées"
+    role = ("ce qui reflète l'importance des agents IA dans l'expérience" if top != "coded"
+            else "ce qui reflète la place des stratégies codées dans l'expérience")
+    return (f"💡 <strong>Sanity check</strong> : {count} d'agents ({names}) {represented}. "
+            f"{family_label(top)} domine avec ~{shares[top]:.0f}% des données, {role}.")
+
+
+def leaderboard(query: Query) -> pd.DataFrame:
+    return query(report_data.agent_stats).rename(columns={
+        "rounds": "matches", "score_max": "max_score", "score_min": "min_score"
+    })[["agent", "avg_score", "matches", "max_score", "min_score"]].sort_values("avg_score", ascending=False).head(15)
+
+
+def leaderboard_figure(leaderboard_df: pd.DataFrame) -> go.Figure:
+    fig = px.bar(
+        leaderboard_df.sort_values("avg_score"),
+        y="agent",
+        x="avg_score",
+        orientation="h",
+        title="",
+        labels={"agent": "", "avg_score": "Score moyen"},
+        color="avg_score",
+        color_continuous_scale=DIVERGING_SCALE
+    )
+    fig.update_layout(showlegend=False, height=400, margin=dict(l=150, r=0, t=20, b=0))
+    return fig
+
+
+def leaderboard_insight(leaderboard_df: pd.DataFrame) -> str:
+    top = leaderboard_df.iloc[0]
+    return f"""
+    🏆 <strong>{top['agent']}</strong> domine avec **{top['avg_score']:.1f}** points de score moyen.
+    <br><br>
+    <strong>Observation clé</strong> : Les meilleurs agents combinent stabilité (réactivité à l'adversaire)
+    et adaptation (apprentissage du contexte). Ni pure coopération, ni pure défection.
+    """
+
+
+# ============================================================================
+# PAGE 2 : COOPÉRATION & MOTIFS
+# ============================================================================
+
+def cooperation_by_family(query: Query) -> pd.DataFrame:
+    return query(report_data.segment_stats, ["family"]).rename(columns={"rounds": "count"})[
+        ["family", "coop_rate", "count"]].sort_values("coop_rate", ascending=False)
+
+
+def cooperation_by_family_figure(coop_type_df: pd.DataFrame) -> go.Figure:
+    fig = px.bar(
+        coop_type_df,
+        x="family",
+        y="coop_rate",
+        title="",
+        labels={"family": "Famille", "coop_rate": "Taux de coopération (%)"},
+        color="family",
+        color_discrete_map=FAMILY_COLORS
+    )
+    fig.update_layout(showlegend=False, height=350)
+    return fig
+
+
+def cooperation_by_family_insight(coop_type_df: pd.DataFrame) -> str:
+    """La famille qui coopère le plus, comparée aux autres (de la moins à la plus coopérative)."""
+    ranked = coop_type_df.sort_values("coop_rate", ascending=False)
+    top = ranked.iloc[0]
+    comparisons = []
+    for row in ranked.iloc[1:].sort_values("coop_rate").itertuples(index=False):
+        slightly = "légèrement " if top["coop_rate"] - row.coop_rate < SLIGHT_DIFFERENCE else ""
+        comparisons.append(f"{slightly}plus que {family_label(row.family)} (~{row.coop_rate:.0f}%)")
+    if comparisons:
+        difference = f"{family_label(top['family'])} (~{top['coop_rate']:.0f}%) coopère {' et '.join(comparisons)}."
+    else:
+        difference = f"{family_label(top['family'])} coopère à ~{top['coop_rate']:.0f}%."
+    return f"""
+    👀 <strong>Différence clé</strong> : {difference}
+    <br><br>
+    Cela suggère que <strong>le modèle LLM influe directement sur la stratégie émergente</strong>,
+    indépendamment du rôle spécifié.
+    """
+
+
+def ia_temperature(query: Query) -> pd.DataFrame:
+    """Tranches de température des agents IA (vide si aucune)."""
+    return query(report_data.ia_temperature_buckets).rename(
+        columns={"temperature_bucket": "temperature", "rounds": "count"})
+
+
+def temperature_cooperation_figure(temp_df: pd.DataFrame) -> go.Figure:
+    fig = px.bar(
+        temp_df,
+        x="temperature",
+        y="coop_rate",
+        title="",
+        labels={"temperature": "Température", "coop_rate": "Taux coopération (%)"},
+        color="conformity",
+        color_continuous_scale=SEQUENTIAL_SCALE
+    )
+    fig.update_layout(height=350)
+    return fig
+
+
+def ia_context(query: Query) -> pd.DataFrame:
+    context_df = query(report_data.segment_stats, ["context_used_flag"], "is_ia = 1")
+    context_df["context"] = np.where(context_df["context_used_flag"] == 1, "Avec contexte", "Sans contexte")
+    return context_df.rename(columns={"rounds": "count"})[["context", "score", "coop_rate", "count"]]
+
+
+def context_figure(context_df: pd.DataFrame, y: str, label: str, title: str = "") -> go.Figure:
+    fig = px.bar(
+        context_df,
+        x="context",
+        y=y,
+        title=title,
+        labels={"context": "", y: label},
+        color="context",
+        color_discrete_map=CONTEXT_COLORS
+    )
+    fig.update_layout(showlegend=False, height=350)
+    return fig
+
+
+def context_insight(context_df: pd.DataFrame) -> Optional[str]:
+    """Écart de coopération avec / sans contexte (None s'il manque l'un des deux)."""
+    if len(context_df) != 2:
+        return None
+    context_diff = context_df[context_df["context"] == "Avec contexte"]["coop_rate"].values[0] - \
+                   context_df[context_df["context"] == "Sans contexte"]["coop_rate"].values[0]
+    return f"""
+    📌 <strong>Effet contexte</strong> : La différence est de **{context_diff:.1f}%** de coopération en plus avec contexte.
+    <br><br>
+    Cela révèle que <strong>le prompting influe directement sur les stratégies émergentes</strong>.
+    """
+
+
+def agent_cooperation_figure(query: Query) -> go.Figure:
+    agent_detail_df = query(report_data.agent_stats).rename(columns={"rounds": "matches"})[
+        ["agent", "coop_rate", "matches"]].sort_values("coop_rate", ascending=False)
+    fig = px.scatter(
+        agent_detail_df,
+        x="matches",
+        y="coop_rate",
+        hover_name="agent",
+        size="matches",
+        title="",
+        labels={"matches": "Nombre de mouvements", "coop_rate": "Taux coopération (%)"},
+        color="coop_rate",
+        color_continuous_scale=DIVERGING_SCALE,
+        size_max=50
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+# ============================================================================
+# PAGE 3 : PERFORMANCE & EFFICACITÉ
+# ============================================================================
+
+def family_scores(query: Query) -> pd.DataFrame:
+    return query(report_data.family_scores).sort_values("avg_score", ascending=False)
+
+
+def family_scores_figure(score_type_df: pd.DataFrame) -> go.Figure:
+    fig = px.bar(
+        score_type_df,
+        x="family",
+        y="avg_score",
+        error_y="stddev",
+        title="",
+        labels={"family": "Famille", "avg_score": "Score moyen"},
+        color="family",
+        color_discrete_map=FAMILY_COLORS
+    )
+    fig.update_layout(showlegend=False, height=350)
+    return fig
+
+
+def score_vs_cooperation_figure(query: Query) -> go.Figure:
+    agent_stats_df = query(report_data.agent_stats).head(50).rename(columns={"rounds": "matches"})[
+        ["agent", "match_cooperation_rate", "avg_score", "matches"]].rename(
+        columns={"match_cooperation_rate": "coop_rate"})
+    fig = px.scatter(
+        agent_stats_df,
+        x="coop_rate",
+        y="avg_score",
+        hover_name="agent",
+        size="matches",
+        title="",
+        labels={"coop_rate": "Taux coopération", "avg_score": "Score moyen"},
+        color="avg_score",
+        color_continuous_scale=DIVERGING_SCALE,
+        size_max=50
+    )
+    fig.update_layout(height=450, hovermode="closest")
+    return fig
+
+
+SCORE_PATTERN_INSIGHT = """
+    🔍 <strong>Pattern clé</strong> : Il n'y a <strong>pas de corrélation linéaire</strong> entre coopération et score.
+    <br><br>
+    Les agents optimaux se trouvent dans le <strong>centre-droit du graphe</strong> :
+    coopération modérée + score élevé = <strong>stratégie équilibrée réussie</strong>.
+    """
+
+
+def score_box_figure(query: Query) -> go.Figure:
+    fig = go.Figure()
+    # Statistiques calculées côté serveur (une valeur par match) : seuls les quartiles,
+    # moustaches et valeurs aberrantes distinctes sont envoyés au navigateur
+    box_df = query(report_data.box_stats)
+    outliers_df = query(report_data.box_outliers)
+    for box in box_df.itertuples(index=False):
+        family = box.family
+        color = COLORS["ia_primary"] if "qwen" in family else "#7FA8D4" if "gemma" in family else COLORS["coded_primary"]
+        fig.add_trace(go.Box(
+            name=family,
+            x=[family],
+            q1=[box.q1], median=[box.median], q3=[box.q3],
+            lowerfence=[box.lowerfence], upperfence=[box.upperfence],
+            mean=[box.mean], sd=[box.sd],
+            marker_color=color,
+            boxpoints=False
+        ))
+        family_outliers = outliers_df[outliers_df["family"] == family]
+        if len(family_outliers) > 0:
+            fig.add_trace(go.Scatter(
+                x=[family] * len(family_outliers),
+                y=family_outliers["score"],
+                customdata=family_outliers["count"],
+                mode="markers",
+                marker=dict(color=color, size=5),
+                hovertemplate="%{y} (%{customdata} matchs)<extra></extra>",
+                showlegend=False
+            ))
+
+    fig.update_layout(title="", height=350, showlegend=True, yaxis_title="Score")
+    return fig
+
+
+# ============================================================================
+# PAGE 4 : FACTEURS IA
+# ============================================================================
+
+def temperature_conformity_figure(temp_df: pd.DataFrame) -> go.Figure:
+    fig = px.bar(
+        temp_df,
+        x="temperature",
+        y="conformity",
+        title="",
+        labels={"temperature": "Température", "conformity": "Score conformité"},
+        color="score",
+        color_continuous_scale=SEQUENTIAL_SCALE
+    )
+    fig.update_layout(height=350)
+    return fig
+
+
+def model_comparison(query: Query) -> pd.DataFrame:
+    model_comp = []
+    for family in ["qwen", "gemma"]:
+        data = query(report_data.segment_totals, f"family = '{family}'")
+        if data["rounds"] > 0:
+            model_comp.append({
+                "model": family.upper(),
+                "conformity": data["conformity"],
+                "score": data["score"],
+                "coop_rate": data["coop_rate"],
+                "count": int(data["rounds"])
+            })
+    return pd.DataFrame(model_comp)
+
+
+def model_comparison_figure(model_comp_df: pd.DataFrame) -> go.Figure:
+    fig = px.bar(
+        model_comp_df,
+        x="model",
+        y="conformity",
+        title="",
+        labels={"model": "Modèle", "conformity": "Conformité"},
+        color="coop_rate",
+        color_continuous_scale=SEQUENTIAL_SCALE
+    )
+    fig.update_layout(height=350, showlegend=True)
+    return fig
+
+
+# ============================================================================
+# PAGE 5 : DYNAMIQUE TEMPORELLE
+# ============================================================================
+
+def cooperation_curve_figure(coop_evolution: pd.DataFrame) -> go.Figure:
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=coop_evolution["round_id"],
+        y=coop_evolution["agent1_is_cooperation"],
+        name="Agent 1",
+        line=dict(color=COLORS["ia_primary"], width=1.5),
+        opacity=0.6
+    ))
+    fig.add_trace(go.Scatter(
+        x=coop_evolution["round_id"],
+        y=coop_evolution["agent2_is_cooperation"],
+        name="Agent 2",
+        line=dict(color=COLORS["coded_primary"], width=1.5),
+        opacity=0.6
+    ))
+    fig.add_trace(go.Scatter(
+        x=coop_evolution["round_id"],
+        y=coop_evolution["rolling_avg"],
+        name="Moyenne (10 rounds)",
+        line=dict(color=COLORS["cooperation"], width=3, dash="dash")
+    ))
+
+    fig.update_layout(
+        title="",
+        xaxis_title="Round",
+        yaxis_title="Taux de coopération",
+        hovermode="x unified",
+        height=400,
+        legend=dict(x=0.01, y=0.99)
+    )
+    return fig
+
+
+def cooperation_curve_insight(coop_evolution: pd.DataFrame) -> str:
+    initial_coop = coop_evolution.iloc[0]["avg_coop"] * 100
+    final_coop = coop_evolution.iloc[-1]["avg_coop"] * 100
+    return f"""
+    📊 <strong>Observation</strong> : Coopération initiale {initial_coop:.1f}% → Finale {final_coop:.1f}%
+    <br><br>
+    <strong>Interprétation</strong> : La coopération {'diminue' if final_coop < initial_coop else 'augmente'} de {abs(final_coop - initial_coop):.1f}%.
+    Cela suggère une phase d'apprentissage où les agents testent puis stabilisent leurs stratégies.
+    """
+
+
+def phases(query: Query) -> pd.DataFrame:
+    return query(report_data.phase_stats, PHASES)
+
+
+def phase_cooperation_figure(time_windows_df: pd.DataFrame) -> go.Figure:
+    fig = px.line(
+        time_windows_df,
+        x="phase",
+        y=["coop_rate_1", "coop_rate_2"],
+        title="",
+        labels={"value": "Coopération (%)", "variable": "Agent"},
+        markers=True,
+        color_discrete_map={"coop_rate_1": COLORS["ia_primary"], "coop_rate_2": COLORS["coded_primary"]}
+    )
+    fig.update_layout(height=350, hovermode="x unified")
+    return fig
+
+
+def phase_score_figure(time_windows_df: pd.DataFrame) -> go.Figure:
+    fig = px.bar(
+        time_windows_df,
+        x="phase",
+        y="avg_score",
+        title="",
+        labels={"phase": "", "avg_score": "Score moyen"},
+        color="avg_score",
+        color_continuous_scale=SEQUENTIAL_SCALE
+    )
+    fig.update_layout(height=350, showlegend=False)
+    return fig
+
+
+# ============================================================================
+# PAGE 6 : THÉORIE & ÉQUILIBRES
+# ============================================================================
+
+def outcome_figure(outcome_counts: Dict[str, int]) -> go.Figure:
+    outcome_matrix = np.array([
+        [outcome_counts["CC"], outcome_counts["CD"]],
+        [outcome_counts["DC"], outcome_counts["DD"]]
+    ])
+    fig = go.Figure(data=go.Heatmap(
+        z=outcome_matrix,
+        x=["Agent 2: C", "Agent 2: D"],
+        y=["Agent 1: C", "Agent 1: D"],
+        text=outcome_matrix,
+        texttemplate="%{text}",
+        textfont={"size": 20, "color": "white"},
+        colorscale=DIVERGING_SCALE,
+        colorbar=dict(title="Fréquence")
+    ))
+    fig.update_layout(title="", height=400)
+    return fig
+
+
+def outcome_cards(outcome_counts: Dict[str, int]) -> List[str]:
+    total = sum(outcome_counts.values())
+    cards = [
+        ("CC", "CC (Coop mutuelle)", COLORS["cooperation"]),
+        ("CD", "CD (Agent1 exploité)", COLORS["defection"]),
+        ("DC", "DC (Agent2 exploité)", "#E8D5C4"),
+        ("DD", "DD (Défect mutuelle)", COLORS["mutual_defect"]),
+    ]
+    return [metric_card(f"{outcome_counts[key]:,}", label, color, note=f"{100 * outcome_counts[key] / total:.1f}%",
+                        size="1.8em", label_size="0.85em")
+            for key, label, color in cards]
+
+
+def equilibrium_insight(outcome_counts: Dict[str, int]) -> str:
+    total = sum(outcome_counts.values())
+    return f"""
+    🎯 <strong>Équilibre observé</strong> : CC={100*outcome_counts["CC"]/total:.1f}% + DD={100*outcome_counts["DD"]/total:.1f}% = {100*(outcome_counts["CC"]+outcome_counts["DD"])/total:.1f}%
+    <br><br>
+    Cet équilibre <strong>n'est ni Pareto-optimal</strong> (sinon 100% CC) <strong>ni purement Nash</strong> (sinon 100% DD).
+    <br>C'est un <strong>équilibre émergent</strong> : une norme sociale maintenue par apprentissage mutuel et répétition.
+    """
+
+
+def cooperation_performance(query: Query) -> Tuple[pd.DataFrame, float]:
+    """Coopération (0-1) et score moyen des agents d'au moins 6 rounds, et leur corrélation."""
+    agents_df = query(report_data.agent_stats)
+    agent_perf_df = pd.DataFrame({
+        "agent": agents_df["agent"],
+        "coop_rate": agents_df["coop_rate"] / 100,
+        "avg_score": agents_df["avg_score"],
+        "count": agents_df["rounds"],
+    })
+    agent_perf_df = agent_perf_df[agent_perf_df["count"] > 5]
+    return agent_perf_df, agent_perf_df["coop_rate"].corr(agent_perf_df["avg_score"])
+
+
+def cooperation_performance_figure(agent_perf_df: pd.DataFrame) -> go.Figure:
+    fig = px.scatter(
+        agent_perf_df,
+        x="coop_rate",
+        y="avg_score",
+        size="count",
+        hover_name="agent",
+        title="",
+        labels={"coop_rate": "Taux coopération", "avg_score": "Score moyen", "count": "Mouvements"},
+        color="avg_score",
+        color_continuous_scale=DIVERGING_SCALE,
+        size_max=40
+    )
+
+    # Ajouter une ligne de tendance
+    z = np.polyfit(agent_perf_df["coop_rate"], agent_perf_df["avg_score"], 1)
+    p = np.poly1d(z)
+    x_line = np.linspace(agent_perf_df["coop_rate"].min(), agent_perf_df["coop_rate"].max(), 100)
+
+    fig.add_trace(go.Scatter(
+        x=x_line,
+        y=p(x_line),
+        mode="lines",
+        name="Tendance",
+        line=dict(color=COLORS["neutral"], dash="dash", width=2)
+    ))
+
+    fig.update_layout(height=450, hovermode="closest")
+    return fig
+
+
+def correlation_insight(corr: float) -> str:
+    return f"""
+    📈 <strong>Corrélation Axelrod</strong> : r = **{corr:.3f}**
+    <br><br>
+    {'✓ Corrélation positive forte' if corr > 0.5 else '⚠ Corrélation faible' if corr > 0.2 else '✗ Pas de corrélation claire'}
+    <br><br>
+    <strong>Interprétation</strong> : La coopération <strong>n'est pas le seul facteur</strong> de succès.
+    Les meilleurs agents combinent coopération ET réactivité stratégique.
+    """
+
+
+# ============================================================================
+# PAGE 7 : SYNTHÈSE FINALE
+# ============================================================================
+
+def synthesis_table(query: Query) -> pd.DataFrame:
+    synthesis_rows = []
+    for family in ["qwen", "gemma", "coded"]:
+        data = query(report_data.segment_totals, f"family = '{family}'")
+        synthesis_rows.append({
+            "Type": "IA (Qwen)" if family == "qwen" else "IA (Gemma)" if family == "gemma" else "Codé",
+            "Coopération": f"{data['coop_rate']:.1f}%",
+            "Score Moyen": f"{data['score']:.1f}",
+            "Variabilité": f"{data['decision_std']:.3f}",
+            "Conformité": f"{data['conformity']:.2f}"
+        })
+    return pd.DataFrame(synthesis_rows)
+
+
+def footer(overview: Dict[str, int]) -> str:
+    return f"""
+<div style="text-align: center; color: #8B9BAE; font-size: 0.85em; margin-top: 2rem; padding: 1.5rem;">
+    <p><strong>Dilemme du Prisonnier : IA vs Stratégies Codées</strong></p>
+    <p>Analyse narrative complète • Comportements émergents • Équilibres dynamiques</p>
+    <p style="font-size: 0.8em;">📊 {overview['rounds']:,} rounds | {overview['matches']:,} matchs | {overview['agents']} agents | 🎯 Data-driven storytelling</p>
+    <p style="font-style: italic; color: #A0B0C0; margin-top: 1rem;">
+        "Les meilleures stratégies ne sont pas celles qui gagnent seules,<br/>
+        mais celles qui permettent à chacun de gagner ensemble."
+    </p>
+</div>
+"""
@@ -0,0 +1,242 @@
+"""
+Écriture centralisée des résultats de simulation.
+
+Au lieu d'un parquet de 200 lignes par partie, les workers envoient la
+table de chaque partie terminée dans une file ; un processus écrivain
+unique les accumule par partition (famille(s) de modèles de la partie) et
+publie des fichiers de `SINK_FLUSH_ROWS` lignes environ, en un seul row
+group. Chaque fichier est écrit sous un nom temporaire puis renommé :
+un fichier visible est toujours complet.
+
+Les colonnes sont celles de `Game.save_results`, si bien que les lectures
+`results/*.parquet` existantes voient indifféremment les deux formats.
+Une fois un fichier publié, l'écrivain renvoie au processus principal la
+liste (sim_id, chemin, lignes) des parties qu'il contient, pour le
+manifeste.
+
+En mode compact, chaque publication écrit à la place une partie des tables
+`matches` / `rounds` de `compact_schema` (sous `<sortie>/compact`).
+
+Les résumés des parties (`Game.summary`) sont publiés avec chaque partie
+de rounds, sous le même nom dans `<sortie>/summaries`, et les métriques
+par modèle des parties instrumentées (`Game.model_metrics`) dans
+`<sortie>/metrics`.
+
+Si l'écrivain échoue (disque plein, schéma invalide), l'exception est
+renvoyée au processus principal, qui la relève à la place des accusés ;
+les workers ne restent pas bloqués sur la file pleine au-delà de
+`SINK_PUT_TIMEOUT`.
+"""
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from compact_schema import COMPACT_DIRNAME, split_wide, write_compact
+from instrumentation import METRICS_DIRNAME
+from match_features import SUMMARIES_DIRNAME
+
+SINK_FLUSH_ROWS = 100_000
+
+# Nombre maximal de parties en attente dans la file (contre-pression sur les workers)
+SINK_QUEUE_SIZE = 2_000
+
+# Attente maximale d'un worker sur la file pleine avant d'abandonner la partie
+SINK_PUT_TIMEOUT = 600
+
+# Intervalle de vérification que l'écrivain est toujours vivant
+SINK_POLL_SECONDS = 5
+
+# (sim_id, chemin du fichier publié, nombre de lignes de la partie)
+Published = Tuple[int, str, int]
+
+
+def partition_key(*models: Optional[str]) -> str:
+    """Partition d'une partie : familles des modèles impliqués (`strategy` si aucun)."""
+    families = sorted({m.split(":")[0].replace(".", "") for m in models if m})
+    return "-".join(families) if families else "strategy"
+
+
+class SinkWriter:
+    """Accumule les parties par partition et publie des fichiers parquet atomiquement."""
+
+    def __init__(self, output_dir: str, run_tag: str, flush_rows: int = SINK_FLUSH_ROWS,
+                 compact: bool = False, seed: Optional[int] = None):
+        self.output_dir = output_dir
+        self.run_tag = run_tag
+        self.flush_rows = flush_rows
+        self.compact = compact
+        self.seed = seed
+        self._frames: Dict[str, List[pd.DataFrame]] = {}
+        self._summaries: Dict[str, List[Dict]] = {}
+        self._metrics: Dict[str, List[Dict]] = {}
+        self._sims: Dict[str, List[Tuple[int, int]]] = {}
+        self._rows: Dict[str, int] = {}
+        self._parts: Dict[str, int] = {}
+
+    def add(self, sim_id: int, key: str, df: pd.DataFrame, summary: Optional[Dict] = None,
+            metrics: Optional[List[Dict]] = None) -> List[Published]:
+        self._frames.setdefault(key, []).append(df)
+        if summary is not None:
+            self._summaries.setdefault(key, []).append(summary)
+        if metrics:
+            self._metrics.setdefault(key, []).extend(metrics)
+        self._sims.setdefault(key, []).append((sim_id, len(df)))
+        self._rows[key] = self._rows.get(key, 0) + len(df)
+        if self._rows[key] >= self.flush_rows:
+            return self.flush(key)
+        return []
+
+    def flush(self, key: str) -> List[Published]:
+        frames = self._frames.pop(key, [])
+        summaries = self._summaries.pop(key, [])
+        metrics = self._metrics.pop(key, [])
+        sims = self._sims.pop(key, [])
+        self._rows.pop(key, None)
+        if not frames:
+            return []
+        part = self._parts.get(key, 0)
+        self._parts[key] = part + 1
+        part_name = f"part-{key}-{self.run_tag}-{part:04d}"
+
+        if self.compact:
+            tables = [split_wide(df, sim_id=sim_id, seed=self.seed) for df, (sim_id, _) in zip(frames, sims)]
+            path = write_compact(
+                pd.concat([m for m, _ in tables], ignore_index=True),
+                pd.concat([r for _, r in tables], ignore_index=True),
+                os.path.join(self.output_dir, COMPACT_DIRNAME), part_name,
+            )
+        else:
+            path = os.path.join(self.output_dir, f"{part_name}.parquet")
+            table = pa.Table.from_pandas(pd.concat(frames, ignore_index=True), preserve_index=False)
+            tmp_path = f"{path}.tmp"
+            pq.write_table(table, tmp_path, row_group_size=max(table.num_rows, 1))
+            os.replace(tmp_path, path)
+        for dirname, rows in ((SUMMARIES_DIRNAME, summaries), (METRICS_DIRNAME, metrics)):
+            if not rows:
+                continue
+            rows_path = os.path.join(self.output_dir, dirname, f"{part_name}.parquet")
+            os.makedirs(os.path.dirname(rows_path), exist_ok=True)
+            pd.DataFrame(rows).to_parquet(f"{rows_path}.tmp", index=False)
+            os.replace(f"{rows_path}.tmp", rows_path)
+        return [(sim_id, path, rows) for sim_id, rows in sims]
+
+    def close(self) -> List[Published]:
+        published = []
+        for key in list(self._frames):
+            published.extend(self.flush(key))
+        return published
+
+
+class SinkError(RuntimeError):
+    """Échec du processus écrivain (porte la trace de l'exception d'origine)."""
+
+
+def _writer_main(items, acks, output_dir: str, run_tag: str, flush_rows: int,
+                 compact: bool, seed: Optional[int]):
+    try:
+        writer = SinkWriter(output_dir, run_tag, flush_rows, compact, seed)
+        while True:
+            item = items.get()
+            if item is None:
+                break
+            published = writer.add(*item)
+            if published:
+                acks.put(published)
+        acks.put(writer.close())
+    except BaseException:
+        acks.put(SinkError(traceback.format_exc()))
+    finally:
+        # Fin de flux pour ResultSink.close()
+        acks.put(None)
+
+
+def send(sink_queue, item, timeout: float = SINK_PUT_TIMEOUT):
+    """Envoie une partie à l'écrivain ; lève `SinkError` si la file reste pleine `timeout` secondes."""
+    try:
+        sink_queue.put(item, timeout=timeout)
+    except queue.Full:
+        raise SinkError(f"Result sink queue still full after {timeout} s (writer stalled or dead)") from None
+
+
+class ResultSink:
+    """
+    Processus écrivain et ses deux files : `queue` (workers -> écrivain,
+    éléments `(sim_id, partition, DataFrame[, résumé])`) et les accusés de publication.
+
+    La file est transmise aux workers du pool par leur initialiseur (envoi
+    par `send`) ; un élément peut porter en quatrième position le résumé de la partie et en
+    cinquième ses métriques par modèle.
+    """
+
+    def __init__(self, output_dir: str, flush_rows: int = SINK_FLUSH_ROWS,
+                 max_pending: int = SINK_QUEUE_SIZE, compact: bool = False,
+                 seed: Optional[int] = None):
+        os.makedirs(output_dir, exist_ok=True)
+        run_tag = time.strftime("%Y%m%d%H%M%S")
+        self.queue = multiprocessing.Queue(maxsize=max_pending)
+        self._acks = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_writer_main,
+            args=(self.queue, self._acks, output_dir, run_tag, flush_rows, compact, seed),
+            daemon=True,
+        )
+        self._process.start()
+
+    def _writer_failed(self) -> SinkError:
+        return SinkError(f"Result sink writer died (exit code {self._process.exitcode})")
+
+    @staticmethod
+    def _checked(batch):
+        if isinstance(batch, SinkError):
+            raise batch
+        return batch
+
+    def published(self) -> List[Published]:
+        """Parties publiées depuis le dernier appel (non bloquant) ; lève `SinkError` si l'écrivain a échoué."""
+        # Mort avant la lecture : tout ce que l'écrivain a envoyé est déjà dans la file
+        alive = self._process.is_alive()
+        published = []
+        while True:
+            try:
+                batch = self._checked(self._acks.get_nowait())
+            except queue.Empty:
+                if not alive and not published:
+                    raise self._writer_failed()
+                return published
+            if batch is not None:
+                published.extend(batch)
+
+    def close(self) -> List[Published]:
+        """
+        Publie les partitions restantes, arrête l'écrivain et renvoie les
+        dernières publications. Lève `SinkError` si l'écrivain a échoué ou
+        est mort au lieu d'attendre indéfiniment ses accusés.
+        """
+        while True:
+            try:
+                self.queue.put(None, timeout=SINK_POLL_SECONDS)
+                break
+            except queue.Full:
+                if not self._process.is_alive():
+                    raise self._writer_failed() from None
+        published = []
+        while True:
+            alive = self._process.is_alive()
+            try:
+                batch = self._checked(self._acks.get(timeout=SINK_POLL_SECONDS))
+            except queue.Empty:
+                if not alive:
+                    raise self._writer_failed() from None
+                continue
+            if batch is None:
+                break
+            published.extend(batch)
+        self._process.join()
+        return published
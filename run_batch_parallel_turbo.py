@@ -1,20 +1,41 @@
 import os
+import argparse
+import asyncio
 import itertools
 import datetime
-import hashlib
 import multiprocessing
+import queue
+import time
 from functools import partial
-from game_engine import Game, StrategyAgent, OllamaAgent, PROFILES
+import glob
+import ollama
+from game_engine import Game, StrategyAgent, OllamaAgent, AsyncOllamaAgent, PROFILES, make_match_id
+from response_cache import ResponseCache, DEFAULT_MAX_ENTRIES
+from result_sink import ResultSink, partition_key, send
+from match_features import SUMMARIES_DIRNAME
+from instrumentation import METRICS_DIRNAME, model_metrics, write_model_metrics
+from manifest import Manifest, MANIFEST_FILENAME, STATUS_DONE, STATUS_FAILED
+from scheduler import LatencyModel, CostModel, DEFAULT_LATENCY_PATH, required_workers, format_eta
 
 # Essayer d'importer tqdm, sinon utiliser une version simple
 try:
     from tqdm import tqdm
 except ImportError:
-    def tqdm(iterable, **kwargs):
-        return iterable
+    class tqdm:
+        def __init__(self, iterable=None, **kwargs):
+            self.iterable = iterable
+        def __iter__(self):
+            return iter(self.iterable)
+        def update(self, n=1):
+            pass
+        def set_postfix_str(self, s):
+            pass
+        def close(self):
+            pass
 
 # Configuration
 ROUNDS = 200  # Nombre de rounds par simulation
+REPETITIONS = 1  # Nombre de parties par paire d'agents (chacune avec son sim_id)
 OUTPUT_DIR = "results"
 OLLAMA_MODELS = ["qwen2.5:7b", "gemma2:9b"]
 OLLAMA_TEMPERATURES = [0.7, 1.5]
@@ -24,8 +45,25 @@ OLLAMA_TEMPERATURES = [0.7, 1.5]
 MAX_HOURS = 7  # Contrainte de temps maximale en heures
 NUM_WORKERS = min(16, multiprocessing.cpu_count())  # Maximum initial
 
-# Chunksize pour optimiser la communication entre processus
-CHUNKSIZE = 10  # Traite les tâches par lots de 10
+# Les tâches sont distribuées une par une (les plus longues d'abord) et le
+# nombre de tâches en vol est réajusté à partir des latences mesurées
+# (voir scheduler.py) ; le modèle de latence est conservé d'un run à l'autre
+LATENCY_MODEL_PATH = DEFAULT_LATENCY_PATH
+
+# Durée pendant laquelle Ollama garde un modèle chargé après une requête
+KEEP_ALIVE = "30m"
+
+# Mode asyncio (--async) : nombre maximal de requêtes Ollama simultanées
+# À aligner sur OLLAMA_NUM_PARALLEL côté serveur
+ASYNC_CONCURRENCY = 8
+
+# Options communes à tous les agents Ollama (seed, cache de réponses,
+# prompts canoniques) - fixées par main() puis par init_worker() dans chaque worker
+AGENT_OPTIONS = {}
+_response_cache = None
+
+# File vers le processus écrivain (mode --sink) ; None : un parquet par partie
+_sink_queue = None
 
 # Definitions
 STRATEGIES = ["tit_for_tat", "random", "always_cooperate", "always_defect", "grim_trigger"]
@@ -36,76 +74,265 @@ def ensure_output_dir():
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
+def init_worker(agent_options, sink_queue=None):
+    """Initialiseur des workers : chaque processus ouvre sa propre connexion au cache."""
+    global AGENT_OPTIONS, _response_cache, _sink_queue
+    AGENT_OPTIONS = dict(agent_options)
+    _response_cache = None
+    _sink_queue = sink_queue
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None and AGENT_OPTIONS.get("cache_path"):
+        _response_cache = ResponseCache(
+            AGENT_OPTIONS["cache_path"],
+            AGENT_OPTIONS.get("cache_max_entries", DEFAULT_MAX_ENTRIES),
+        )
+    return _response_cache
+
+def cache_counters():
+    cache = get_response_cache()
+    return (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+def build_agent(config, client=None, semaphore=None):
+    """Instancie un agent à partir de sa configuration (async=True si client fourni)."""
+    if config["type"] == "strategy":
+        return StrategyAgent(config["name"], config["strategy"])
+    options = {
+        "seed": AGENT_OPTIONS.get("seed"),
+        "cache": get_response_cache(),
+        "canonical_prompt": AGENT_OPTIONS.get("canonical_prompt", False),
+        "keep_alive": AGENT_OPTIONS.get("keep_alive"),
+    }
+    if client is not None:
+        return AsyncOllamaAgent(
+            config["name"],
+            config["model"],
+            config["profile"],
+            config["context"],
+            config["temperature"],
+            client=client,
+            semaphore=semaphore,
+            **options,
+        )
+    return OllamaAgent(
+        config["name"],
+        config["model"],
+        config["profile"],
+        config["context"],
+        config["temperature"],
+        **options,
+    )
+
+def simulation_filename(name1, name2, sim_id):
+    # Filename optimisé - sans timestamp pour plus de vitesse
+    return f"vs_{make_match_id(name1, name2, sim_id)}_{sim_id}.parquet"
+
+def task_path(task):
+    """Chemin du parquet d'une tâche (les noms d'agents sont ceux des configurations)."""
+    config1, config2, sim_id, _ = task
+    return os.path.join(OUTPUT_DIR, simulation_filename(config1["name"], config2["name"], sim_id))
+
+def simulation_result(game, agent1, agent2, filename, sim_id):
+    """Sauvegarde une partie terminée et construit le compte rendu du worker."""
+    # Vérifier que l'historique n'est pas vide
+    if len(game.recorder) == 0:
+        return {
+            "success": False,
+            "error": "Empty history",
+            "agent1": agent1.name,
+            "agent2": agent2.name,
+            "filename": filename
+        }
+    
+    if _sink_queue is not None:
+        # Mode --sink : la partie est envoyée au processus écrivain, qui
+        # confirmera sa publication au processus principal
+        key = partition_key(getattr(agent1, "model", None), getattr(agent2, "model", None))
+        send(_sink_queue, (sim_id, key, game.to_frame(), game.summary(), game.model_metrics()))
+        return {
+            "success": True,
+            "sink": True,
+            "agent1": agent1.name,
+            "agent2": agent2.name,
+            "filename": f"part-{key}",
+            "size": len(game.recorder)
+        }
+    
+    # Save results directement (mode silencieux), puis le résumé de la partie
+    game.save_results(os.path.join(OUTPUT_DIR, filename), verbose=False)
+    game.save_summary(os.path.join(OUTPUT_DIR, SUMMARIES_DIRNAME, filename))
+    if game.metrics is not None:
+        game.save_metrics(os.path.join(OUTPUT_DIR, METRICS_DIRNAME, filename))
+    
+    return {
+        "success": True,
+        "agent1": agent1.name,
+        "agent2": agent2.name,
+        "filename": filename,
+        "size": len(game.recorder)
+    }
+
+def agent_timings(*agents):
+    """Latences mesurées des appels Ollama : (modèle, température, longueur du prompt, secondes)."""
+    return [
+        (agent.model, agent.temperature, prompt_length, seconds)
+        for agent in agents
+        for prompt_length, seconds in getattr(agent, "call_timings", ())
+    ]
+
+def simulation_error(config1, config2, error):
+    return {
+        "success": False,
+        "error": str(error),
+        "agent1": config1.get("name", "Unknown"),
+        "agent2": config2.get("name", "Unknown"),
+        "filename": "N/A"
+    }
+
 def run_single_simulation(config_tuple):
     """
     Fonction worker optimisée pour exécuter une seule simulation.
     Version ultra-rapide avec gestion d'erreurs minimale.
     """
-    config1, config2, sim_id = config_tuple
+    config1, config2, sim_id, repetition = config_tuple
+    hits_before, misses_before = cache_counters()
+    start = time.perf_counter()
+    agents = []
     
     try:
-        # Create Agent 1
-        if config1["type"] == "strategy":
-            agent1 = StrategyAgent(config1["name"], config1["strategy"])
-        else:
-            agent1 = OllamaAgent(
-                config1["name"],
-                config1["model"],
-                config1["profile"],
-                config1["context"],
-                config1["temperature"],
-            )
-            
-        # Create Agent 2
-        if config2["type"] == "strategy":
-            agent2 = StrategyAgent(config2["name"], config2["strategy"])
-        else:
-            agent2 = OllamaAgent(
-                config2["name"],
-                config2["model"],
-                config2["profile"],
-                config2["context"],
-                config2["temperature"],
-            )
-        
-        # Filename optimisé - sans timestamp pour plus de vitesse
-        name_hash = hashlib.md5(f"{agent1.name}_{agent2.name}_{sim_id}".encode()).hexdigest()[:8]
-        filename = f"vs_{name_hash}_{sim_id}.parquet"
-        full_path = os.path.join(OUTPUT_DIR, filename)
+        agent1 = build_agent(config1)
+        agent2 = build_agent(config2)
+        agents = [agent1, agent2]
+        filename = simulation_filename(agent1.name, agent2.name, sim_id)
         
         # Run simulation (mode silencieux pour la performance)
-        game = Game(agent1, agent2)
+        game = Game(agent1, agent2, sim_id=sim_id, repetition=repetition,
+                    instrument=AGENT_OPTIONS.get("instrument", False))
         game.run_game(ROUNDS, verbose=False)
         
-        # Vérifier que l'historique n'est pas vide
-        if len(game.history) == 0:
-            return {
-                "success": False,
-                "error": "Empty history",
-                "agent1": agent1.name,
-                "agent2": agent2.name,
-                "filename": filename
-            }
+        result = simulation_result(game, agent1, agent2, filename, sim_id)
+            
+    except Exception as e:
+        result = simulation_error(config1, config2, e)
+    
+    hits, misses = cache_counters()
+    result["cache_hits"] = hits - hits_before
+    result["cache_misses"] = misses - misses_before
+    result["sim_id"] = sim_id
+    result["duration"] = time.perf_counter() - start
+    result["timings"] = agent_timings(*agents)
+    return result
+
+async def run_single_simulation_async(config_tuple, client, semaphore):
+    """Version asyncio de run_single_simulation : les appels Ollama ne bloquent pas la boucle."""
+    config1, config2, sim_id, repetition = config_tuple
+    start = time.perf_counter()
+    agents = []
+    
+    try:
+        agent1 = build_agent(config1, client, semaphore)
+        agent2 = build_agent(config2, client, semaphore)
+        agents = [agent1, agent2]
+        filename = simulation_filename(agent1.name, agent2.name, sim_id)
         
-        # Save results directement (mode silencieux)
-        game.save_results(full_path, verbose=False)
+        game = Game(agent1, agent2, sim_id=sim_id, repetition=repetition,
+                    instrument=AGENT_OPTIONS.get("instrument", False))
+        await game.run_game_async(ROUNDS, verbose=False)
         
-        return {
-            "success": True,
-            "agent1": agent1.name,
-            "agent2": agent2.name,
-            "filename": filename,
-            "size": len(game.history)
-        }
-            
+        # L'écriture parquet est bloquante : on la sort de la boucle d'événements
+        result = await asyncio.to_thread(simulation_result, game, agent1, agent2, filename, sim_id)
+    
     except Exception as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "agent1": config1.get("name", "Unknown"),
-            "agent2": config2.get("name", "Unknown"),
-            "filename": "N/A"
-        }
+        result = simulation_error(config1, config2, e)
+    
+    result["sim_id"] = sim_id
+    result["duration"] = time.perf_counter() - start
+    result["timings"] = agent_timings(*agents)
+    return result
+
+async def run_all_async(tasks, concurrency, costs=None, on_result=None):
+    """
+    Exécute toutes les simulations dans un seul processus.
+    
+    `concurrency` plafonne à la fois les requêtes Ollama en vol et le nombre
+    de parties actives, pour garder les slots du serveur pleins sans
+    démarrer des centaines de parties à moitié jouées. Avec un `CostModel`,
+    les parties les plus longues démarrent en premier et l'ETA est
+    réestimée à chaque partie terminée. `on_result` est appelé sur chaque
+    résultat dès sa réception.
+    """
+    if costs is not None:
+        tasks = costs.longest_first(tasks)
+        remaining_cost = costs.total_cost(tasks)
+    client = ollama.AsyncClient()
+    requests = asyncio.Semaphore(concurrency)
+    games = asyncio.Semaphore(concurrency)
+    
+    async def guarded(task):
+        async with games:
+            return await run_single_simulation_async(task, client, requests)
+    
+    pending = [asyncio.ensure_future(guarded(task)) for task in tasks]
+    results = []
+    progress = tqdm(total=len(pending), desc="Simulations ASYNC", unit="sim")
+    for future in asyncio.as_completed(pending):
+        result = await future
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+        progress.update(1)
+        if costs is not None:
+            costs.latency.observe_all(result.get("timings", ()))
+            remaining_cost = costs.total_cost(tasks[len(results):])
+            progress.set_postfix_str(f"ETA {format_eta(remaining_cost / concurrency)}")
+    progress.close()
+    return results
+
+def run_pool_adaptive(pool, tasks, costs, max_workers, deadline, later_groups=(), on_result=None):
+    """
+    Distribue `tasks` sur le pool une par une, les plus longues d'abord.
+    
+    À chaque tâche terminée, les latences mesurées mettent à jour le modèle
+    de coût : les tâches restantes sont réordonnées, l'ETA est réestimée et
+    le nombre de tâches en vol (workers actifs) est réajusté pour finir
+    avant `deadline`. `later_groups` sont les tâches des groupes suivants,
+    dont le coût est lui aussi réestimé à chaque tâche terminée.
+    `on_result` est appelé sur chaque résultat dès sa réception.
+    """
+    done = queue.Queue()
+    pending = costs.longest_first(tasks)
+    in_flight = 0
+    results = []
+    progress = tqdm(total=len(pending), desc="Simulations TURBO", unit="sim")
+    
+    def remaining_cost():
+        return costs.total_cost(pending) + sum(costs.total_cost(group) for group in later_groups)
+    
+    while pending or in_flight:
+        workers = required_workers(remaining_cost(), deadline - time.time(), max_workers)
+        while pending and in_flight < workers:
+            task = pending.pop(0)
+            pool.apply_async(
+                run_single_simulation, (task,),
+                callback=done.put,
+                error_callback=lambda e, task=task: done.put(
+                    dict(simulation_error(task[0], task[1], e), sim_id=task[2])),
+            )
+            in_flight += 1
+        
+        result = done.get()
+        in_flight -= 1
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+        costs.latency.observe_all(result.get("timings", ()))
+        pending = costs.longest_first(pending)
+        progress.update(1)
+        progress.set_postfix_str(f"workers {workers}, ETA {format_eta(remaining_cost() / max(workers, 1))}")
+    
+    progress.close()
+    return results
 
 def generate_all_combinations():
     """Génère toutes les combinaisons de configurations d'agents."""
@@ -134,24 +361,111 @@ def generate_all_combinations():
     # Generate Combinations
     combinations = list(itertools.combinations_with_replacement(all_configs, 2))
     
-    # Filtrer Strategy vs Strategy et ajouter un ID unique
+    # Filtrer Strategy vs Strategy et ajouter un ID unique par partie :
+    # la répétition r de la combinaison i a le sim_id r * len(combinations) + i
+    # (avec REPETITIONS = 1, les sim_id des runs précédents sont conservés)
     tasks = []
-    for sim_id, (config1, config2) in enumerate(combinations):
-        # Skip Strategy vs Strategy
-        if config1["type"] == "strategy" and config2["type"] == "strategy":
-            continue
-        tasks.append((config1, config2, sim_id))
+    for repetition in range(REPETITIONS):
+        for index, (config1, config2) in enumerate(combinations):
+            # Skip Strategy vs Strategy
+            if config1["type"] == "strategy" and config2["type"] == "strategy":
+                continue
+            sim_id = repetition * len(combinations) + index
+            tasks.append((config1, config2, sim_id, repetition))
     
     return tasks
 
-def main():
+def task_models(task):
+    """Ensemble des modèles Ollama nécessaires à une tâche."""
+    config1, config2 = task[:2]
+    return frozenset(c["model"] for c in (config1, config2) if c["type"] != "strategy")
+
+def order_task_groups(tasks):
+    """
+    Regroupe les tâches par ensemble de modèles et ordonne les groupes pour
+    minimiser les chargements de modèles.
+    
+    Glouton : après chaque groupe, on enchaîne sur celui qui réutilise le plus
+    de modèles déjà chargés puis qui en charge le moins de nouveaux. Avec deux
+    modèles A et B cela donne A seul -> A+B -> B seul : chaque modèle n'est
+    chargé qu'une fois et les matchs croisés sont joués quand les deux sont
+    en mémoire.
+    """
+    groups = {}
+    for task in tasks:
+        groups.setdefault(task_models(task), []).append(task)
+    
+    ordered = []
+    loaded = frozenset()
+    remaining = dict(groups)
+    while remaining:
+        models = max(
+            remaining,
+            key=lambda m: (len(m & loaded), -len(m - loaded), len(remaining[m]), sorted(m)),
+        )
+        ordered.append((models, remaining.pop(models)))
+        loaded = models
+    return ordered
+
+def set_model_residency(model, keep_alive):
+    """Charge (keep_alive > 0) ou décharge (keep_alive = 0) un modèle côté serveur."""
+    try:
+        # Un prompt vide ne génère rien : il ne fait que (dé)charger le modèle
+        ollama.generate(model=model, prompt="", keep_alive=keep_alive)
+    except Exception as e:
+        print(f"⚠️  Impossible de {'charger' if keep_alive else 'décharger'} {model}: {e}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Exécution parallèle des simulations")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Un seul processus asyncio au lieu d'un pool multiprocessing")
+    parser.add_argument("--concurrency", type=int, default=ASYNC_CONCURRENCY,
+                        help="Requêtes Ollama simultanées en mode --async")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed Ollama fixe (rend les réponses reproductibles et donc cachables)")
+    parser.add_argument("--cache", dest="cache_path", default=None,
+                        help="Chemin du cache SQLite des réponses Ollama (désactivé par défaut)")
+    parser.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Taille maximale du cache (éviction LRU au-delà)")
+    parser.add_argument("--canonical-prompts", action="store_true",
+                        help="Numéros de round relatifs dans les prompts pour augmenter les hits")
+    parser.add_argument("--no-model-affinity", dest="model_affinity", action="store_false",
+                        help="Ne pas regrouper les tâches par modèle (ordre d'origine)")
+    parser.add_argument("--sink", action="store_true",
+                        help="Un processus écrivain unique regroupe les parties en gros parquets par famille de modèles")
+    parser.add_argument("--compact", action="store_true",
+                        help="Écrire le schéma compact (tables matches + rounds, implique --sink)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Ne relancer que les simulations absentes, échouées ou invalides du manifeste")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Mesurer chaque coup (durées, tokens, échecs) : colonnes par round et métriques par modèle")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compact:
+        args.sink = True
     ensure_output_dir()
+    agent_options = {
+        "seed": args.seed,
+        "cache_path": args.cache_path,
+        "cache_max_entries": args.cache_max_entries,
+        "canonical_prompt": args.canonical_prompts,
+        "keep_alive": KEEP_ALIVE if args.model_affinity else None,
+        "instrument": args.instrument,
+    }
+    init_worker(agent_options)
+    latency = LatencyModel.load(LATENCY_MODEL_PATH)
+    costs = CostModel(latency, ROUNDS)
     
     print("="*60)
     print("GÉNÉRATION PARALLÈLE TURBO DES SIMULATIONS")
     print("="*60)
     print(f"Rounds par simulation: {ROUNDS}")
-    print(f"Chunksize: {CHUNKSIZE}")
+    if args.use_async:
+        print(f"Mode: asyncio ({args.concurrency} requêtes simultanées)")
+    else:
+        print("Répartition: dynamique, tâches les plus longues d'abord")
     print(f"Contrainte de temps: {MAX_HOURS} heures maximum")
     print(f"Répertoire de sortie: {OUTPUT_DIR}")
     print("="*60)
@@ -159,29 +473,66 @@ def main():
     # Générer toutes les tâches
     print("\nGénération des combinaisons...")
     tasks = generate_all_combinations()
+    
+    # Manifeste des simulations terminées : permet de reprendre un run interrompu
+    manifest = Manifest(os.path.join(OUTPUT_DIR, MANIFEST_FILENAME))
+    if args.resume:
+        # Fichiers temporaires d'écritures interrompues
+        for tmp_file in glob.glob(os.path.join(OUTPUT_DIR, "*.parquet.tmp")) + \
+                glob.glob(os.path.join(OUTPUT_DIR, SUMMARIES_DIRNAME, "*.parquet.tmp")) + \
+                glob.glob(os.path.join(OUTPUT_DIR, METRICS_DIRNAME, "*.parquet.tmp")):
+            os.remove(tmp_file)
+        tasks, already_done = manifest.pending_tasks(tasks, ROUNDS, args.seed, path_for=task_path)
+        print(f"Reprise: {already_done} simulations déjà terminées et valides")
+    tasks_by_id = {task[2]: task for task in tasks}
+    
+    sink = None
+    
+    def record_published(published):
+        for sim_id, path, rows in published:
+            config1, config2 = tasks_by_id[sim_id][:2]
+            manifest.record(sim_id, config1, config2, ROUNDS, args.seed, STATUS_DONE, rows=rows, path=path)
+    
+    def record_result(result):
+        config1, config2, sim_id, _ = tasks_by_id[result["sim_id"]]
+        if result.get("sink"):
+            # Inscrite au manifeste seulement une fois son fichier publié
+            record_published(sink.published())
+        elif result["success"]:
+            manifest.record(sim_id, config1, config2, ROUNDS, args.seed, STATUS_DONE,
+                            rows=result["size"], path=os.path.join(OUTPUT_DIR, result["filename"]))
+        else:
+            manifest.record(sim_id, config1, config2, ROUNDS, args.seed, STATUS_FAILED,
+                            error=result.get("error"))
+    
     total_tasks = len(tasks)
     print(f"Total de simulations à exécuter: {total_tasks}")
+    if total_tasks == 0:
+        manifest.close()
+        print("Rien à faire.")
+        return
     
     # Calculer le nombre d'appels Ollama nécessaires
     strategy_vs_ollama = sum(1 for t in tasks if t[0]["type"] == "strategy" or t[1]["type"] == "strategy")
     ollama_vs_ollama = total_tasks - strategy_vs_ollama
     total_ollama_calls = strategy_vs_ollama * ROUNDS + ollama_vs_ollama * ROUNDS * 2
     
-    # Calculer le nombre de workers nécessaire pour tenir dans MAX_HOURS
-    # Temps total = (total_ollama_calls * 3.5 secondes) / NUM_WORKERS
-    # MAX_HOURS >= (total_ollama_calls * 3.5) / 3600 / NUM_WORKERS
-    # NUM_WORKERS >= (total_ollama_calls * 3.5) / (3600 * MAX_HOURS)
-    required_workers = int((total_ollama_calls * 3.5) / (3600 * MAX_HOURS)) + 1
-    required_workers = max(required_workers, 1)  # Au moins 1 worker
-    max_available_workers = multiprocessing.cpu_count()
+    # Coût total estimé par le modèle de latence (a priori de 3.5 s par appel
+    # tant qu'aucun run n'a été mesuré), puis workers nécessaires pour tenir
+    # dans MAX_HOURS ; ce nombre est réestimé au fil du run
+    total_cost = costs.total_cost(tasks)
+    max_workers = min(multiprocessing.cpu_count(), NUM_WORKERS)
+    workers_needed = required_workers(total_cost, MAX_HOURS * 3600, max_workers)
     
-    # Utiliser le nombre de workers calculé, limité par les CPU disponibles
-    actual_workers = min(required_workers, max_available_workers, NUM_WORKERS)
+    # En mode async, la limite est le nombre de requêtes simultanées
+    actual_workers = args.concurrency if args.use_async else workers_needed
     
-    estimated_hours = (total_ollama_calls * 3.5) / 3600 / actual_workers
+    estimated_hours = total_cost / 3600 / actual_workers
     print(f"Appels Ollama totaux: {total_ollama_calls:,}")
-    print(f"Workers calculés pour tenir dans {MAX_HOURS}h: {required_workers}")
-    print(f"Workers utilisés: {actual_workers}")
+    print(f"Latence moyenne estimée: {total_cost / total_ollama_calls if total_ollama_calls else 0:.2f} s/appel "
+          f"({latency.observations:,} mesures)")
+    print(f"Workers calculés pour tenir dans {MAX_HOURS}h: {workers_needed}")
+    print(f"Workers utilisés: {actual_workers}" + ("" if args.use_async else f" (ajustés en cours de run, max {max_workers})"))
     print(f"Estimation de temps: ~{estimated_hours:.1f} heures (avec {actual_workers} workers)")
     
     if estimated_hours > MAX_HOURS:
@@ -192,26 +543,62 @@ def main():
     
     # Exécuter en parallèle avec OPTIMISATIONS MAXIMALES
     start_time = datetime.datetime.now()
+    deadline = time.time() + MAX_HOURS * 3600
     successful = 0
     failed = 0
     errors = []
     
-    with multiprocessing.Pool(processes=actual_workers) as pool:
-        # Utiliser imap_unordered pour démarrer le traitement dès qu'une tâche est terminée
-        # Chunksize réduit la surcharge de communication entre processus
-        results = list(tqdm(
-            pool.imap_unordered(run_single_simulation, tasks, chunksize=CHUNKSIZE),
-            total=total_tasks,
-            desc="Simulations TURBO",
-            unit="sim"
-        ))
-        
-        for result in results:
-            if result["success"]:
-                successful += 1
+    # Regroupement par modèle : on vide un groupe avant de passer au suivant
+    # pour que le serveur Ollama ne recharge pas les modèles en permanence
+    if args.model_affinity:
+        task_groups = order_task_groups(tasks)
+        print("Ordre des groupes de modèles :")
+        for models, group in task_groups:
+            print(f"  - {' + '.join(sorted(models)) or 'aucun modèle'} : {len(group)} simulations")
+    else:
+        task_groups = [(None, tasks)]
+    
+    results = []
+    loaded = frozenset()
+    pool = None
+    if args.sink:
+        sink = ResultSink(OUTPUT_DIR, compact=args.compact, seed=args.seed)
+        init_worker(agent_options, sink.queue)
+    if not args.use_async:
+        pool = multiprocessing.Pool(processes=max_workers, initializer=init_worker,
+                                    initargs=(agent_options, sink.queue if sink else None))
+    try:
+        for group_index, (models, group) in enumerate(task_groups):
+            if models is not None:
+                for model in sorted(loaded - models):
+                    set_model_residency(model, 0)
+                for model in sorted(models - loaded):
+                    set_model_residency(model, KEEP_ALIVE)
+                loaded = models
+            
+            if args.use_async:
+                results.extend(asyncio.run(run_all_async(group, args.concurrency, costs, record_result)))
             else:
-                failed += 1
-                errors.append(result)
+                later_groups = [later for _, later in task_groups[group_index + 1:]]
+                results.extend(run_pool_adaptive(pool, group, costs, max_workers, deadline, later_groups,
+                                                 on_result=record_result))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        try:
+            if sink is not None:
+                record_published(sink.close())
+        finally:
+            latency.save(LATENCY_MODEL_PATH)
+            manifest.close()
+    
+    for result in results:
+        if result["success"]:
+            successful += 1
+        else:
+            failed += 1
+            errors.append(result)
     
     end_time = datetime.datetime.now()
     duration = end_time - start_time
@@ -226,6 +613,33 @@ def main():
     print(f"Temps écoulé: {duration}")
     print(f"Temps moyen par simulation: {duration / total_tasks if total_tasks > 0 else 0}")
     print(f"Simulations par seconde: {total_tasks / duration.total_seconds() if duration.total_seconds() > 0 else 0:.2f}")
+    calls = sum(len(r.get("timings", ())) for r in results)
+    if calls:
+        call_seconds = sum(t[3] for r in results for t in r.get("timings", ()))
+        print(f"Latence Ollama mesurée: {call_seconds / calls:.2f} s/appel sur {calls:,} appels")
+    
+    if args.cache_path:
+        if args.use_async:
+            # Un seul processus : les compteurs du cache sont directement ceux du run
+            cache_hits, cache_misses = cache_counters()
+        else:
+            cache_hits = sum(r.get("cache_hits", 0) for r in results)
+            cache_misses = sum(r.get("cache_misses", 0) for r in results)
+        lookups = cache_hits + cache_misses
+        print(f"Cache Ollama: {cache_hits:,} hits / {cache_misses:,} misses "
+              f"({100 * cache_hits / lookups if lookups else 0:.1f}% de hits)")
+        if args.seed is None and 0 not in OLLAMA_TEMPERATURES:
+            print("   (le cache n'est utilisé qu'avec --seed ou une température de 0)")
+    
+    if args.instrument:
+        metrics_path = write_model_metrics(OUTPUT_DIR)
+        print("Instrumentation par modèle:")
+        for row in model_metrics(OUTPUT_DIR).itertuples(index=False):
+            print(f"  - {row.model}: {row.wall_time_mean:.2f} s/coup (chargement {row.load_duration_mean:.2f} s, "
+                  f"prompt {row.prompt_eval_duration_mean:.2f} s, génération {row.eval_duration_mean:.2f} s), "
+                  f"{row.errors:,} erreurs, {row.parse_failures:,} réponses illisibles, "
+                  f"{row.fallbacks:,} coups remplacés par C")
+        print(f"  -> {metrics_path}")
     
     if errors:
         print(f"\nPremières erreurs ({min(5, len(errors))} sur {len(errors)}):")
@@ -0,0 +1,154 @@
+"""
+Ordonnancement des simulations guidé par les coûts.
+
+Le coût d'une simulation est sa durée estimée (secondes d'horloge), tirée
+d'un modèle de latence des appels Ollama appris en ligne : une moyenne
+mobile exponentielle par (modèle, température, tranche de longueur de
+prompt), avec repli sur (modèle, température), puis sur le modèle, puis
+sur un a priori de `DEFAULT_CALL_SECONDS`. Les mesures remontent des workers au fil du run,
+ce qui permet de réordonner les tâches restantes (les plus longues
+d'abord), de réestimer l'ETA et le nombre de workers nécessaires pour
+tenir dans le budget de temps.
+"""
+import json
+import math
+import os
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_CALL_SECONDS = 3.5
+EWMA_ALPHA = 0.2
+
+# Les prompts ne diffèrent que par le profil, le contexte et l'historique
+# (5 derniers rounds) : des tranches de 256 caractères suffisent
+PROMPT_BUCKET_CHARS = 256
+
+DEFAULT_LATENCY_PATH = os.path.join("cache", "latency_model.json")
+
+
+class LatencyModel:
+    """Latence moyenne (EWMA) d'un appel Ollama, apprise au fil des mesures."""
+
+    def __init__(self, prior: float = DEFAULT_CALL_SECONDS, alpha: float = EWMA_ALPHA):
+        self.prior = prior
+        self.alpha = alpha
+        self.estimates: Dict[Tuple, float] = {}
+        self.counts: Dict[Tuple, int] = {}
+
+    @staticmethod
+    def _keys(model: str, temperature: float, prompt_length: int) -> List[Tuple]:
+        """Clés du plus précis au plus grossier."""
+        bucket = prompt_length // PROMPT_BUCKET_CHARS
+        return [(model, temperature, bucket), (model, temperature), (model,)]
+
+    def observe(self, model: str, temperature: float, prompt_length: int, seconds: float):
+        for key in self._keys(model, temperature, prompt_length):
+            previous = self.estimates.get(key)
+            if previous is None:
+                self.estimates[key] = seconds
+            else:
+                self.estimates[key] = previous + self.alpha * (seconds - previous)
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def observe_all(self, timings: Iterable[Sequence]):
+        """Intègre des mesures (modèle, température, longueur du prompt, secondes)."""
+        for model, temperature, prompt_length, seconds in timings:
+            self.observe(model, temperature, prompt_length, seconds)
+
+    def estimate(self, model: str, temperature: float, prompt_length: int) -> float:
+        for key in self._keys(model, temperature, prompt_length):
+            if key in self.estimates:
+                return self.estimates[key]
+        return self.prior
+
+    @property
+    def observations(self) -> int:
+        return sum(n for key, n in self.counts.items() if len(key) == 1)
+
+    def save(self, path: str = DEFAULT_LATENCY_PATH):
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else ".", exist_ok=True)
+        entries = [
+            {"key": list(key), "seconds": seconds, "count": self.counts.get(key, 0)}
+            for key, seconds in self.estimates.items()
+        ]
+        with open(path, "w") as f:
+            json.dump({"prior": self.prior, "alpha": self.alpha, "entries": entries}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_LATENCY_PATH) -> "LatencyModel":
+        """Modèle sauvegardé par un run précédent, ou a priori si absent."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            data = json.load(f)
+        model = cls(data.get("prior", DEFAULT_CALL_SECONDS), data.get("alpha", EWMA_ALPHA))
+        for entry in data.get("entries", []):
+            key = tuple(entry["key"])
+            model.estimates[key] = entry["seconds"]
+            model.counts[key] = entry.get("count", 0)
+        return model
+
+
+def steady_prompt_length(config: Dict[str, Any], history_length: int = 5) -> int:
+    """Longueur du prompt d'un agent Ollama une fois l'historique affiché plein."""
+    from game_engine import OllamaAgent, COOPERATE
+
+    agent = OllamaAgent(config["name"], config["model"], config["profile"],
+                        config["context"], config["temperature"])
+    for _ in range(history_length):
+        agent.history.append(COOPERATE)
+    return len(agent.build_prompt([COOPERATE] * history_length))
+
+
+class CostModel:
+    """
+    Coût estimé (secondes d'horloge) d'une tâche (config1, config2, sim_id, répétition).
+
+    Avec `concurrent_moves` (comme `Game` par défaut), les coups de deux
+    agents Ollama sont demandés en parallèle : un round dure le plus long
+    des deux appels, pas leur somme.
+    """
+
+    def __init__(self, latency: LatencyModel, rounds: int, concurrent_moves: bool = True):
+        self.latency = latency
+        self.rounds = rounds
+        self.concurrent_moves = concurrent_moves
+        self._prompt_lengths: Dict[str, int] = {}
+
+    def prompt_length(self, config: Dict[str, Any]) -> int:
+        name = config["name"]
+        if name not in self._prompt_lengths:
+            self._prompt_lengths[name] = steady_prompt_length(config)
+        return self._prompt_lengths[name]
+
+    def task_cost(self, task) -> float:
+        config1, config2 = task[:2]
+        calls = [
+            self.latency.estimate(config["model"], config["temperature"], self.prompt_length(config))
+            for config in (config1, config2)
+            if config["type"] != "strategy"
+        ]
+        if not calls:
+            return 0.0
+        per_round = max(calls) if self.concurrent_moves else sum(calls)
+        return self.rounds * per_round
+
+    def total_cost(self, tasks: Iterable) -> float:
+        return sum(self.task_cost(task) for task in tasks)
+
+    def longest_first(self, tasks: Iterable) -> List:
+        """Ordre LPT : les tâches les plus longues d'abord, pour ne pas finir sur une traîne."""
+        return sorted(tasks, key=self.task_cost, reverse=True)
+
+
+def required_workers(remaining_cost: float, remaining_seconds: float, max_workers: int) -> int:
+    """Workers nécessaires pour écouler `remaining_cost` dans le temps restant."""
+    if remaining_seconds <= 0:
+        return max_workers
+    return max(1, min(max_workers, math.ceil(remaining_cost / remaining_seconds)))
+
+
+def format_eta(seconds: float) -> str:
+    seconds = max(0, int(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s"
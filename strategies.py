@@ -0,0 +1,201 @@
+"""
+Stratégies codées avec état incrémental.
+
+Chaque stratégie est un objet qui met à jour son état une fois par round
+(`observe`) au lieu de relire tout l'historique : compteurs courants, verrou
+"l'adversaire a déjà trahi" et, pour les stratégies à mémoire n, deux
+registres à décalage qui jouent le rôle de tampon circulaire des n derniers
+coups. Le coût d'un coup est donc O(1), quelle que soit la durée de la partie.
+
+Toute stratégie à mémoire n est décrite par une table état -> probabilité
+de coopérer, compilée une seule fois à l'enregistrement (`register_table`,
+`register_rule`). L'état est l'indice `(mes_n_coups << n) | ses_n_coups`,
+le bit 0 de chaque registre étant le coup le plus récent ; pour n = 1 on
+retrouve l'ordre usuel (CC, CD, DC, DD). Avant d'avoir n rounds
+d'historique, les coups manquants sont considérés comme des coopérations.
+
+Les coups sont codés en entiers : 0 = coopération, 1 = défection.
+"""
+import random
+import numpy as np
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+COOPERATE_CODE = 0
+DEFECT_CODE = 1
+
+# Gains (R, S, T, P) — mêmes valeurs que game_engine.PAYOFFS
+REWARD, SUCKER, TEMPTATION, PUNISHMENT = 3, 0, 5, 1
+
+
+class StrategySpec:
+    """Stratégie à mémoire n compilée en table de probabilités de coopération."""
+
+    def __init__(self, name: str, memory: int, table: Sequence[float],
+                 initial: Optional[float] = None, description: str = ""):
+        table = np.asarray(table, dtype=np.float64)
+        if table.shape != (4 ** memory,):
+            raise ValueError(f"Strategy '{name}': memory-{memory} table needs {4 ** memory} entries, got {table.shape}")
+        if np.any((table < 0) | (table > 1)):
+            raise ValueError(f"Strategy '{name}': probabilities must be in [0, 1]")
+        self.name = name
+        self.memory = memory
+        self.table = table
+        # Probabilité de coopérer au premier coup (par défaut : état "tout C")
+        self.initial = float(table[0]) if initial is None else float(initial)
+        self.description = description
+
+    def lifted_table(self, memory: int) -> np.ndarray:
+        """Table ré-indexée pour une mémoire plus grande (états en `memory` bits)."""
+        if memory < self.memory:
+            raise ValueError(f"Cannot lift memory-{self.memory} strategy '{self.name}' to memory-{memory}")
+        states = np.arange(4 ** memory)
+        own = (states >> memory) & ((1 << self.memory) - 1)
+        opp = states & ((1 << self.memory) - 1)
+        return self.table[(own << self.memory) | opp]
+
+
+STRATEGY_REGISTRY: Dict[str, StrategySpec] = {}
+
+
+def register_table(name: str, memory: int, table: Sequence[float],
+                   initial: Optional[float] = None, description: str = "") -> StrategySpec:
+    spec = StrategySpec(name, memory, table, initial, description)
+    STRATEGY_REGISTRY[name] = spec
+    return spec
+
+
+def register_rule(name: str, memory: int,
+                  rule: Callable[[Tuple[int, ...], Tuple[int, ...]], float],
+                  initial: Optional[float] = None, description: str = "") -> StrategySpec:
+    """
+    Compile une règle en table : `rule(mes_coups, ses_coups)` reçoit les n
+    derniers coups de chaque joueur (le plus récent en premier) et renvoie
+    la probabilité de coopérer.
+    """
+    table = []
+    for state in range(4 ** memory):
+        own_bits, opp_bits = state >> memory, state & ((1 << memory) - 1)
+        own = tuple((own_bits >> j) & 1 for j in range(memory))
+        opp = tuple((opp_bits >> j) & 1 for j in range(memory))
+        table.append(rule(own, opp))
+    return register_table(name, memory, table, initial, description)
+
+
+def zero_determinant(chi: float, phi: float, baseline: float) -> List[float]:
+    """
+    Stratégie zero-determinant (Press & Dyson) en mémoire 1.
+
+    Impose S_X - baseline = chi * (S_Y - baseline) ; `phi` règle l'échelle.
+    """
+    R, S, T, P = REWARD, SUCKER, TEMPTATION, PUNISHMENT
+    l = baseline
+    p = [
+        1 + phi * ((R - l) - chi * (R - l)),
+        1 + phi * ((S - l) - chi * (T - l)),
+        phi * ((T - l) - chi * (S - l)),
+        phi * ((P - l) - chi * (P - l)),
+    ]
+    if any(x < -1e-12 or x > 1 + 1e-12 for x in p):
+        raise ValueError(f"ZD parameters chi={chi}, phi={phi}, baseline={baseline} give invalid probabilities {p}")
+    return [min(1.0, max(0.0, x)) for x in p]
+
+
+# Seuil de générosité optimal de Generous TFT (Nowak & Sigmund)
+GENEROSITY = min(1 - (TEMPTATION - REWARD) / (REWARD - SUCKER),
+                 (REWARD - PUNISHMENT) / (TEMPTATION - PUNISHMENT))
+
+# --- Bibliothèque par défaut (ordre des tables mémoire 1 : CC, CD, DC, DD) ---
+register_table("random", 0, [0.5], description="Coin flip")
+register_table("always_cooperate", 0, [1.0])
+register_table("always_defect", 0, [0.0])
+register_table("tit_for_tat", 1, [1, 0, 1, 0], description="Copies the opponent's last move")
+register_table("suspicious_tit_for_tat", 1, [1, 0, 1, 0], initial=0.0)
+register_table("grim_trigger", 1, [1, 0, 0, 0],
+               description="Cooperates until the opponent defects once, then defects forever")
+register_table("win_stay_lose_shift", 1, [1, 0, 0, 1], description="Pavlov")
+STRATEGY_REGISTRY["pavlov"] = STRATEGY_REGISTRY["win_stay_lose_shift"]
+register_table("generous_tit_for_tat", 1, [1, GENEROSITY, 1, GENEROSITY])
+register_table("alternator", 1, [0, 0, 1, 1], initial=1.0)
+register_rule("tit_for_two_tats", 2, lambda own, opp: 0.0 if opp == (1, 1) else 1.0,
+              description="Defects only after two consecutive defections")
+register_rule("two_tits_for_tat", 2, lambda own, opp: 0.0 if 1 in opp else 1.0)
+register_table("zd_extort_2", 1, zero_determinant(chi=2, phi=1 / 18, baseline=PUNISHMENT), initial=1.0)
+register_table("zd_gtft_2", 1, zero_determinant(chi=2, phi=1 / 8, baseline=REWARD), initial=1.0)
+
+
+def get_strategy_spec(name: str) -> StrategySpec:
+    try:
+        return STRATEGY_REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Unknown strategy '{name}'. Known strategies: {sorted(STRATEGY_REGISTRY)}") from None
+
+
+class Strategy:
+    """État incrémental commun à toutes les stratégies."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.rounds = 0
+        self.opponent_defections = 0
+        self.opponent_defected = False
+
+    def observe(self, own_move: int, opponent_move: int):
+        """Intègre le round qui vient d'être joué."""
+        self.rounds += 1
+        if opponent_move == DEFECT_CODE:
+            self.opponent_defections += 1
+            self.opponent_defected = True
+
+    def next_move(self) -> int:
+        raise NotImplementedError
+
+
+class TableStrategy(Strategy):
+    """Évalue une StrategySpec par simple lecture de table."""
+
+    def __init__(self, spec: StrategySpec):
+        self.spec = spec
+        self.table = spec.table
+        self.memory = spec.memory
+        self._mask = (1 << spec.memory) - 1
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.own_bits = 0
+        self.opponent_bits = 0
+
+    def observe(self, own_move: int, opponent_move: int):
+        super().observe(own_move, opponent_move)
+        self.own_bits = ((self.own_bits << 1) | own_move) & self._mask
+        self.opponent_bits = ((self.opponent_bits << 1) | opponent_move) & self._mask
+
+    def next_move(self) -> int:
+        if self.rounds == 0:
+            p = self.spec.initial
+        else:
+            p = self.table[(self.own_bits << self.memory) | self.opponent_bits]
+        if p >= 1.0:
+            return COOPERATE_CODE
+        if p <= 0.0:
+            return DEFECT_CODE
+        return COOPERATE_CODE if random.random() < p else DEFECT_CODE
+
+
+def make_strategy(name: str) -> Strategy:
+    return TableStrategy(get_strategy_spec(name))
+
+
+def compile_tables(names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Empile les tables des stratégies `names` sur une mémoire commune.
+
+    Renvoie (tables [stratégies × 4**mémoire], premiers coups, mémoire).
+    """
+    specs = [get_strategy_spec(n) for n in names]
+    memory = max((s.memory for s in specs), default=0)
+    tables = np.stack([s.lifted_table(memory) for s in specs]) if specs else np.zeros((0, 4 ** memory))
+    initial = np.array([s.initial for s in specs], dtype=np.float64)
+    return tables, initial, memory